@@ -0,0 +1,84 @@
+"""Benchmark: loading the game's images with and without packing them.
+
+Run from the top-level directory:
+
+    python bench/atlas.py
+
+Loads every image in ``img/`` and every sprite in the game's sprite sheets a
+number of times, as :class:`Game` does on startup, and prints the load time,
+the increase in resident memory and the number of separate pixel buffers per
+load.  ``packed`` uses :meth:`ResourceManager.pack_imgs` (as when
+:data:`conf.PACK_IMGS` is set), and ``unpacked`` loads each image on its own.
+Each mode runs in a fresh process so memory use is comparable (Linux only).
+
+"""
+
+import sys
+import os
+import gc
+import subprocess
+from time import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import pygame as pg
+from game.engine.conf import conf
+from game.engine.res import ResourceManager
+from game.engine.gfx.util import Spritemap
+
+REPS = 20
+MODES = ('unpacked', 'packed')
+# (filename, number of sprites) for the game's sprite sheets
+SHEETS = (
+    ('player-hero-walkleft.png', 4), ('player-hero-walkright.png', 4),
+    ('player-villain-walkleft.png', 4), ('player-villain-walkright.png', 4),
+    ('enemy-left.png', 2), ('enemy-right.png', 2), ('goal.png', 6),
+)
+
+
+def rss ():
+    """Get resident memory in KiB."""
+    for l in open('/proc/self/status'):
+        if l.startswith('VmRSS'):
+            return int(l.split()[1])
+
+
+def bench (mode):
+    """Get ``(time, memory, buffers)``: the time to load everything in
+seconds, the memory used in KiB and the number of pixel buffers, per load."""
+    fns = sorted(fn for fn in os.listdir(conf.IMG_DIR) if fn.endswith('.png'))
+    keep = []
+    gc.collect()
+    mem0 = rss()
+    t0 = time()
+    for i in xrange(REPS):
+        rm = ResourceManager()
+        rm.use(conf.DEFAULT_RESOURCE_POOL, 'bench')
+        if mode == 'packed':
+            rm.pack_imgs()
+        sfcs = [rm.img(fn) for fn in fns]
+        for fn, n in SHEETS:
+            sfcs.extend(Spritemap(fn, n, res_mgr=rm))
+        keep.append(sfcs)
+    t = (time() - t0) / REPS
+    buffers = len(set(id(sfc.get_abs_parent()) for sfc in keep[0]))
+    return (t, float(rss() - mem0) / REPS, buffers)
+
+
+if __name__ == '__main__':
+    conf.IMG_DIR = os.path.join(ROOT, 'img') + os.sep
+    if len(sys.argv) > 1:
+        # run one mode
+        pg.display.init()
+        pg.display.set_mode((100, 100))
+        print '{0!r} {1:.0f} {2}'.format(*bench(sys.argv[1]))
+    else:
+        print 'per load, {0} loads'.format(REPS)
+        print '{0:>10} {1:>8} {2:>10} {3:>8}'.format('', 'ms', 'KiB', 'buffers')
+        for mode in MODES:
+            out = subprocess.check_output([sys.executable, __file__, mode])
+            t, mem, buffers = out.split()[-3:]
+            print '{0:>10} {1:>8.2f} {2:>10} {3:>8}'.format(
+                mode, 1e3 * float(t), mem, buffers
+            )
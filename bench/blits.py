@@ -0,0 +1,110 @@
+"""Benchmark: batched blitting in GraphicsManager drawing.
+
+Run from the top-level directory:
+
+    python bench/blits.py
+
+Draws blit-heavy scenes on a 960x540 surface: a grid of tile graphics, redrawn
+in full every frame, and a grid with many small sprites moving around.  Prints
+the time per frame with ``batched`` drawing, where each frame's blits are
+queued by ``Graphic._draw`` and made in one ``Surface.blits`` call, and
+``unbatched``, the original ``_draw`` that called ``Surface.blit`` once per
+rect.  The two are run alternately in the same process, since timings across
+processes vary a lot.
+
+"""
+
+import sys
+import os
+import random
+from time import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pygame as pg
+from game.engine.conf import conf
+from game.engine.sched import Scheduler
+from game.engine.util import blank_sfc
+from game.engine.gfx.container import GraphicsManager
+from game.engine.gfx.graphic import Graphic
+
+SIZE = (960, 540)
+# (tile size, number of sprites, whether to redraw everything)
+SCENES = ((30, 0, True), (15, 0, True), (30, 300, False), (15, 600, False))
+TRIALS = 12
+FRAMES = 10
+
+
+def unbatched_draw (self, dest, rects, offset=(0, 0), blits=None):
+    """The original ``Graphic._draw``, for comparison."""
+    sfc = self._surface
+    blit = dest.blit
+    pr = self._postrot_rect
+    offset = (offset[0] - pr[0], offset[1] - pr[1])
+    for r in rects:
+        blit(sfc, r, r.move(offset), self.blit_flags)
+    self._last_postrot_rect = pr
+    self.last_rect = self._rect
+
+
+DRAWS = (('unbatched', unbatched_draw), ('batched', Graphic._draw.im_func))
+
+
+def scene (tile, n_sprites):
+    """Create a scene; returns ``(manager, sprites, rnd)``."""
+    rnd = random.Random(0)
+    gm = GraphicsManager(Scheduler(60), SIZE)
+    w, h = SIZE
+    gs = []
+    for x in xrange(0, w, tile):
+        for y in xrange(0, h, tile):
+            sfc = pg.Surface((tile, tile)).convert()
+            sfc.fill((rnd.randrange(40), rnd.randrange(40), 60))
+            gs.append(Graphic(sfc, (x, y), layer=2))
+    sprites = []
+    for i in xrange(n_sprites):
+        sfc = blank_sfc((12, 12))
+        pg.draw.ellipse(sfc, (255, 0, 0, 255), sfc.get_rect())
+        pos = (rnd.randrange(w - 20), rnd.randrange(h - 20))
+        sprites.append(Graphic(sfc, pos, layer=-1))
+    gm.add(*gs + sprites)
+    gm.draw()
+    return (gm, sprites, rnd)
+
+
+def bench (gm, sprites, rnd, full):
+    """Get the time per frame in seconds."""
+    t0 = time()
+    for i in xrange(FRAMES):
+        for g in sprites:
+            g.move_by(rnd.randrange(-3, 4), rnd.randrange(-3, 4))
+        if full:
+            gm.dirty()
+        gm.draw()
+    return (time() - t0) / FRAMES
+
+
+if __name__ == '__main__':
+    pg.display.init()
+    pg.display.set_mode(SIZE)
+    # don't bake static layers, so every tile is drawn
+    conf.STATIC_LAYER_FRAMES = None
+    w, h = SIZE
+    print 'time per frame in ms: min/median of {0} trials'.format(TRIALS)
+    print '{0:>26} {1:>14} {2:>14}'.format('', *(name for name, d in DRAWS))
+    for tile, n, full in SCENES:
+        gm, sprites, rnd = scene(tile, n)
+        times = dict((name, []) for name, d in DRAWS)
+        for i in xrange(TRIALS):
+            for name, draw in DRAWS:
+                Graphic._draw = draw
+                times[name].append(1e3 * bench(gm, sprites, rnd, full))
+        Graphic._draw = DRAWS[-1][1]
+        label = '{0}, {1} tiles'.format(
+            'full redraw' if full else '{0} sprites'.format(n),
+            (w // tile) * (h // tile)
+        )
+        print '{0:>26}'.format(label) + ''.join(
+            ' {0:>6.2f}/{1:<7.2f}'.format(min(ts), sorted(ts)[len(ts) // 2])
+            for ts in (times[name] for name, d in DRAWS)
+        )
@@ -0,0 +1,73 @@
+"""Benchmark: the _gm extension module against engine.gfx._gm_fallback.
+
+Run from the top-level directory, after ``make``:
+
+    python bench/fastdraw.py
+
+Times ``fastdraw`` with the scene from ``sprites.py``, and ``mk_disjoint`` on
+random sets of overlapping rects.
+
+"""
+
+import sys
+import os
+import random
+from time import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pygame as pg
+from game.engine.gfx import container, _gm_fallback
+import sprites
+
+RECT_SETS = 1000
+RECT_COUNTS = (10, 50, 200)
+IMPLEMENTATIONS = (
+    ('C', container.fastdraw, container.mk_disjoint),
+    ('python', _gm_fallback.fastdraw, _gm_fallback.mk_disjoint),
+)
+
+
+def bench_fastdraw (fastdraw, moving):
+    """Get the time per frame in seconds with ``moving`` sprites moving."""
+    container.fastdraw = fastdraw
+    return sprites.bench(moving)
+
+
+def bench_mk_disjoint (mk_disjoint, n):
+    """Get the time per call in seconds with ``n`` rects."""
+    rnd = random.Random(0)
+    rect_sets = []
+    for i in xrange(RECT_SETS):
+        rect_sets.append([pg.Rect(rnd.randrange(900), rnd.randrange(500),
+                                  rnd.randrange(1, 60), rnd.randrange(1, 60))
+                          for j in xrange(n)])
+    t0 = time()
+    for rects in rect_sets:
+        mk_disjoint(rects, [])
+    return (time() - t0) / RECT_SETS
+
+
+if __name__ == '__main__':
+    if container.fastdraw is _gm_fallback.fastdraw:
+        sys.exit('_gm is not built')
+    pg.display.init()
+    pg.display.set_mode(sprites.SIZE)
+    names = [name for name, fd, mk in IMPLEMENTATIONS]
+    print 'fastdraw: time per frame in ms, {0} sprites'.format(sprites.SPRITES)
+    print '{0:>8}'.format('moving') + ''.join('{0:>8}'.format(name)
+                                              for name in names)
+    for n in sprites.MOVING:
+        print '{0:>8}'.format(n) + ''.join(
+            '{0:>8.2f}'.format(1e3 * bench_fastdraw(fd, n))
+            for name, fd, mk in IMPLEMENTATIONS
+        )
+    print
+    print 'mk_disjoint: time per call in us'
+    print '{0:>8}'.format('rects') + ''.join('{0:>8}'.format(name)
+                                             for name in names)
+    for n in RECT_COUNTS:
+        print '{0:>8}'.format(n) + ''.join(
+            '{0:>8.1f}'.format(1e6 * bench_mk_disjoint(mk, n))
+            for name, fd, mk in IMPLEMENTATIONS
+        )
@@ -0,0 +1,59 @@
+"""Benchmark: frame pacing jitter of Timer.run.
+
+Run from the top-level directory, preferably on an otherwise idle machine:
+
+    python bench/pacing.py
+
+Runs a :class:`Timer` at 60 FPS for a few seconds, with and without some work
+each frame, and prints :attr:`Timer.frame_stats`.  The target is a standard
+deviation under 0.5ms.  For comparison, ``wait`` is the original pacing, which
+slept for a truncated number of milliseconds.
+
+"""
+
+import sys
+import os
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pygame.time import wait
+from game.engine.sched import Timer, perf_counter
+
+FPS = 60
+SECONDS = 3
+# time spent in the callback each frame, in seconds
+WORK = (0, .005, .012)
+
+
+class WaitTimer (Timer):
+    """Timer with the original pacing, for comparison."""
+
+    def _wait_until (self, t_end):
+        t_left = t_end - perf_counter()
+        if t_left > 0:
+            wait(int(1000 * t_left))
+
+
+def bench (cls, work):
+    """Get ``frame_stats`` after running with the given work per frame."""
+    t = cls(FPS)
+
+    def cb ():
+        t_end = time() + work
+        while time() < t_end:
+            pass
+
+    t.run(cb, seconds=SECONDS)
+    return t.frame_stats
+
+
+if __name__ == '__main__':
+    print 'frame times in ms at {0} FPS, {1}s each'.format(FPS, SECONDS)
+    print '{0:>6} {1:>6} {2:>8} {3:>8} {4:>8} {5:>8}'.format(
+        'work', 'pacing', 'mean', 'stdev', 'min', 'max'
+    )
+    for work in WORK:
+        for name, cls in (('wait', WaitTimer), ('Timer', Timer)):
+            print '{0:>6.1f} {1:>6} {2:>8.3f} {3:>8.3f} {4:>8.3f} {5:>8.3f}' \
+                  .format(1e3 * work, name,
+                          *(1e3 * x for x in bench(cls, work)))
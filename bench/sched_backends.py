@@ -0,0 +1,76 @@
+"""Benchmark: per-frame Scheduler cost for each backend with many active
+timeouts.
+
+Run from the top-level directory:
+
+    python bench/sched_backends.py
+
+Compares the ``'heap'`` and ``'wheel'`` backends with ``dict``, the original
+implementation that scanned every timeout each frame (see ``sched_idle.py``).
+``repeating`` has every timeout repeat every 5 to 30 frames, like animation
+frame timers; ``churn`` has long timeouts with 5% of them replaced each frame,
+like particle lifetimes.
+
+"""
+
+import sys
+import os
+import random
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game.engine.sched import Scheduler
+from sched_idle import ScanScheduler
+
+FRAMES = 100
+COUNTS = (1000, 10000, 50000)
+BACKENDS = (
+    ('dict', ScanScheduler),
+    ('heap', lambda fps: Scheduler(fps, 'heap')),
+    ('wheel', lambda fps: Scheduler(fps, 'wheel')),
+)
+
+
+def bench_repeating (mk, n):
+    """Get the time per frame in seconds with ``n`` repeating timeouts."""
+    s = mk(60)
+    rnd = random.Random(1)
+    cb = lambda: True
+    for i in xrange(n):
+        s.add_timeout(cb, frames=rnd.randint(5, 30))
+    update = s._update
+    t0 = time()
+    for i in xrange(FRAMES):
+        update()
+    return (time() - t0) / FRAMES
+
+
+def bench_churn (mk, n):
+    """Get the time per frame in seconds with ``n`` timeouts, replacing 5% of
+them each frame."""
+    s = mk(60)
+    rnd = random.Random(1)
+    cb = lambda: False
+    new = lambda: s.add_timeout(cb, frames=rnd.randint(100, 3000))
+    ids = [new() for i in xrange(n)]
+    update = s._update
+    t0 = time()
+    for i in xrange(FRAMES):
+        for j in xrange(n // 20):
+            k = rnd.randrange(n)
+            s.rm_timeout(ids[k])
+            ids[k] = new()
+        update()
+    return (time() - t0) / FRAMES
+
+
+if __name__ == '__main__':
+    print 'time per frame in ms, {0} frames'.format(FRAMES)
+    print '{0:>10} {1:>8}'.format('', 'timeouts') + ''.join(
+        '{0:>10}'.format(name) for name, mk in BACKENDS
+    )
+    for bench in (bench_repeating, bench_churn):
+        for n in COUNTS:
+            print '{0:>10} {1:>8}'.format(bench.__name__[6:], n) + ''.join(
+                '{0:>10.2f}'.format(1e3 * bench(mk, n)) for name, mk in BACKENDS
+            )
@@ -0,0 +1,89 @@
+"""Benchmark: per-frame Scheduler cost with many idle timeouts.
+
+Run from the top-level directory:
+
+    python bench/sched_idle.py
+
+Each run adds some timeouts that won't fire during the benchmark, plus one that
+fires every frame, and times ``Scheduler._update`` over a number of frames.
+``Scheduler`` only looks at timeouts as they become due, so its cost should
+stay flat as the number of idle timeouts grows.  For comparison, ``scan`` is the
+original implementation, which decremented every timeout's counter every frame.
+
+"""
+
+import sys
+import os
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game.engine.sched import Scheduler
+
+FRAMES = 1000
+COUNTS = (0, 100, 1000, 10000)
+
+
+class ScanScheduler (object):
+    """The original Scheduler timeout handling, for comparison."""
+
+    def __init__ (self, fps=60):
+        self.frame = 1. / fps
+        # {ident: [seconds, frames, repeat_seconds, repeat_frames, active, cb]}
+        self._cbs = {}
+        self._max_id = 0
+
+    def add_timeout (self, cb, seconds=None, frames=None):
+        self._cbs[self._max_id] = [seconds, frames, seconds, frames, True, cb]
+        self._max_id += 1
+        return self._max_id - 1
+
+    def rm_timeout (self, *ids):
+        for i in ids:
+            self._cbs.pop(i, None)
+
+    def _update (self):
+        cbs = self._cbs
+        frame = self.frame
+        for i, data in cbs.items():
+            if i not in cbs:
+                continue
+            if data[0] is not None:
+                remain = 0
+                dt = frame
+            else:
+                remain = 1
+                dt = 1
+            if data[4]:
+                data[remain] -= dt
+                if data[remain] <= 0:
+                    if data[5]():
+                        total = data[2] is None
+                        data[total] += data[total + 2]
+                    elif i in cbs:
+                        del cbs[i]
+
+
+def bench (cls, n):
+    """Get the time per frame in seconds with ``n`` idle timeouts."""
+    s = cls(60)
+    for i in xrange(n):
+        # half frame-based, half seconds-based
+        if i % 2:
+            s.add_timeout(lambda: None, frames=10 * FRAMES + i)
+        else:
+            s.add_timeout(lambda: None, seconds=100 + i)
+    s.add_timeout(lambda: True, frames=1)
+    update = s._update
+    t0 = time()
+    for i in xrange(FRAMES):
+        update()
+    return (time() - t0) / FRAMES
+
+
+if __name__ == '__main__':
+    print 'time per frame in us, {0} frames'.format(FRAMES)
+    print '{0:>8} {1:>10} {2:>10}'.format('idle', 'scan', 'Scheduler')
+    for n in COUNTS:
+        print '{0:>8} {1:>10.1f} {2:>10.1f}'.format(
+            n, 1e6 * bench(ScanScheduler, n), 1e6 * bench(Scheduler, n)
+        )
@@ -0,0 +1,84 @@
+"""Benchmark: scrolling a GraphicsManager across a level 10 screens wide.
+
+Run from the top-level directory:
+
+    python bench/scrolling.py
+
+Scrolls the camera (:attr:`GraphicsManager.offset`) steadily across a 960x540
+view of a level with a background image and 2000 sprites, 20 of which move each
+frame, and prints the mean and worst time per frame.  ``scroll`` is the normal
+behaviour, which reuses the current frame and draws only newly visible areas;
+``full`` dirties the whole surface every frame, for comparison.  With
+``parallax``, the background moves at half speed.
+
+"""
+
+import sys
+import os
+import random
+from time import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pygame as pg
+from game.engine.sched import Scheduler
+from game.engine.gfx.container import GraphicsManager
+from game.engine.gfx.graphic import Graphic
+
+SIZE = (960, 540)
+SCREENS = 10
+SPRITES = 2000
+MOVING = 20
+FRAMES = 200
+# camera speed in pixels per frame
+SPEED = 4.5
+
+
+def bench (full, parallax):
+    """Get ``(mean, max)`` time per frame in seconds."""
+    rnd = random.Random(0)
+    gm = GraphicsManager(Scheduler(60), SIZE)
+    w, h = SIZE
+    w *= SCREENS
+    bg = pg.Surface((w, h))
+    bg.fill((20, 20, 40))
+    for i in xrange(300):
+        pg.draw.circle(bg, (rnd.randrange(256), 90, 90),
+                       (rnd.randrange(w), rnd.randrange(h)),
+                       rnd.randrange(5, 40))
+    gs = []
+    for i in xrange(SPRITES):
+        sfc = pg.Surface((16, 16))
+        sfc.fill((rnd.randrange(256), 0, 0))
+        gs.append(Graphic(sfc, (rnd.randrange(w - 16), rnd.randrange(h - 16)),
+                          layer=rnd.randrange(3)))
+    gm.add(Graphic(bg, (0, 0), layer=5), *gs)
+    if parallax:
+        gm.parallax = {5: .5}
+    gm.draw()
+    times = []
+    for i in xrange(FRAMES):
+        t0 = time()
+        gm.offset = (i * SPEED, 0)
+        for g in gs[:MOVING]:
+            g.pos = (rnd.randrange(w - 16), rnd.randrange(h - 16))
+        if full:
+            gm.dirty()
+        gm.draw()
+        times.append(time() - t0)
+    return (sum(times) / FRAMES, max(times))
+
+
+if __name__ == '__main__':
+    pg.display.init()
+    pg.display.set_mode(SIZE)
+    print 'time per frame in ms, {0} frames'.format(FRAMES)
+    print '{0:>12} {1:>8} {2:>8} {3:>8} {4:>8}'.format(
+        '', 'scroll', '', 'full', ''
+    )
+    print '{0:>12} {1:>8} {2:>8} {1:>8} {2:>8}'.format('', 'mean', 'max')
+    for parallax in (False, True):
+        print '{0:>12}'.format('parallax' if parallax else 'no parallax') + \
+            ''.join(' {0:>8.2f} {1:>8.2f}'.format(*(1e3 * t for t in
+                                                    bench(full, parallax)))
+                    for full in (False, True))
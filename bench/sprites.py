@@ -0,0 +1,61 @@
+"""Benchmark: GraphicsManager drawing with many sprites, few of them moving.
+
+Run from the top-level directory:
+
+    python bench/sprites.py
+
+Draws 2000 16x16 sprites in 4 layers on a 960x540 surface, moving some of them
+to random positions each frame, and prints the time per frame.  Drawing only
+looks at the graphics the spatial index finds near each dirty rect, so the time
+should depend on the number of moving sprites much more than the total.
+
+"""
+
+import sys
+import os
+import random
+from time import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pygame as pg
+from game.engine.sched import Scheduler
+from game.engine.gfx.container import GraphicsManager
+from game.engine.gfx.graphic import Graphic
+
+SIZE = (960, 540)
+SPRITES = 2000
+FRAMES = 100
+MOVING = (0, 10, 100)
+
+
+def bench (moving):
+    """Get the time per frame in seconds with ``moving`` sprites moving."""
+    rnd = random.Random(0)
+    gm = GraphicsManager(Scheduler(60), SIZE)
+    w, h = SIZE
+    gs = []
+    for i in xrange(SPRITES):
+        sfc = pg.Surface((16, 16))
+        sfc.fill((rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)))
+        gs.append(Graphic(sfc, (rnd.randrange(w - 16), rnd.randrange(h - 16)),
+                          layer=rnd.randrange(4)))
+    gm.add(*gs)
+    gm.draw()
+    movers = gs[:moving]
+    t0 = time()
+    for i in xrange(FRAMES):
+        for g in movers:
+            g.pos = (rnd.randrange(w - 16), rnd.randrange(h - 16))
+        gm.draw()
+    return (time() - t0) / FRAMES
+
+
+if __name__ == '__main__':
+    pg.display.init()
+    pg.display.set_mode(SIZE)
+    print 'time per frame in ms, {0} sprites, {1} frames'.format(SPRITES,
+                                                                 FRAMES)
+    print '{0:>8} {1:>8}'.format('moving', 'time')
+    for n in MOVING:
+        print '{0:>8} {1:>8.2f}'.format(n, 1e3 * bench(n))
@@ -39,8 +39,12 @@ class Conf (object):
     SEEK_TIME = 150
 
     # timing/cutscenes
+    # fades update at FADE_SLOW times the frame rate, and are skipped when
+    # ALLOW_FADES is False; worlds lower these from QUALITY_FADE_SLOW when
+    # drawing is slow (0 disables fades)
     ALLOW_FADES = True
     FADE_SLOW = 1
+    QUALITY_FADE_SLOW = (1, .8, .6, .4, .2, 0)
     START_FADE_IN = (1,)
     DIE_FADE_OUT = (1, (255, 255, 255))
     DIE_TIME = 1.5
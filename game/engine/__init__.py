@@ -1,11 +1,11 @@
 import pygame as pg
 
-from . import game, sched, evt, gfx, text, util, settings
+from . import game, sched, evt, gfx, text, util, settings, quality
 from .conf import conf
 
 __all__ = ('conf', 'init', 'quit')
 
-pg.mixer.pre_init(buffer = 1024)
+pg.mixer.pre_init(**conf.MIXER_PRE_INIT)
 
 
 def init ():
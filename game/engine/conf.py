@@ -47,9 +47,25 @@ class Conf (object):
     IDENT = 'game'
     DEBUG = False
     FPS = dd(60) # per-world
+    # per-world; only smooth if the world draws interpolated with Timer.alpha
+    FIXED_STEP = dd(False)
     DROP_FRAMES = True
     MIN_FPS = dd(25) # per-world
     FPS_AVERAGE_RATIO = .3
+    # seconds to busy-wait at the end of each frame after sleeping, on top of
+    # the learned amount the OS oversleeps by
+    PACING_SPIN = .001
+    PACING_STATS_FRAMES = 120 # number of frames to compute jitter over
+    PROFILE_SAMPLES = 600 # per-callback running times kept when profiling
+    WORKER_THREADS = 2 # for Scheduler.submit
+    # quality.QualityGovernor: fraction of a frame that updating and drawing
+    # may take before quality is lowered (None to never change it), fraction of
+    # that below which quality is raised again, and the number of drawn frames
+    # each must persist for
+    QUALITY_BUDGET = dd(.9) # per-world
+    QUALITY_HEADROOM = .6
+    QUALITY_DOWN_FRAMES = 15
+    QUALITY_UP_FRAMES = 300
 
     # paths
     # need to take care to get unicode path
@@ -92,6 +108,20 @@ class Conf (object):
     RES_F = None
     MIN_RES_W = (320, 180)
     ASPECT_RATIO = None
+    # when simplifying lists of dirty rects: fraction of a merged rect's area
+    # that may be outside the original rects, and maximum number of rects
+    DIRTY_WASTE = .3
+    DIRTY_MAX_RECTS = 60
+    # GraphicsManager flattens consecutive layers into one surface once they've
+    # been unchanged for this many frames (None to disable), if the surface
+    # would have at most this many pixels
+    STATIC_LAYER_FRAMES = 30
+    STATIC_LAYER_MAX_AREA = 8000000
+    # animations show at most MAX_ANIMATION_FPS frames per second, skipping
+    # frames to keep time (None for no limit); worlds' quality governors set
+    # this from QUALITY_ANIMATION_FPS, highest quality first
+    MAX_ANIMATION_FPS = None
+    QUALITY_ANIMATION_FPS = (None, 15, 8)
 
     # input
     GRAB_EVENTS = dd(False)
@@ -109,6 +139,7 @@ button _game_fullscreen DOWN
 '''
 
     # audio
+    MIXER_PRE_INIT = {'buffer': 1024} # pygame.mixer.pre_init arguments
     VOLUME_SCALING = 2 # 0 is linear
     MUSIC = find_music(MUSIC_DIR)
     MUSIC_AUTOPLAY = dd(False) # False just pauses music; per-world
@@ -123,6 +154,12 @@ button _game_fullscreen DOWN
 
     # resources
     DEFAULT_RESOURCE_POOL = 'global'
+    # whether to load all images in IMG_DIR on startup, packed into surfaces of
+    # up to IMG_ATLAS_SIZE
+    PACK_IMGS = False
+    IMG_ATLAS_SIZE = (1024, 1024)
+    # maximum size in bytes of transformed surfaces shared between graphics
+    TRANSFORM_CACHE_SIZE = 32 * 1024 * 1024
     # per-world, each {name: renderer}, where renderer is TextRenderer,
     # (font_filename, options) or just font_filename
     TEXT_RENDERERS = dd({})
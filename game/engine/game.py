@@ -15,24 +15,41 @@ import pygame as pg
 from pygame.display import update as update_display
 
 from .conf import conf
-from .sched import Scheduler
+from .sched import Scheduler, perf_counter
+from .quality import QualityGovernor, Knob
 from . import evt, gfx, res, text
-from .util import ir, convert_sfc
+from .util import ir, convert_sfc, merge_rects
 
 
 def run (*args, **kwargs):
     """Run the game.
 
-Takes the same arguments as :class:`Game`, with an optional keyword-only
-argument ``t`` to run for this many seconds.
+Takes the same arguments as :class:`Game`, with optional keyword-only arguments
+``t``, ``frames`` and ``headless`` as taken by :meth:`Game.run`, and ``audio``.
+If ``headless`` is ``True``, SDL's dummy video driver is used; if ``audio`` is
+``False`` (defaults to ``True``), SDL's dummy audio driver is used, so nothing
+is heard.
 
 """
     t = kwargs.pop('t', None)
+    frames = kwargs.pop('frames', None)
+    headless = kwargs.pop('headless', False)
+    audio = kwargs.pop('audio', True)
+    if headless:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        pg.display.quit()
+        pg.display.init()
+    if not audio:
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        # restart with the new driver and the usual settings
+        pg.mixer.quit()
+        pg.mixer.pre_init(**conf.MIXER_PRE_INIT)
+        pg.mixer.init()
     global restarting
     restarting = True
     while restarting:
         restarting = False
-        Game(*args, **kwargs).run(t)
+        Game(*args, **kwargs).run(t, frames, headless)
 
 
 class _ClassProperty (property):
@@ -88,6 +105,13 @@ World(scheduler, evthandler)
         #: ``set`` of :class:`Entity <engine.entity.Entity>` instances in this
         #: world.
         self.entities = set()
+        #: :class:`quality.QualityGovernor <engine.quality.QualityGovernor>`
+        #: instance that lowers settings when this world can't keep up.  It
+        #: starts with a knob for :data:`conf.MAX_ANIMATION_FPS`; add more in
+        #: :meth:`init`.
+        self.quality = QualityGovernor(scheduler, conf.QUALITY_BUDGET[self.id])
+        self.quality.add(Knob('animation FPS', conf.QUALITY_ANIMATION_FPS,
+                              self._set_max_animation_fps))
 
         self._initialised = False
         self._extra_args = (args, kwargs)
@@ -137,6 +161,8 @@ This receives the extra arguments passed in constructing the world through the
 
     def _select (self):
         """Called by the game when becomes the active world."""
+        # settings may have been changed by another world's knobs
+        self.quality.apply()
         ident = self.id
         pg.event.set_grab(conf.GRAB_EVENTS[ident])
         pg.mouse.set_visible(conf.MOUSE_VISIBLE[ident])
@@ -161,6 +187,9 @@ This receives the extra arguments passed in constructing the world through the
         """Called every frame to makes any necessary changes."""
         pass
 
+    def _set_max_animation_fps (self, fps):
+        conf.MAX_ANIMATION_FPS = fps
+
     def _update (self):
         """Called by the game to update."""
         for e in self.entities:
@@ -174,6 +203,11 @@ This receives the extra arguments passed in constructing the world through the
         if elapsed is None:
             # haven't completed a frame yet
             return True
+        if s.fixed_step:
+            # the scheduler catches up on updates and only asks us to draw
+            # once per frame, so always draw
+            self._avg_draw_time = s.current_frame_time
+            return True
         frame_t = s.current_frame_time
         target_t = s.frame
         # compute rolling frame average for drawing, but don't store it just
@@ -209,7 +243,10 @@ This receives the extra arguments passed in constructing the world through the
          updated, else a list of rects to update the display in.
 
 This method should not change the state of the world, because it is not
-guaranteed to be called every frame.
+guaranteed to be called every frame.  If :data:`conf.FIXED_STEP` is set for
+this world, the world may be updated more than once between draws, and
+:attr:`Timer.alpha <engine.sched.Timer.alpha>` of :attr:`scheduler` can be used
+to interpolate between the last two updates.
 
 """
         dirty = self.display.draw(False)
@@ -536,6 +573,8 @@ Takes the same arguments as :meth:`create_world` and passes them to it.
         conf.GAME = self
         conf.RES_F = pg.display.list_modes()[0]
         self._quit = False
+        #: Whether the game is running headless (see :meth:`run`).
+        self.headless = False
         self._update_again = False
         #: The currently running world.
         self.world = None
@@ -551,6 +590,8 @@ Takes the same arguments as :meth:`create_world` and passes them to it.
         self.resources = res.ResourceManager()
         self.resources.use(conf.DEFAULT_RESOURCE_POOL, self)
         self._using_pool = conf.DEFAULT_RESOURCE_POOL
+        if conf.PACK_IMGS:
+            self.resources.pack_imgs()
         #: ``{name: renderer}`` dict of
         #: :class:`text.TextRenderer <engine.text.TextRenderer>` instances
         #: available for referral by name in the ``'text'`` resource loader.
@@ -623,6 +664,7 @@ should be passed to that base class).
         # instantiate class
         world = cls(scheduler, eh, self.resources, *args, **kwargs)
         scheduler.fps = conf.FPS[world.id]
+        scheduler.fixed_step = conf.FIXED_STEP[world.id]
         return world
 
     def _select_world (self, world):
@@ -666,7 +708,11 @@ to create a new one.
 """
         if not isinstance(world, World):
             world = self.create_world(world, *args, **kwargs)
+        old_world = self.world
         self._select_world(world)
+        if old_world is not None and old_world not in self.worlds:
+            # ended
+            old_world.scheduler.cancel_jobs()
         return world
 
     def get_worlds (self, ident, current = True):
@@ -704,6 +750,7 @@ If this quits the last (root) world, exit the game.
             return []
         old_world = self.world
         old_world.quit()
+        old_world.scheduler.cancel_jobs()
         if self.worlds:
             self._select_world(self.worlds.pop())
         else:
@@ -760,7 +807,7 @@ If this quits the last (root) world, exit the game.
         self.refresh_display()
 
     def _update (self):
-        """Update worlds and draw."""
+        """Update worlds."""
         self._update_again = True
         while self._update_again:
             self._update_again = False
@@ -768,34 +815,62 @@ If this quits the last (root) world, exit the game.
             # if a new world was created during the above call, we'll end up
             # updating twice before drawing
             if not self._update_again:
-                self.world._update()
-        if self.world._handle_slowdown():
-            drawn = self.world.draw()
+                world = self.world
+                t = perf_counter()
+                world._update()
+                if not self.headless:
+                    world.quality.record_update(perf_counter() - t)
+        return True
+
+    def _draw (self):
+        """Draw the current world, if it wants to draw this frame."""
+        world = self.world
+        if world._handle_slowdown():
+            t = perf_counter()
+            drawn = world.draw()
             # update display
+            if self.headless:
+                # no display to update, and frames aren't paced, so don't
+                # adjust quality either
+                return
             if drawn is True:
                 update_display()
             elif drawn:
-                if len(drawn) > 60: # empirical - faster to update everything
-                    update_display()
-                else:
-                    update_display(drawn)
-        return True
+                update_display(merge_rects(drawn))
+            world.quality.record_draw(perf_counter() - t)
 
     # running
 
-    def run (self, t = None):
+    def run (self, t = None, frames = None, headless = False):
         """Main loop.
 
-run([t])
+run([t][, frames], headless = False)
 
 :arg t: stop after this many seconds (else run forever).
+:arg frames: stop after this many frames; ignored if ``t`` is given.
+:arg headless: whether to run as fast as possible, without waiting between
+               frames or updating the display.  Schedulers use a virtual clock
+               (see :attr:`Timer.virtual <engine.sched.Timer.virtual>`), so
+               ``t`` is in game time rather than real time.  This is for
+               testing and benchmarking; to avoid opening a window, also use
+               SDL's dummy video driver (the module-level :func:`run` does
+               this).
 
 """
         self.resources.use(conf.DEFAULT_RESOURCE_POOL, self)
         self._using_pool = conf.DEFAULT_RESOURCE_POOL
         self._init_cbs()
-        while not self._quit and (t is None or t > 0):
-            t = self.world.scheduler.run(seconds = t)
+        self.headless = headless
+        if t is not None:
+            frames = None
+        while (not self._quit and (t is None or t > 0) and
+               (frames is None or frames > 0)):
+            s = self.world.scheduler
+            s.virtual = headless
+            if frames is None:
+                t = s.run(seconds = t, draw = self._draw)
+            else:
+                frames = s.run(frames = frames, draw = self._draw)
         self.resources.drop(conf.DEFAULT_RESOURCE_POOL, self)
         self._using_pool = None
         conf.rm_cbs(self)
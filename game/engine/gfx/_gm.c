@@ -40,30 +40,79 @@ void quicksort (int *arr, int elements) {
     }
 }
 
-int find (int *arr, int n, int x, int i) {
-    for (; i < n; i++) {
-        if (arr[i] == x) return i;
+int cmp_span (const void* a, const void* b) {
+    // compare [x0, x1) spans by x0
+    return ((int*) a)[0] - ((int*) b)[0];
+}
+
+int cmp_top (const void* a, const void* b) {
+    // compare (x0, x1, y0, y1, add) rects by y0
+    return ((int*) a)[2] - ((int*) b)[2];
+}
+
+int union_spans (int* spans, int n) {
+    // sort [x0, x1) spans and merge overlapping or touching ones, in place;
+    // returns the new number of spans
+    int i, m = 0;
+    if (n == 0) return 0;
+    qsort(spans, n, 2 * sizeof(int), cmp_span);
+    for (i = 1; i < n; i++) {
+        if (spans[2 * i] <= spans[2 * m + 1]) {
+            if (spans[2 * i + 1] > spans[2 * m + 1])
+                spans[2 * m + 1] = spans[2 * i + 1];
+        } else {
+            m++;
+            spans[2 * m] = spans[2 * i];
+            spans[2 * m + 1] = spans[2 * i + 1];
+        }
     }
-    return -1;
+    return m + 1;
 }
 
-int set_add (int *arr, int n, int x) {
-    int i;
-    for (i = 0; i < n; i++) {
-        if (arr[i] == x) return 0;
+int subtract_spans (int* add, int n_add, int* rm, int n_rm, int* out) {
+    // add and rm are sorted, disjoint spans; puts add minus rm in out and
+    // returns the number of spans in it
+    int i, j = 0, k, n = 0, x0, x1;
+    for (i = 0; i < n_add; i++) {
+        x0 = add[2 * i];
+        x1 = add[2 * i + 1];
+        while (j < n_rm && rm[2 * j + 1] <= x0) j++;
+        for (k = j; k < n_rm && rm[2 * k] < x1; k++) {
+            if (rm[2 * k] > x0) {
+                out[2 * n] = x0;
+                out[2 * n++ + 1] = rm[2 * k];
+            }
+            if (rm[2 * k + 1] > x0) x0 = rm[2 * k + 1];
+        }
+        if (x0 < x1) {
+            out[2 * n] = x0;
+            out[2 * n++ + 1] = x1;
+        }
     }
-    arr[n] = x;
-    return 1;
+    return n;
+}
+
+void close_rect (PyObject* rs, int* open, int y1) {
+    // add a rect to rs ending at y1; open is (x0, x1, y0)
+    PyObject* r_o;
+    // NOTE: ref[+1]
+    r_o = PyRect_New4(open[0], open[2], open[1] - open[0], y1 - open[2]);
+    PyList_Append(rs, r_o);
+    Py_DECREF(r_o); // NOTE: ref[-1]
 }
 
 PyObject* mk_disjoint (PyObject* add, PyObject* rm) {
     // both arguments are [pygame.Rect]
-    int n_rects[2], n_edges[2], i, j, k, l, row0, row1, col0, col1, in_rect,
-        r_i, r_left;
+    // sweep down through the bands between horizontal rect edges, working out
+    // the spans covered in each band, and extend each rect down while its span
+    // stays the same
+    int n_rects[2], n, n_ys, i, j, k, b, y0, n_active, n_add, n_rm, n_spans,
+        n_open, n_new_open;
     PyRectObject** rects[2];
     GAME_Rect r;
-    int* edges[2], * grid;
-    PyObject* r_o, * rs;
+    int* data, * ys, * active, * add_spans, * rm_spans, * spans, * open,
+       * new_open, * tmp;
+    PyObject* rs;
     // turn into arrays
     add = PySequence_Fast(add, "expected list"); // NOTE: ref[+1]
     rm = PySequence_Fast(rm, "expected list"); // NOTE: ref[+2]
@@ -71,129 +120,206 @@ PyObject* mk_disjoint (PyObject* add, PyObject* rm) {
     n_rects[1] = PySequence_Fast_GET_SIZE(rm);
     rects[0] = (PyRectObject**) PySequence_Fast_ITEMS(add);
     rects[1] = (PyRectObject**) PySequence_Fast_ITEMS(rm);
-    // get edges
-    n_edges[0] = 0;
-    n_edges[1] = 0;
-    i = 2 * (n_rects[0] + n_rects[1]); // max number of edges
-    edges[0] = PyMem_New(int, i);
-    edges[1] = PyMem_New(int, i); // NOTE: alloc[+1]
-    for (i = 0; i < 2; i++) { // rects
-        for (j = 0; j < n_rects[i]; j++) { // add|rm
-            r = rects[i][j]->r;
-            n_edges[0] += set_add(edges[0], n_edges[0], r.x);
-            n_edges[0] += set_add(edges[0], n_edges[0], r.x + r.w);
-            n_edges[1] += set_add(edges[1], n_edges[1], r.y);
-            n_edges[1] += set_add(edges[1], n_edges[1], r.y + r.h);
-        }
-    }
-    // sort edges
-    quicksort(edges[0], n_edges[0]);
-    quicksort(edges[1], n_edges[1]);
-    // generate grid of (rows of) subrects and mark contents
-    // each has 2 if add, 1 if rm
-    i = (n_edges[0] - 1) * (n_edges[1] - 1);
-    grid = PyMem_New(int, i); // NOTE: alloc[+2]
-    for (j = 0; j < i; j++) grid[j] = 0;
+    rs = PyList_New(0); // NOTE: ref[+3]
+    // get non-empty rects as (x0, x1, y0, y1, add), and their edges
+    n = n_rects[0] + n_rects[1];
+    data = PyMem_New(int, 5 * n + 1); // NOTE: alloc[+1]
+    ys = PyMem_New(int, 2 * n + 1); // NOTE: alloc[+2]
+    n = 0;
+    n_ys = 0;
     for (i = 0; i < 2; i++) { // add|rm
         for (j = 0; j < n_rects[i]; j++) { // rects
             r = rects[i][j]->r;
             if (r.w > 0 && r.h > 0) {
-                row0 = find(edges[1], n_edges[1], r.y, 0);
-                row1 = find(edges[1], n_edges[1], r.y + r.h, row0);
-                col0 = find(edges[0], n_edges[0], r.x, 0);
-                col1 = find(edges[0], n_edges[0], r.x + r.w, col0);
-                for (k = row0; k < row1; k++) { // rows
-                    for (l = col0; l < col1; l++) { // cols
-                        if (i == 0) // add
-                            grid[(n_edges[0] - 1) * k + l] |= 2;
-                        else // rm (i == 1)
-                            grid[(n_edges[0] - 1) * k + l] |= 1;
-                    }
-                }
+                data[5 * n] = r.x;
+                data[5 * n + 1] = r.x + r.w;
+                data[5 * n + 2] = r.y;
+                data[5 * n + 3] = r.y + r.h;
+                data[5 * n + 4] = i == 0;
+                n++;
+                ys[n_ys++] = r.y;
+                ys[n_ys++] = r.y + r.h;
             }
         }
     }
-    // generate subrects
-    rs = PyList_New(0);
-    in_rect = 0;
-    // suppress compiler warnings (we know these will be assigned before use)
-    r_i = r_left = 0;
-    for (i = 0; i < n_edges[1] - 1; i++) { // rows
-        for (j = 0; j < n_edges[0] - 1; j++) { // cols
-            if (in_rect && i != r_i) {
-                // on a different row: rect ended
-                in_rect = 0;
-                k = edges[1][r_i];
-                // NOTE: ref[+3]
-                r_o = PyRect_New4(r_left, k, edges[0][n_edges[0] - 1] - r_left,
-                                  edges[1][r_i + 1] - k);
-                PyList_Append(rs, r_o);
-                Py_DECREF(r_o); // NOTE: ref[-3]
+    if (n == 0) goto end;
+    qsort(data, n, 5 * sizeof(int), cmp_top);
+    quicksort(ys, n_ys);
+    for (i = 1, j = 0; i < n_ys; i++) {
+        if (ys[i] != ys[j]) ys[++j] = ys[i];
+    }
+    n_ys = j + 1;
+
+    active = PyMem_New(int, n); // NOTE: alloc[+3]
+    add_spans = PyMem_New(int, 2 * n); // NOTE: alloc[+4]
+    rm_spans = PyMem_New(int, 2 * n); // NOTE: alloc[+5]
+    spans = PyMem_New(int, 2 * n); // NOTE: alloc[+6]
+    open = PyMem_New(int, 3 * n); // NOTE: alloc[+7]
+    new_open = PyMem_New(int, 3 * n); // NOTE: alloc[+8]
+    n_active = 0;
+    n_open = 0;
+    k = 0; // next rect to become active
+    for (b = 0; b < n_ys - 1; b++) { // bands
+        y0 = ys[b];
+        // drop rects that ended, and add those that start in this band
+        for (i = 0, j = 0; i < n_active; i++) {
+            if (data[5 * active[i] + 3] > y0) active[j++] = active[i];
+        }
+        n_active = j;
+        while (k < n && data[5 * k + 2] == y0) active[n_active++] = k++;
+        // get covered spans
+        n_add = 0;
+        n_rm = 0;
+        for (i = 0; i < n_active; i++) {
+            j = 5 * active[i];
+            if (data[j + 4]) {
+                add_spans[2 * n_add] = data[j];
+                add_spans[2 * n_add++ + 1] = data[j + 1];
+            } else {
+                rm_spans[2 * n_rm] = data[j];
+                rm_spans[2 * n_rm++ + 1] = data[j + 1];
             }
-            if (grid[(n_edges[0] - 1) * i + j] == 2) { // add and not rm
-                if (!in_rect) {
-                    in_rect = 1;
-                    r_i = i;
-                    r_left = edges[0][j];
-                }
-            } else if (in_rect) {
-                // rect ended
-                in_rect = 0;
-                k = edges[1][r_i];
-                // NOTE: ref[+3]
-                r_o = PyRect_New4(r_left, k, edges[0][j] - r_left,
-                                  edges[1][r_i + 1] - k);
-                PyList_Append(rs, r_o);
-                Py_DECREF(r_o); // NOTE: ref[-3]
+        }
+        n_add = union_spans(add_spans, n_add);
+        n_rm = union_spans(rm_spans, n_rm);
+        n_spans = subtract_spans(add_spans, n_add, rm_spans, n_rm, spans);
+        // extend open rects with the same span, and close the rest; both are
+        // sorted and disjoint
+        n_new_open = 0;
+        j = 0;
+        for (i = 0; i < n_open; i++) { // open
+            while (j < n_spans && spans[2 * j] < open[3 * i]) {
+                new_open[3 * n_new_open] = spans[2 * j];
+                new_open[3 * n_new_open + 1] = spans[2 * j + 1];
+                new_open[3 * n_new_open++ + 2] = y0;
+                j++;
             }
+            if (j < n_spans && spans[2 * j] == open[3 * i] &&
+                spans[2 * j + 1] == open[3 * i + 1]) {
+                new_open[3 * n_new_open] = open[3 * i];
+                new_open[3 * n_new_open + 1] = open[3 * i + 1];
+                new_open[3 * n_new_open++ + 2] = open[3 * i + 2];
+                j++;
+            } else close_rect(rs, open + 3 * i, y0);
         }
+        for (; j < n_spans; j++) {
+            new_open[3 * n_new_open] = spans[2 * j];
+            new_open[3 * n_new_open + 1] = spans[2 * j + 1];
+            new_open[3 * n_new_open++ + 2] = y0;
+        }
+        tmp = open;
+        open = new_open;
+        new_open = tmp;
+        n_open = n_new_open;
     }
-    if (in_rect) {
-        // last rect ended
-        k = edges[1][r_i];
-        // NOTE: ref[+3]
-        r_o = PyRect_New4(r_left, k, edges[0][n_edges[0] - 1] - r_left,
-                          edges[1][r_i + 1] - k);
-        PyList_Append(rs, r_o);
-        Py_DECREF(r_o); // NOTE: ref[-3]
-    }
+    for (i = 0; i < n_open; i++) close_rect(rs, open + 3 * i, ys[n_ys - 1]);
+    PyMem_Free(new_open); // NOTE: alloc[-8]
+    PyMem_Free(open); // NOTE: alloc[-7]
+    PyMem_Free(spans); // NOTE: alloc[-6]
+    PyMem_Free(rm_spans); // NOTE: alloc[-5]
+    PyMem_Free(add_spans); // NOTE: alloc[-4]
+    PyMem_Free(active); // NOTE: alloc[-3]
+end:
     // cleanup
-    PyMem_Free(grid); // NOTE: alloc[-2]
-    PyMem_Free(edges[0]);
-    PyMem_Free(edges[1]); // NOTE: alloc[-1]
+    PyMem_Free(ys); // NOTE: alloc[-2]
+    PyMem_Free(data); // NOTE: alloc[-1]
     Py_DECREF(rm); // NOTE: ref[-2]
     Py_DECREF(add); // NOTE: ref[-1]
-    return rs;
+    return rs; // NOTE: ref[-3]
+}
+
+int clip_rect (GAME_Rect* a, GAME_Rect* b) {
+    // clip a to b in place; returns whether the result is non-empty
+    int x0 = a->x > b->x ? a->x : b->x,
+        y0 = a->y > b->y ? a->y : b->y,
+        x1 = a->x + a->w < b->x + b->w ? a->x + a->w : b->x + b->w,
+        y1 = a->y + a->h < b->y + b->h ? a->y + a->h : b->y + b->h;
+    if (x1 <= x0 || y1 <= y0) return 0;
+    a->x = x0;
+    a->y = y0;
+    a->w = x1 - x0;
+    a->h = y1 - y0;
+    return 1;
+}
+
+PyObject* new_rect (GAME_Rect* r, int dx, int dy) {
+    // create a pygame.Rect from r moved by (dx, dy)
+    return PyRect_New4(r->x + dx, r->y + dy, r->w, r->h);
+}
+
+int blit_all (PyObject* sfc, PyObject* blits) {
+    // perform a list of blits (argument tuples for Surface.blit) to sfc, in
+    // one call if pygame supports it; returns 0 on error
+    PyObject* fn, * r_o;
+    int i, n;
+    fn = PyObject_GetAttrString(sfc, "blits"); // NOTE: ref[+1]
+    if (fn != NULL) {
+        // NOTE: ref[+2]
+        r_o = PyObject_CallFunctionObjArgs(fn, blits, Py_False, NULL);
+        Py_DECREF(fn); // NOTE: ref[-1]
+        if (r_o == NULL) return 0;
+        Py_DECREF(r_o); // NOTE: ref[-2]
+        return 1;
+    }
+    // older pygame: blit one at a time
+    PyErr_Clear();
+    fn = PyObject_GetAttrString(sfc, "blit"); // NOTE: ref[+1]
+    if (fn == NULL) return 0;
+    n = PyList_GET_SIZE(blits);
+    for (i = 0; i < n; i++) {
+        // NOTE: ref[+2]
+        r_o = PyObject_CallObject(fn, PyList_GET_ITEM(blits, i));
+        if (r_o == NULL) {
+            Py_DECREF(fn); // NOTE: ref[-1]
+            return 0;
+        }
+        Py_DECREF(r_o); // NOTE: ref[-2]
+    }
+    Py_DECREF(fn); // NOTE: ref[-1]
+    return 1;
 }
 
 PyObject* fastdraw (PyObject* self, PyObject* args) {
     // don't do much error checking because the point of this is performance
     // and we own the class calling this; guaranteed to get
-    // [obj], pygame.Surface, {obj: set(Graphic)}, [pygame.Rect]
-    // and layers is sorted
-    PyObject* layers_in, * sfc, * graphics_in, * dirty;
+    // [obj], pygame.Surface, {obj: set(Graphic)}, [pygame.Rect], index,
+    // [(int, int)]
+    // and layers is sorted; index has methods update([Graphic]) and
+    // query(layer, [pygame.Rect]) -> [Graphic] (graphics in the layer that
+    // intersect any of the rects); offsets gives the position of the
+    // surface's top-left corner in graphics' co-ordinates for each layer, and
+    // dirty rects are in the surface's co-ordinates
+    // graphics' _pre_draw takes the surface's rect (in graphics' co-ordinates)
+    // and returns whether the graphic is entirely outside it (culled)
+    PyObject* layers_in, * sfc, * graphics_in, * dirty, * index, * offsets_in;
     PyObject** layers, *** graphics, ** gs, * g, * g_dirty, * g_rect, * r_o,
-            ** graphics_obj, * tmp, * tmp2, * pre_draw, * clip, * vis_tmp[2],
-            * rtn, * opaque_in, * dirty_opaque, * l_dirty_opaque,
-            ** dirty_by_layer, * rs, * draw_in, * draw;
+            ** graphics_obj, * tmp, * tmp2, * pre_draw, * vis_tmp[2], * rtn,
+            * opaque_in, * dirty_opaque, * l_dirty_opaque, ** dirty_by_layer,
+            * rs, * draw_in, * draw, * changed, * query, ** cands, * view,
+            ** views, ** offsets, * w_dirty, * blits;
     char* attrs[4] = {"was_visible", "visible", "_last_postrot_rect",
                       "_postrot_rect"};
-    int n_layers, * n_graphics, i, j, k, l, n, n_dirty, r_new, r_good;
-    PyRectObject* r, * tmp_r;
-    if (!PyArg_UnpackTuple(args, "fastdraw", 4, 4, &layers_in, &sfc,
-                           &graphics_in, &dirty))
+    int n_layers, * n_graphics, i, j, k, l, n, n_dirty, culled, * offs;
+    GAME_Rect a, * g_r;
+    if (!PyArg_UnpackTuple(args, "fastdraw", 6, 6, &layers_in, &sfc,
+                           &graphics_in, &dirty, &index, &offsets_in))
         return NULL;
 
     pre_draw = PyString_FromString("_pre_draw"); // NOTE: ref[+1a]
-    clip = PyString_FromString("clip"); // NOTE: ref[+1b]
-    // get arrays of layers, graphics and sizes
+    view = PyObject_CallMethod(sfc, "get_rect", NULL); // NOTE: ref[+1b]
+    // get arrays of layers, graphics, sizes and offsets
     // NOTE: ref[+2]
     layers_in = PySequence_Fast(layers_in, "layers: expected sequence");
     n_layers = PySequence_Fast_GET_SIZE(layers_in);
     layers = PySequence_Fast_ITEMS(layers_in);
+    // NOTE: ref[+2a]
+    offsets_in = PySequence_Fast(offsets_in, "offsets: expected sequence");
+    offsets = PySequence_Fast_ITEMS(offsets_in);
     graphics_obj = PyMem_New(PyObject*, n_layers); // NOTE: alloc[+1]
     n_graphics = PyMem_New(int, n_layers); // NOTE: alloc[+2]
     graphics = PyMem_New(PyObject**, n_layers); // NOTE: alloc[+3]
+    offs = PyMem_New(int, 2 * n_layers); // NOTE: alloc[+3a]
+    views = PyMem_New(PyObject*, n_layers); // NOTE: alloc[+3b]
     for (i = 0; i < n_layers; i++) { // graphics_in
         // NOTE: ref[+3]
         tmp = PySequence_Fast(PyDict_GetItem(graphics_in, layers[i]),
@@ -202,14 +328,25 @@ PyObject* fastdraw (PyObject* self, PyObject* args) {
         graphics_obj[i] = tmp;
         n_graphics[i] = PySequence_Fast_GET_SIZE(tmp);
         graphics[i] = PySequence_Fast_ITEMS(tmp);
+        if (!PyArg_ParseTuple(offsets[i], "ii", offs + 2 * i,
+                              offs + 2 * i + 1))
+            return NULL;
+        // the surface's rect in the layer's co-ordinates
+        // NOTE: ref[+3c]
+        views[i] = new_rect(&((PyRectObject*) view)->r, offs[2 * i],
+                            offs[2 * i + 1]);
     }
-    // get dirty rects from graphics
+    // get dirty rects from graphics, and graphics that may have moved
+    changed = PyList_New(0); // NOTE: ref[+3d]
     for (i = 0; i < n_layers; i++) { // graphics
         gs = graphics[i];
         for (j = 0; j < n_graphics[i]; j++) { // gs
             g = gs[j];
-            PyObject_CallMethodObjArgs(g, pre_draw, NULL);
-            if (PyErr_Occurred() != NULL) return NULL;
+            // NOTE: ref[+4]
+            tmp = PyObject_CallMethodObjArgs(g, pre_draw, views[i], NULL);
+            if (tmp == NULL) return NULL;
+            culled = PyObject_IsTrue(tmp);
+            Py_DECREF(tmp); // NOTE: ref[-4]
             // NOTE: ref[+4] (list)
             g_dirty = PyObject_GetAttrString(g, "_dirty");
             for (k = 0; k < 2; k++) // last/current
@@ -226,17 +363,22 @@ PyObject* fastdraw (PyObject* self, PyObject* args) {
                 PyList_SET_ITEM(g_dirty, 0, g_rect); // NOTE: ref[-6]
             }
             n = PyList_GET_SIZE(g_dirty);
+            if (n > 0) PyList_Append(changed, g);
             for (k = 0; k < 2; k++) { // last/current
                 if (vis_tmp[k] == Py_True) {
                     // NOTE: ref[+6] (pygame.Rect)
                     g_rect = PyObject_GetAttrString(g, attrs[2 + k]);
                     for (l = 0; l < n; l++) { // g_dirty
-                        r_o = PyList_GET_ITEM(g_dirty, l); // pygame.Rect
-                        // NOTE: ref[+7]
-                        r_o = PyObject_CallMethodObjArgs(r_o, clip, g_rect,
-                                                         NULL);
-                        PyList_Append(dirty, r_o);
-                        Py_DECREF(r_o); // NOTE: ref[-7]
+                        // clip to the graphic and the surface
+                        a = ((PyRectObject*) PyList_GET_ITEM(g_dirty, l))->r;
+                        if (clip_rect(&a, &((PyRectObject*) g_rect)->r) &&
+                            clip_rect(&a, &((PyRectObject*) views[i])->r)) {
+                            // NOTE: ref[+7]
+                            r_o = new_rect(&a, -offs[2 * i],
+                                           -offs[2 * i + 1]);
+                            PyList_Append(dirty, r_o);
+                            Py_DECREF(r_o); // NOTE: ref[-7]
+                        }
                     }
                     Py_DECREF(g_rect); // NOTE: ref[-6]
                 }
@@ -247,8 +389,23 @@ PyObject* fastdraw (PyObject* self, PyObject* args) {
             tmp = PyObject_GetAttrString(g, "visible"); // NOTE: ref[+4]
             PyObject_SetAttrString(g, "was_visible", tmp);
             Py_DECREF(tmp); // NOTE: ref[-4]
+            if (culled) {
+                // nothing to draw, so it's already drawn where it is
+                // NOTE: ref[+4]
+                tmp = PyObject_GetAttrString(g, "_postrot_rect");
+                PyObject_SetAttrString(g, "_last_postrot_rect", tmp);
+                Py_DECREF(tmp); // NOTE: ref[-4]
+                tmp = PyObject_GetAttrString(g, "_rect"); // NOTE: ref[+4]
+                PyObject_SetAttrString(g, "last_rect", tmp);
+                Py_DECREF(tmp); // NOTE: ref[-4]
+            }
         }
     }
+    // bring the index up to date
+    // NOTE: ref[+4]
+    tmp = PyObject_CallMethod(index, "update", "(O)", changed);
+    if (tmp == NULL) return NULL;
+    Py_DECREF(tmp); // NOTE: ref[-4]
 
     // only have something to do if dirty is non-empty
     rtn = Py_False;
@@ -259,41 +416,57 @@ PyObject* fastdraw (PyObject* self, PyObject* args) {
     }
 
     opaque_in = PyString_FromString("_opaque_in"); // NOTE: ref[+4]
+    query = PyString_FromString("query"); // NOTE: ref[+5a]
     dirty_opaque = PyList_New(0); // NOTE: ref[+5]
     dirty_by_layer = PyMem_New(PyObject*, n_layers); // NOTE: alloc[+4]
+    // graphics that might need drawing, by layer
+    cands = PyMem_New(PyObject*, n_layers); // NOTE: alloc[+5]
     for (i = 0; i < n_layers; i++) { // graphics
-        gs = graphics[i];
-        n = n_graphics[i];
-        // get opaque regions of dirty rects
-        l_dirty_opaque = PyList_New(0); // NOTE: ref[+6]
+        // dirty rects in the layer's co-ordinates
+        w_dirty = PyList_New(n_dirty); // NOTE: ref[+6a]
         for (j = 0; j < n_dirty; j++) { // dirty
-            r = (PyRectObject*) PyList_GET_ITEM(dirty, j); // pygame.Rect
-            r_new = 0;
-            r_good = 1;
-            for (k = 0; k < n; k++) { // gs
-                g = gs[k];
-                // NOTE: ref[+7]
-                g_rect = PyObject_GetAttrString(g, "_postrot_rect");
-                if (r_new) tmp_r = r;
+            PyList_SET_ITEM(w_dirty, j, new_rect(
+                &((PyRectObject*) PyList_GET_ITEM(dirty, j))->r,
+                offs[2 * i], offs[2 * i + 1]
+            ));
+        }
+        // NOTE: ref[+6b]
+        cands[i] = PyObject_CallMethodObjArgs(index, query, layers[i],
+                                              w_dirty, NULL);
+        if (cands[i] == NULL) return NULL;
+        gs = PySequence_Fast_ITEMS(cands[i]);
+        n = PySequence_Fast_GET_SIZE(cands[i]);
+        // get opaque regions of dirty rects: the parts covered by opaque
+        // graphics
+        l_dirty_opaque = PyList_New(0); // NOTE: ref[+6]
+        for (k = 0; k < n; k++) { // gs
+            g = gs[k];
+            tmp = PyObject_GetAttrString(g, "visible"); // NOTE: ref[+7]
+            if (tmp == Py_True) {
                 // NOTE: ref[+8]
-                r = (PyRectObject*)
-                    PyObject_CallMethodObjArgs((PyObject*) r, clip, g_rect,
-                                               NULL);
-                if (r_new) Py_DECREF(tmp_r); // NOTE: ref[-8](k>0)
-                r_new = 1;
-                Py_DECREF(g_rect); // NOTE: ref[-7]
-                // NOTE: ref[+7]
-                tmp = PyObject_CallMethodObjArgs(g, opaque_in, (PyObject*) r,
-                                                 NULL);
-                if (PyErr_Occurred() != NULL) return NULL;
-                r_good = r->r.w > 0 && r->r.h > 0 && \
-                         PyObject_RichCompareBool(tmp, Py_True, Py_EQ);
-                Py_DECREF(tmp); // NOTE: ref[-7]
-                if (!r_good) break;
+                g_rect = PyObject_GetAttrString(g, "_postrot_rect");
+                g_r = &((PyRectObject*) g_rect)->r;
+                for (j = 0; j < n_dirty; j++) { // w_dirty
+                    a = ((PyRectObject*) PyList_GET_ITEM(w_dirty, j))->r;
+                    if (!clip_rect(&a, g_r)) continue;
+                    r_o = new_rect(&a, 0, 0); // NOTE: ref[+9]
+                    // NOTE: ref[+10]
+                    tmp2 = PyObject_CallMethodObjArgs(g, opaque_in, r_o, NULL);
+                    Py_DECREF(r_o); // NOTE: ref[-9]
+                    if (tmp2 == NULL) return NULL;
+                    if (PyObject_IsTrue(tmp2)) {
+                        // NOTE: ref[+9]
+                        r_o = new_rect(&a, -offs[2 * i], -offs[2 * i + 1]);
+                        PyList_Append(l_dirty_opaque, r_o);
+                        Py_DECREF(r_o); // NOTE: ref[-9]
+                    }
+                    Py_DECREF(tmp2); // NOTE: ref[-10]
+                }
+                Py_DECREF(g_rect); // NOTE: ref[-8]
             }
-            if (r_good) PyList_Append(l_dirty_opaque, (PyObject*) r);
-            if (r_new) Py_DECREF((PyObject*) r); // NOTE: ref[-8](k=0)
+            Py_DECREF(tmp); // NOTE: ref[-7]
         }
+        Py_DECREF(w_dirty); // NOTE: ref[-6a]
         // undirty below opaque graphics and make dirty rects disjoint
         // NOTE: ref[+7]
         dirty_by_layer[i] = mk_disjoint(dirty, dirty_opaque);
@@ -305,40 +478,47 @@ PyObject* fastdraw (PyObject* self, PyObject* args) {
     }
 
     draw = PyString_FromString("_draw"); // NOTE: ref[+7]
-    // redraw in dirty rects
+    // redraw in dirty rects, collecting blits to perform in one go
+    blits = PyList_New(0); // NOTE: ref[+7a]
     for (i = n_layers - 1; i >= 0; i--) { // layers
         rs = dirty_by_layer[i];
         n = PyList_GET_SIZE(rs);
-        gs = graphics[i];
-        for (j = 0; j < n_graphics[i]; j++) { // gs
+        gs = PySequence_Fast_ITEMS(cands[i]);
+        for (j = 0; j < PySequence_Fast_GET_SIZE(cands[i]); j++) { // gs
             g = gs[j];
             tmp = PyObject_GetAttrString(g, "visible"); // NOTE: ref[+8]
             if (tmp == Py_True) {
                 // NOTE: ref[+9]
                 g_rect = PyObject_GetAttrString(g, "_postrot_rect");
+                g_r = &((PyRectObject*) g_rect)->r;
                 draw_in = PyList_New(0); // NOTE: ref[+10]
                 for (k = 0; k < n; k++) { // rs
-                    r = (PyRectObject*) PyList_GET_ITEM(rs, k);
+                    // clip in the layer's co-ordinates, but draw in the
+                    // surface's
+                    a = ((PyRectObject*) PyList_GET_ITEM(rs, k))->r;
+                    a.x += offs[2 * i];
+                    a.y += offs[2 * i + 1];
+                    if (!clip_rect(&a, g_r)) continue;
                     // NOTE: ref[+11]
-                    r = (PyRectObject*)
-                        PyObject_CallMethodObjArgs(g_rect, clip, r, NULL);
-                    if (r->r.w > 0 && r->r.h > 0)
-                        PyList_Append(draw_in, (PyObject*) r);
-                    Py_DECREF(r); // NOTE: ref[-11]
+                    r_o = new_rect(&a, -offs[2 * i], -offs[2 * i + 1]);
+                    PyList_Append(draw_in, r_o);
+                    Py_DECREF(r_o); // NOTE: ref[-11]
                 }
                 if (PyList_GET_SIZE(draw_in) > 0) {
-                    PyObject_CallMethodObjArgs(g, draw, sfc, draw_in, NULL);
-                    if (PyErr_Occurred() != NULL) return NULL;
+                    // NOTE: ref[+11]
+                    r_o = PyObject_CallMethodObjArgs(g, draw, sfc, draw_in,
+                                                     offsets[i], blits, NULL);
+                    if (r_o == NULL) return NULL;
+                    Py_DECREF(r_o); // NOTE: ref[-11]
                 }
                 Py_DECREF(draw_in); // NOTE: ref[-10]
                 Py_DECREF(g_rect); // NOTE: ref[-9]
             }
             Py_DECREF(tmp); // ref[-8]
-            tmp = PyList_New(0); // NOTE: ref[+8]
-            PyObject_SetAttrString(g, "_dirty", tmp);
-            Py_DECREF(tmp); // NOTE: ref[-8]
         }
     }
+    if (!blit_all(sfc, blits)) return NULL;
+    Py_DECREF(blits); // NOTE: ref[-7a]
 
     // add up dirty rects to return
     Py_DECREF(rtn);
@@ -351,32 +531,62 @@ PyObject* fastdraw (PyObject* self, PyObject* args) {
     }
     // make all rects disjoint for faster display updating
     tmp = PyList_New(0); // NOTE: ref[+8]
-    tmp2 = rtn;
-    rtn = mk_disjoint(tmp2, tmp); // NOTE: ref[+9]
-    Py_DECREF(tmp2); // NOTE: ref[-9]
+    r_o = rtn;
+    rtn = mk_disjoint(r_o, tmp); // NOTE: ref[+9]
+    Py_DECREF(r_o); // NOTE: ref[-9]
     Py_DECREF(tmp); // NOTE: ref[-8]
 
     // cleanup (in reverse order)
     Py_DECREF(draw); // NOTE: ref[-7]
-    // NOTE: ref[-6]
-    for (i = 0; i < n_layers; i++) Py_DECREF(dirty_by_layer[i]);
+    for (i = 0; i < n_layers; i++) {
+        Py_DECREF(cands[i]); // NOTE: ref[-6b]
+        Py_DECREF(dirty_by_layer[i]); // NOTE: ref[-6]
+    }
+    PyMem_Free(cands); // NOTE: alloc[-5]
     PyMem_Free(dirty_by_layer); // NOTE: alloc[-4]
     Py_DECREF(dirty_opaque); // NOTE: ref[-5]
+    Py_DECREF(query); // NOTE: ref[-5a]
     Py_DECREF(opaque_in); // NOTE: ref[-4]
 end:
-    for (i = 0; i < n_layers; i++) Py_DECREF(graphics_obj[i]); // NOTE: ref[-3]
+    // graphics that haven't changed already have an empty dirty list
+    n = PyList_GET_SIZE(changed);
+    for (i = 0; i < n; i++) {
+        tmp = PyList_New(0); // NOTE: ref[+4]
+        PyObject_SetAttrString(PyList_GET_ITEM(changed, i), "_dirty", tmp);
+        Py_DECREF(tmp); // NOTE: ref[-4]
+    }
+    Py_DECREF(changed); // NOTE: ref[-3d]
+    for (i = 0; i < n_layers; i++) {
+        Py_DECREF(views[i]); // NOTE: ref[-3c]
+        Py_DECREF(graphics_obj[i]); // NOTE: ref[-3]
+    }
+    PyMem_Free(views); // NOTE: alloc[-3b]
+    PyMem_Free(offs); // NOTE: alloc[-3a]
     PyMem_Free(graphics); // NOTE: alloc[-3]
     PyMem_Free(n_graphics); // NOTE: alloc[-2]
     PyMem_Free(graphics_obj); // NOTE: alloc[-1]
+    Py_DECREF(offsets_in); // NOTE: ref[-2a]
     Py_DECREF(layers_in); // NOTE: ref[-2]
-    Py_DECREF(clip); // NOTE: ref[-1b]
+    Py_DECREF(view); // NOTE: ref[-1b]
     Py_DECREF(pre_draw); // NOTE: ref[-1a]
     return rtn;
 }
 
+PyObject* py_mk_disjoint (PyObject* self, PyObject* args) {
+    // like fastdraw, little error checking: guaranteed to get
+    // [pygame.Rect], [pygame.Rect]
+    PyObject* add, * rm;
+    if (!PyArg_ParseTuple(args, "O!O!", &PyList_Type, &add, &PyList_Type,
+                          &rm))
+        return NULL;
+    return mk_disjoint(add, rm);
+}
+
 PyMethodDef methods[] = {
     {"fastdraw", fastdraw, METH_VARARGS,
      "Draw everything; returns dirty list or False."},
+    {"mk_disjoint", py_mk_disjoint, METH_VARARGS,
+     "Get disjoint rects covering some rects minus some others."},
     {NULL, NULL, 0, NULL}
 };
 
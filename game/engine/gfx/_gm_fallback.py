@@ -0,0 +1,225 @@
+"""Pure-Python versions of the functions in the ``_gm`` extension module.
+
+These are used by :mod:`container <engine.gfx.container>` when ``_gm`` hasn't
+been built, and behave identically, only more slowly.
+
+---NODOC---
+
+"""
+
+import pygame as pg
+
+from .util import blit_all
+
+__all__ = ('mk_disjoint', 'fastdraw')
+
+
+def _union_spans (spans):
+    # sort [x0, x1) spans and merge overlapping or touching ones
+    spans.sort()
+    rtn = []
+    for x0, x1 in spans:
+        if rtn and x0 <= rtn[-1][1]:
+            if x1 > rtn[-1][1]:
+                rtn[-1][1] = x1
+        else:
+            rtn.append([x0, x1])
+    return rtn
+
+
+def _subtract_spans (add, rm):
+    # add and rm are sorted, disjoint spans; return add minus rm
+    rtn = []
+    j = 0
+    n_rm = len(rm)
+    for x0, x1 in add:
+        while j < n_rm and rm[j][1] <= x0:
+            j += 1
+        k = j
+        while k < n_rm and rm[k][0] < x1:
+            rm_x0, rm_x1 = rm[k]
+            if rm_x0 > x0:
+                rtn.append((x0, rm_x0))
+            if rm_x1 > x0:
+                x0 = rm_x1
+            k += 1
+        if x0 < x1:
+            rtn.append((x0, x1))
+    return rtn
+
+
+def mk_disjoint (add, rm):
+    """Get disjoint rects covering the area of some rects minus some others.
+
+mk_disjoint(add, rm) -> rects
+
+:arg add: list of ``pygame.Rect`` instances to cover.
+:arg rm: list of ``pygame.Rect`` instances to exclude.
+
+:return: a list of disjoint ``pygame.Rect`` instances, ordered by bottom edge
+         then left edge.
+
+This sweeps down through the bands between horizontal rect edges, working out
+the spans covered in each band, and extends each rect down while its span stays
+the same.
+
+"""
+    rects = []
+    ys = set()
+    for is_add, rs in ((True, add), (False, rm)):
+        for x, y, w, h in rs:
+            if w > 0 and h > 0:
+                rects.append((x, x + w, y, y + h, is_add))
+                ys.add(y)
+                ys.add(y + h)
+    if not rects:
+        return []
+    rects.sort(key=lambda r: r[2])
+    ys = sorted(ys)
+
+    Rect = pg.Rect
+    rtn = []
+    active = []
+    k = 0 # next rect to become active
+    n = len(rects)
+    # [(x0, x1, y0)], sorted and disjoint
+    open_rs = []
+    for y0 in ys[:-1]:
+        # drop rects that ended, and add those that start in this band
+        active = [r for r in active if r[3] > y0]
+        while k < n and rects[k][2] == y0:
+            active.append(rects[k])
+            k += 1
+        # get covered spans
+        spans = _subtract_spans(
+            _union_spans([(r[0], r[1]) for r in active if r[4]]),
+            _union_spans([(r[0], r[1]) for r in active if not r[4]])
+        )
+        # extend open rects with the same span, and close the rest
+        new_open = []
+        j = 0
+        n_spans = len(spans)
+        for o in open_rs:
+            while j < n_spans and spans[j][0] < o[0]:
+                new_open.append(spans[j] + (y0,))
+                j += 1
+            if j < n_spans and spans[j] == o[:2]:
+                new_open.append(o)
+                j += 1
+            else:
+                rtn.append(Rect(o[0], o[2], o[1] - o[0], y0 - o[2]))
+        for span in spans[j:]:
+            new_open.append(span + (y0,))
+        open_rs = new_open
+    y1 = ys[-1]
+    for o in open_rs:
+        rtn.append(Rect(o[0], o[2], o[1] - o[0], y1 - o[2]))
+    return rtn
+
+
+def fastdraw (layers, sfc, graphics, dirty, index, offsets):
+    """Draw graphics in their dirty areas.
+
+fastdraw(layers, sfc, graphics, dirty, index, offsets) -> rects
+
+:arg layers: sorted list of layers to draw.
+:arg sfc: ``pygame.Surface`` to draw to.
+:arg graphics: ``{layer: graphics}`` for graphics in each layer.
+:arg dirty: list of ``pygame.Rect`` instances for areas to redraw, in
+            ``sfc``'s co-ordinates; dirty areas of graphics are added to this.
+:arg index: object with methods ``update(graphics)``, to account for moved
+            graphics, and ``query(layer, rects)``, which returns a list of
+            graphics in ``layer`` that intersect any of ``rects``.
+:arg offsets: list of ``(x, y)`` integer positions of ``sfc``'s top-left
+              corner in graphics' co-ordinates, for each layer in ``layers``.
+
+Graphics' ``_pre_draw`` method is passed ``sfc``'s rect in their co-ordinates,
+and returns whether the graphic is entirely outside it.  Their ``_draw`` method
+is passed a list to add blits to, which are all performed at the end.
+
+:return: ``False`` if nothing was drawn, else a list of disjoint rects that
+         cover the changed parts of ``sfc``.
+
+"""
+    # get dirty rects from graphics, and graphics that may have moved
+    view = sfc.get_rect()
+    views = [view.move(offset) for offset in offsets]
+    changed = []
+    for l, l_view, (dx, dy) in zip(layers, views, offsets):
+        for g in graphics[l]:
+            culled = g._pre_draw(l_view)
+            g_dirty = g._dirty
+            was_visible = g.was_visible
+            visible = g.visible
+            if was_visible is not visible:
+                # visiblity changed since last draw: set dirty everywhere
+                if visible is True:
+                    g_dirty = [g._postrot_rect]
+                else:
+                    g_dirty = [g._last_postrot_rect]
+            if g_dirty:
+                changed.append(g)
+            # clip to the graphic and the surface
+            for vis, g_rect in ((was_visible, g._last_postrot_rect),
+                                (visible, g._postrot_rect)):
+                if vis is True:
+                    for r in g_dirty:
+                        r = r.clip(g_rect).clip(l_view)
+                        if r.w > 0 and r.h > 0:
+                            dirty.append(r.move(-dx, -dy))
+            g.was_visible = visible
+            if culled:
+                # nothing to draw, so it's already drawn where it is
+                g._last_postrot_rect = g._postrot_rect
+                g.last_rect = g._rect
+    # bring the index up to date
+    index.update(changed)
+
+    # only have something to do if dirty is non-empty
+    rtn = False
+    if dirty:
+        dirty_opaque = []
+        dirty_by_layer = []
+        # graphics that might need drawing, by layer
+        cands = []
+        for l, (dx, dy) in zip(layers, offsets):
+            # dirty rects in the layer's co-ordinates
+            l_dirty = [r.move(dx, dy) for r in dirty]
+            gs = index.query(l, l_dirty)
+            cands.append(gs)
+            # get opaque regions of dirty rects: the parts covered by opaque
+            # graphics
+            l_dirty_opaque = []
+            for g in gs:
+                if g.visible is True:
+                    g_rect = g._postrot_rect
+                    for i in g_rect.collidelistall(l_dirty):
+                        r = l_dirty[i].clip(g_rect)
+                        if g._opaque_in(r):
+                            l_dirty_opaque.append(r.move(-dx, -dy))
+            # undirty below opaque graphics and make dirty rects disjoint
+            dirty_by_layer.append(mk_disjoint(dirty, dirty_opaque))
+            dirty_opaque += l_dirty_opaque
+
+        # redraw in dirty rects, collecting blits to perform in one go
+        blits = []
+        for rs, gs, offset in reversed(zip(dirty_by_layer, cands, offsets)):
+            dx, dy = offset
+            for g in gs:
+                if g.visible is True:
+                    # clip in the layer's co-ordinates, but draw in the
+                    # surface's
+                    g_rect = g._postrot_rect.move(-dx, -dy)
+                    draw_in = [g_rect.clip(rs[i])
+                               for i in g_rect.collidelistall(rs)]
+                    if draw_in:
+                        g._draw(sfc, draw_in, offset, blits)
+        blit_all(sfc, blits)
+
+        # make all rects disjoint for faster display updating
+        rtn = mk_disjoint(sum(dirty_by_layer, []), [])
+
+    # graphics that haven't changed already have an empty dirty list
+    for g in changed:
+        g._dirty = []
+    return rtn
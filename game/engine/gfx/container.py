@@ -5,12 +5,7 @@
 TODO:
  - make it possible for GM to have transparent BG (only if orig_sfc has alpha)
  - GraphicsGroup:
-    - allow for transforms
     - internal layers (has allowed range in manager, and distributes graphics within it)
- - ignore off-screen (OoB) things (clip all dirty rects and discard zero-size ones)
-    - do it before _pre_draw
- - GraphicsManager.offset to offset the viewing window (Surface.scroll is fast?)
-    - supports parallax: set to {layer: ratio} or (function(layer) -> ratio) or set a Graphic property (make GraphicView have its own copy)
  - do something with/like dispman
 
 ---NODOC---
@@ -18,18 +13,163 @@ TODO:
 """
 
 import sys
+from collections import OrderedDict
 
 import pygame as pg
 
 from .. import sched
-from ..util import ir, normalise_colour, blank_sfc, combine_drawn
+from ..conf import conf
+from ..util import (ir, normalise_colour, blank_sfc, combine_drawn,
+                    merge_rects)
 try:
-    from _gm import fastdraw
+    from _gm import fastdraw, mk_disjoint
 except ImportError:
-    print >> sys.stderr, 'error: couldn\'t import _gm; did you remember to `make\'?'
-    sys.exit(1)
+    print >> sys.stderr, 'warning: couldn\'t import _gm (did you remember to ' \
+                         '`make\'?); falling back to slower drawing'
+    from ._gm_fallback import fastdraw, mk_disjoint
 from .graphic import Graphic
 from .graphics import Colour
+from .util import blit_all
+
+
+class _GroupGraphic (Graphic):
+    """Draws the members of a :class:`GraphicsGroup` as a single graphic.
+
+_GroupGraphic(group)
+
+Visible members are composited onto a transparent surface, back to front, and
+group transforms are applied to the result, about the group's position.  Members
+are checked whenever this graphic is drawn: if the whole group moved, this
+graphic just moves with it; if members' surfaces changed, only their areas are
+recomposited; and if members moved relative to the group, changed size or
+visibility, or were added or removed, everything is recomposited.
+
+"""
+
+    def __init__ (self, group):
+        self.group = group
+        # [(graphic, rect)] for visible members as last composited, back to
+        # front, where rect is where the graphic is drawn relative to the group
+        self._layout = None
+        # rounded group position when last composited
+        self._origin = (0, 0)
+        # area covered by the composited surface, relative to the group
+        self._bounds = pg.Rect(0, 0, 1, 1)
+        gs = list(group._graphics)
+        layer = min(g._layer for g in gs) if gs else 0
+        Graphic.__init__(self, blank_sfc((1, 1)), layer=layer)
+        if gs:
+            # things that usually apply to the whole group
+            g = gs[0]
+            for attr in ('blit_flags', 'scale_fn', 'scale_margin',
+                         'rotate_fn', 'rotate_threshold'):
+                setattr(self, attr, getattr(g, attr))
+        self._update()
+
+    def _members (self):
+        # get the rounded group position and the layout for visible members
+        pos = self.group._pos
+        gx = ir(pos[0])
+        gy = ir(pos[1])
+        layout = []
+        for g in self.group._graphics:
+            g.render()
+            if g.visible:
+                x, y = g._rect.move(g._rot_offset).topleft
+                w, h = g._postrot_rect.size
+                if w > 0 and h > 0:
+                    layout.append((g, pg.Rect(x - gx, y - gy, w, h)))
+        # stable, so graphics in the same layer are in the order added
+        layout.sort(key=lambda m: m[0]._layer, reverse=True)
+        return ((gx, gy), layout)
+
+    def _composite (self, sfc, rects):
+        # draw members to sfc in the given disjoint rects, in sfc's
+        # co-ordinates
+        bx, by = self._bounds.topleft
+        blits = []
+        for r in rects:
+            for g, g_r in self._layout:
+                g_r = g_r.move(-bx, -by)
+                if g_r.colliderect(r):
+                    r_in = g_r.clip(r)
+                    blits.append((g._surface, r_in.topleft,
+                                  r_in.move(-g_r.x, -g_r.y)))
+        blit_all(sfc, blits)
+
+    def _relayout (self, origin, layout):
+        self._layout = layout
+        self._origin = gx, gy = origin
+        if layout:
+            bounds = layout[0][1].unionall([r for g, r in layout[1:]])
+        else:
+            bounds = pg.Rect(0, 0, 1, 1)
+        self._bounds = bounds
+        sfc = blank_sfc(bounds.size)
+        self._composite(sfc, [sfc.get_rect()])
+        # replace the original surface and its position, then reapply
+        # transforms about the group's position (like size_changed)
+        got_transforms = bool(self.transforms)
+        if got_transforms:
+            self._undo_transforms(0)
+        self._orig_sfc = sfc
+        self._orig_dirty = True
+        self._rect = bounds.move(gx, gy)
+        self._anchor = (-bounds.x, -bounds.y)
+        self._rot_anchor = self._get_rot_anchor()
+        if got_transforms:
+            self._apply_transforms(0, True)
+
+    def _get_rot_anchor (self):
+        # the group's position within the resized surface
+        ax, ay = self._anchor
+        sx, sy = self.group._scale
+        return (ax * sx, ay * sy)
+
+    def _update (self):
+        # bring the composited surface up to date with members
+        origin, layout = self._members()
+        if layout != self._layout:
+            self._relayout(origin, layout)
+        else:
+            ox, oy = self._origin
+            gx, gy = origin
+            if gx != ox or gy != oy:
+                # only moved: no need to touch surfaces
+                self._origin = origin
+                self.move_by(gx - ox, gy - oy)
+            bx, by = self._bounds.topleft
+            dirty = [r.move(-bx, -by) for g, r in layout if g._dirty]
+            if dirty:
+                dirty = mk_disjoint(dirty, [])
+                sfc = self._orig_sfc
+                for r in dirty:
+                    sfc.fill((0, 0, 0, 0), r)
+                self._composite(sfc, dirty)
+                self.dirty(*dirty)
+        # the changes are now part of this graphic's
+        for g in self.group._graphics:
+            g._dirty = []
+
+    def rescale (self, w=1, h=1):
+        """:inherit:"""
+        Graphic.rescale(self, w, h)
+        self.rot_anchor = self._get_rot_anchor()
+        return self
+
+    def render (self):
+        """:inherit:"""
+        self._update()
+        Graphic.render(self)
+
+    def _pre_draw (self, view=None):
+        # members may have moved since the last draw, so this must be up to
+        # date before checking whether it's in view, and the size must be known
+        self._update()
+        if self._orig_dirty is True:
+            # relaid out
+            Graphic.render(self)
+        return Graphic._pre_draw(self, view)
 
 
 class GraphicsGroup (object):
@@ -49,18 +189,36 @@ possible with something like ``group[graphic] = rel`` (instead of using
 :attr:`graphic_attrs` contains some properties of this :class:`GraphicsGroup` which correspond to those of :class:`Graphic <engine.gfx.graphic.Graphic>`.
 These can be set to apply to all contained graphics.
 
+The group may also be transformed as a whole (:meth:`rescale`, :meth:`flip`,
+:meth:`opacify` and :meth:`rotate`), about its position.  To do this, graphics
+are composited into a single graphic which is put in the :attr:`manager` in
+their place (see :attr:`composite`).
+
 """
 
     #: Attributes which are mapped to
     #: :class:`Graphic <engine.gfx.graphic.Graphic>` attributes.
     graphic_attrs = ('layer', 'visible', 'blit_flags', 'anchor', 'rot_anchor',
-                     'scale_fn', 'rotate_fn', 'rotate_threshold')
+                     'scale_fn', 'scale_margin', 'rotate_fn',
+                     'rotate_threshold')
+    # graphic_attrs which also apply to the composited graphic; not visible,
+    # since the composited graphic only includes visible members anyway, and
+    # members added later must show
+    _composite_attrs = ('layer', 'blit_flags', 'scale_fn', 'scale_margin',
+                        'rotate_fn', 'rotate_threshold')
 
     def __init__ (self, x=0, y=0):
         self._pos = [x, y]
         #: {graphic: rel}
-        self._graphics = {}
+        self._graphics = OrderedDict()
         self._manager = None
+        self._composite = False
+        # _GroupGraphic instance if composited
+        self._graphic = None
+        self._scale = (1, 1)
+        self._flipped = (False, False)
+        self._opacity = 255
+        self._angle = 0
 
     def __nonzero__ (self):
         return bool(self._graphics)
@@ -87,6 +245,8 @@ These can be set to apply to all contained graphics.
         if attr in self.graphic_attrs:
             for g in self:
                 setattr(g, attr, val)
+            if self._graphic is not None and attr in self._composite_attrs:
+                setattr(self._graphic, attr, val)
         else:
             object.__setattr__(self, attr, val)
 
@@ -94,9 +254,12 @@ These can be set to apply to all contained graphics.
     def rect (self):
         """The ``pygame.Rect`` covered by graphics in this group.
 
-The top-left of this is not necessarily the same as :attr:`pos`.
+The top-left of this is not necessarily the same as :attr:`pos`.  If
+:attr:`composited`, this includes group transforms.
 
 """
+        if self._graphic is not None:
+            return self._graphic.postrot_rect
         graphics = self._graphics.keys()
         if graphics:
             if len(graphics) == 1:
@@ -106,7 +269,7 @@ The top-left of this is not necessarily the same as :attr:`pos`.
                     [g._rect for g in graphics[1:]]
                 )
         else:
-            return pygame.Rect(0, 0, 0, 0)
+            return pg.Rect(0, 0, 0, 0)
 
     @property
     def x (self):
@@ -200,8 +363,9 @@ Note that graphics need not be added to a :class:`GraphicsManager` individually
             graphic, dx, dy = graphic
 
             if not isinstance(graphic, Graphic):
-                graphic = Graphic(graphic, pos)
-            if self._manager is not None:
+                graphic = Graphic(graphic)
+            if (self._manager is not None and self._graphic is None and
+                graphic not in self._graphics):
                 self._manager.add(graphic)
 
             # determine new position for the graphic
@@ -229,10 +393,10 @@ Note that graphics need not be added to a :class:`GraphicsManager` individually
 Raises ``KeyError`` for missing graphics.
 
 """
-        gm = self._gm
+        gm = self._manager
         for g in graphics:
             del self._graphics[g]
-            if gm is not None:
+            if gm is not None and self._graphic is None:
                 gm.rm(g)
 
     @property
@@ -245,12 +409,429 @@ to put graphics in."""
     def manager (self, manager):
         if manager is self._manager:
             return
+        gs = self._drawn_graphics()
         if self._manager is not None:
-            self._manager.rm(*self._graphics)
+            self._manager.rm(*gs)
         if manager is not None:
-            manager.add(*self._graphics)
+            manager.add(*gs)
         self._manager = manager
 
+    # group transforms
+
+    @property
+    def composite (self):
+        """Whether to always draw the group as a single graphic.
+
+By default, this only happens while the group is transformed; setting this to
+``True`` also does it when untransformed.  Either way, a composited group is
+drawn in the front-most layer of its graphics at the time it was composited,
+and the ``blit_flags`` of its graphics are not used.  Use :attr:`layer` and
+:attr:`blit_flags` to change these for the group.
+
+Compositing is worthwhile for a group with many graphics that move together,
+since moving the group then only requires one graphic to be redrawn.
+
+"""
+        return self._composite
+
+    @composite.setter
+    def composite (self, composite):
+        self._composite = composite
+        self._update_composited()
+
+    @property
+    def composited (self):
+        """Whether the group is currently drawn as a single graphic (see
+:attr:`composite`)."""
+        return self._graphic is not None
+
+    def _drawn_graphics (self):
+        # graphics to put in the manager
+        if self._graphic is None:
+            return list(self._graphics)
+        else:
+            return [self._graphic]
+
+    def _update_composited (self):
+        # switch between compositing and drawing graphics individually if
+        # necessary
+        composite = (self._composite or self._scale != (1, 1) or
+                     any(self._flipped) or self._opacity != 255 or
+                     self._angle != 0)
+        if composite == (self._graphic is not None):
+            return
+        gm = self._manager
+        if gm is not None:
+            gm.rm(*self._drawn_graphics())
+        if composite:
+            self._graphic = g = _GroupGraphic(self)
+            # the scale is needed to place the rotation anchor, so it must be
+            # up to date first
+            g.rescale(*self._scale)
+            g.flip(*self._flipped)
+            g.opacify(self._opacity)
+            g.rotate(self._angle)
+        else:
+            self._graphic = None
+        if gm is not None:
+            gm.add(*self._drawn_graphics())
+
+    @property
+    def scale (self):
+        """``(x, y)`` scale of the group; see :meth:`rescale`."""
+        return self._scale
+
+    @scale.setter
+    def scale (self, scale):
+        if isinstance(scale, (int, float)):
+            self.rescale(scale, scale)
+        else:
+            self.rescale(*scale)
+
+    @property
+    def flipped (self):
+        """``(x, y)`` flipped state of the group; see :meth:`flip`."""
+        return self._flipped
+
+    @flipped.setter
+    def flipped (self, flipped):
+        if isinstance(flipped, (bool, int)):
+            self.flip(flipped, flipped)
+        else:
+            self.flip(*flipped)
+
+    @property
+    def opacity (self):
+        """Opacity of the group; see :meth:`opacify`."""
+        return self._opacity
+
+    @opacity.setter
+    def opacity (self, opacity):
+        self.opacify(opacity)
+
+    @property
+    def angle (self):
+        """Rotation angle of the group; see :meth:`rotate`."""
+        return self._angle
+
+    @angle.setter
+    def angle (self, angle):
+        self.rotate(angle)
+
+    def rescale (self, w=1, h=1):
+        """Scale the group about its position.
+
+rescale(w=1, h=1) -> self
+
+Like :meth:`Graphic.rescale() <engine.gfx.graphic.Graphic.rescale>`.
+
+"""
+        self._scale = (w, h)
+        if self._graphic is not None:
+            self._graphic.rescale(w, h)
+        self._update_composited()
+        return self
+
+    def flip (self, x=False, y=False):
+        """Flip the group within the area covered by its graphics.
+
+flip(x=False, y=False) -> self
+
+Like :meth:`Graphic.flip() <engine.gfx.graphic.Graphic.flip>`.
+
+"""
+        self._flipped = (bool(x), bool(y))
+        if self._graphic is not None:
+            self._graphic.flip(x, y)
+        self._update_composited()
+        return self
+
+    def opacify (self, opacity):
+        """Set the group's opacity.
+
+opacify(opacity) -> self
+
+Like :meth:`Graphic.opacify() <engine.gfx.graphic.Graphic.opacify>`, but
+overlapping graphics in the group don't show through each other.
+
+"""
+        self._opacity = opacity
+        if self._graphic is not None:
+            self._graphic.opacify(opacity)
+        self._update_composited()
+        return self
+
+    def rotate (self, angle):
+        """Rotate the group about its position.
+
+rotate(angle) -> self
+
+Like :meth:`Graphic.rotate() <engine.gfx.graphic.Graphic.rotate>`.
+
+"""
+        self._angle = angle
+        if self._graphic is not None:
+            self._graphic.rotate(angle)
+        self._update_composited()
+        return self
+
+
+class _SpatialIndex (object):
+    """Uniform grid over graphics' rects, used to find graphics in a region.
+
+_SpatialIndex(cell=64)
+
+:arg cell: width and height of each grid cell, in pixels.
+
+Graphics are indexed by layer, and by the value their ``_postrot_rect`` had
+when they were last added or updated.
+
+"""
+
+    def __init__ (self, cell=64):
+        self.cell = cell
+        #: ``{layer: {(i, j): graphics}}``, where ``graphics`` is a set.
+        self._grid = {}
+        #: ``{graphic: (layer, rect, cells, n)}``, where ``n`` orders graphics
+        #: by when they were added.
+        self._entries = {}
+        self._n = 0
+
+    def _cells (self, rect):
+        x, y, w, h = rect
+        if w <= 0 or h <= 0:
+            return ()
+        c = self.cell
+        js = xrange(y // c, (y + h - 1) // c + 1)
+        return [(i, j) for i in xrange(x // c, (x + w - 1) // c + 1)
+                       for j in js]
+
+    def _place (self, grid, g, cells):
+        for c in cells:
+            if c in grid:
+                grid[c].add(g)
+            else:
+                grid[c] = set((g,))
+
+    def _unplace (self, grid, g, cells):
+        for c in cells:
+            gs = grid[c]
+            gs.remove(g)
+            if not gs:
+                del grid[c]
+
+    def add (self, g):
+        """Add a graphic, or re-add it if it's already in the index."""
+        self.rm(g)
+        l = g._layer
+        rect = tuple(g._postrot_rect)
+        cells = self._cells(rect)
+        self._place(self._grid.setdefault(l, {}), g, cells)
+        self._n += 1
+        self._entries[g] = (l, rect, cells, self._n)
+
+    def rm (self, g):
+        """Remove a graphic; missing graphics are ignored."""
+        entry = self._entries.pop(g, None)
+        if entry is not None:
+            l, rect, cells, n = entry
+            grid = self._grid[l]
+            self._unplace(grid, g, cells)
+            if not grid:
+                del self._grid[l]
+
+    def update (self, graphics):
+        """Re-index the given graphics if their rects have changed."""
+        entries = self._entries
+        for g in graphics:
+            entry = entries.get(g)
+            if entry is None:
+                continue
+            rect = tuple(g._postrot_rect)
+            l, old_rect, old_cells, n = entry
+            if rect != old_rect:
+                cells = self._cells(rect)
+                if cells != old_cells:
+                    grid = self._grid[l]
+                    self._unplace(grid, g, old_cells)
+                    self._place(grid, g, cells)
+                entries[g] = (l, rect, cells, n)
+
+    def near (self, layer, rects):
+        """Get graphics in a layer which might intersect any of the given rects.
+
+Returns a set of graphics in the grid cells the rects cover, going by the rects
+graphics had when last indexed.
+
+"""
+        grid = self._grid.get(layer)
+        found = set()
+        if grid:
+            cells = self._cells
+            for r in rects:
+                for c in cells(r):
+                    if c in grid:
+                        found.update(grid[c])
+        return found
+
+    def query (self, layer, rects):
+        """Get graphics in a layer which intersect any of the given rects.
+
+Returns a list of graphics, in the order they were added.
+
+"""
+        found = self.near(layer, rects)
+        if not found:
+            return []
+        entries = self._entries
+        found = [g for g in found
+                 if g._postrot_rect.collidelist(rects) != -1]
+        found.sort(key=lambda g: entries[g][3])
+        return found
+
+
+class _LayerBaker (object):
+    """Flattens ranges of unchanging layers into single graphics.
+
+_LayerBaker(index)
+
+:arg index: the :class:`_SpatialIndex` used for the layers' graphics.
+
+This wraps ``index`` for ``fastdraw``: queries for a flattened range of layers
+return the flattened graphic in place of the range's graphics, and updates
+which include graphics in a flattened range discard it.
+
+"""
+
+    def __init__ (self, index):
+        self.index = index
+        #: ``{layer: frames}``, the number of frames each layer has gone
+        #: unchanged for.
+        self._static = {}
+        # {layers: graphic}, where layers is a tuple of consecutive layers
+        self._baked = {}
+        # {layer: (layers, graphic)}
+        self._baked_layers = {}
+        # ranges we couldn't flatten
+        self._unbakeable = set()
+
+    def changed (self, layer):
+        """Note that a layer's graphics changed."""
+        self._static[layer] = 0
+        baked = self._baked_layers.get(layer)
+        if baked is not None:
+            ls = baked[0]
+            del self._baked[ls]
+            for l in ls:
+                del self._baked_layers[l]
+        if self._unbakeable:
+            self._unbakeable = set(ls for ls in self._unbakeable
+                                   if layer not in ls)
+
+    def _bake (self, ls, graphics):
+        # flatten layers, returning a graphic, or None if not worth it or the
+        # result isn't opaque
+        entries = self.index._entries
+        gs = []
+        # back to front
+        for l in reversed(ls):
+            l_gs = [g for g in graphics[l] if g.visible is True]
+            l_gs.sort(key=lambda g: entries[g][3])
+            for g in l_gs:
+                if g.blit_flags:
+                    return None
+                g.render()
+            gs += l_gs
+        if len(gs) < 2:
+            return None
+        rects = [g._postrot_rect for g in gs]
+        rect = rects[0].unionall(rects[1:])
+        if (rect.w <= 0 or rect.h <= 0 or
+            rect.w * rect.h > conf.STATIC_LAYER_MAX_AREA):
+            return None
+        sfc = blank_sfc(rect.size)
+        x, y = rect.topleft
+        blit_all(sfc, [(g._surface, g._postrot_rect.move(-x, -y), None, 0)
+                       for g in gs])
+        # the result only matches drawing the layers separately if it covers
+        # whatever is underneath
+        if pg.mask.from_surface(sfc, 254).count() != rect.w * rect.h:
+            return None
+        return Graphic(sfc.convert(), rect.topleft, ls[0])
+
+    def prepare (self, layers, graphics, ratios):
+        """Count a frame, and flatten layers that haven't changed for long
+enough.
+
+:arg layers: sorted list of layers.
+:arg graphics: ``{layer: graphics}`` for graphics in each layer.
+:arg ratios: parallax ratios for each layer in ``layers``; only layers with the
+             same ratio are flattened together.
+
+"""
+        static = self._static
+        self._static = static = dict((l, static.get(l, 0) + 1)
+                                     for l in layers)
+        frames = conf.STATIC_LAYER_FRAMES
+        # find ranges of layers to flatten
+        runs = []
+        run = []
+        run_ratio = None
+        for l, ratio in zip(layers, ratios):
+            if (l is not None and frames is not None and
+                static[l] >= frames):
+                if run and ratio == run_ratio:
+                    run.append(l)
+                    continue
+                elif len(run) > 1:
+                    runs.append(tuple(run))
+                run = [l]
+                run_ratio = ratio
+            else:
+                if len(run) > 1:
+                    runs.append(tuple(run))
+                run = []
+        if len(run) > 1:
+            runs.append(tuple(run))
+        # flatten any new ranges
+        old_baked = self._baked
+        self._baked = baked = {}
+        self._baked_layers = baked_layers = {}
+        unbakeable = self._unbakeable
+        for ls in runs:
+            g = old_baked.get(ls)
+            if g is None and ls not in unbakeable:
+                g = self._bake(ls, graphics)
+                if g is None:
+                    unbakeable.add(ls)
+            if g is not None:
+                baked[ls] = g
+                for l in ls:
+                    baked_layers[l] = (ls, g)
+
+    def update (self, graphics):
+        """Re-index the given graphics, and discard flattened layers that they
+belong to.
+
+"""
+        static = self._static
+        for g in graphics:
+            l = g._layer
+            if static.get(l):
+                self.changed(l)
+        self.index.update(graphics)
+
+    def query (self, layer, rects):
+        """As taken by :meth:`_SpatialIndex.query`."""
+        baked = self._baked_layers.get(layer)
+        if baked is None:
+            return self.index.query(layer, rects)
+        ls, g = baked
+        if layer == ls[0] and g._postrot_rect.collidelist(rects) != -1:
+            return [g]
+        else:
+            return []
+
 
 class GraphicsManager (Graphic):
     """Draws things to a surface intelligently.
@@ -274,6 +855,9 @@ however, and transformations are only applied in
 
 """
 
+    # orig_sfc is redrawn every frame, so results are never reused
+    _share_transforms = False
+
     def __init__ (self, scheduler, sfc=None, pos=(0, 0), layer=0):
         #: The ``scheduler`` argument passed to the constructor.
         self.scheduler = scheduler
@@ -290,6 +874,20 @@ however, and transformations are only applied in
         self.graphics = {}
         #: A list of layers that contain graphics, lowest first.
         self.layers = []
+        # finds graphics by position, so drawing only looks at graphics that
+        # might need redrawing
+        self._index = _SpatialIndex()
+        # draws unchanging layers from a single surface
+        self._baker = _LayerBaker(self._index)
+        self._offset = (0, 0)
+        #: ``{layer: ratio}``, or a function that takes a layer and returns its
+        #: ratio, determining how far each layer moves when :attr:`offset`
+        #: changes.  ``ratio`` is a number, or ``(x_ratio, y_ratio)``; for
+        #: example, ``.5`` makes a layer scroll at half the speed.  Missing
+        #: layers have a ratio of ``1``, and the :attr:`overlay` never moves.
+        self.parallax = {}
+        # {layer: offset} used in the last draw
+        self._drawn_offsets = {}
 
     @property
     def orig_sfc (self):
@@ -321,6 +919,38 @@ all graphics to be drawn/updated first.
         """The size of the surface before any transforms."""
         return self._orig_sfc.get_size()
 
+    @property
+    def offset (self):
+        """``(x, y)`` position of the top-left corner of :attr:`orig_sfc` in
+graphics' co-ordinates---that is, the camera position.
+
+This may be floating-point.  Setting it moves the view of each layer by the
+offset scaled by its :attr:`parallax` ratio.  Where possible, drawing reuses the
+current contents of the surface, so scrolling only draws the newly visible
+areas.
+
+"""
+        return self._offset
+
+    @offset.setter
+    def offset (self, offset):
+        x, y = offset
+        self._offset = (x, y)
+
+    def _layer_ratio (self, layer):
+        # parallax ratio for a layer, as (x_ratio, y_ratio)
+        if layer is None:
+            # overlay
+            return (0, 0)
+        parallax = self.parallax
+        if callable(parallax):
+            ratio = parallax(layer)
+        else:
+            ratio = parallax.get(layer, 1)
+        if isinstance(ratio, (int, float)):
+            ratio = (ratio, ratio)
+        return tuple(ratio)
+
     @property
     def overlay (self):
         """A :class:`Graphic <engine.gfx.graphic.Graphic>` which is always
@@ -373,6 +1003,8 @@ and returns a list of added graphics.
                 all_gs[l] = set((g,))
                 ls.add(l)
             g._manager = self
+            self._index.add(g)
+            self._baker.changed(l)
             # don't draw over any possible previous location
             g.was_visible = False
         self._set_layers_from_set(ls)
@@ -394,10 +1026,13 @@ Missing graphics are ignored.
                 if g in all_gs:
                     # remove from graphics
                     all_gs.remove(g)
+                    self._index.rm(g)
                     g._manager = None
+                    self._baker.changed(l)
                     # draw over previous location
                     if g.was_visible:
-                        self.dirty(g._last_postrot_rect)
+                        dx, dy = self._drawn_offsets.get(l, (0, 0))
+                        self.dirty(g._last_postrot_rect.move(-dx, -dy))
                     # remove layer
                     if not all_gs:
                         del all_graphics[l]
@@ -503,6 +1138,76 @@ persists; set :attr:`overlay` to ``None`` to remove it.
             rects = True
         self._gm_dirty = combine_drawn(self._gm_dirty, rects)
 
+    def _scroll (self, view, offsets, dirty):
+        # reuse what's already drawn for layers whose offsets changed, by
+        # scrolling the surface; returns (scrolled, dirty)
+        drawn_offsets = self._drawn_offsets
+        layers = []
+        for l, (x, y) in zip(self.layers, offsets):
+            old_x, old_y = drawn_offsets.get(l, (x, y))
+            layers.append((l, (x, y), (old_x, old_y), (x - old_x, y - old_y)))
+        deltas = sorted(set(d for l, new, old, d in layers))
+        if deltas == [(0, 0)]:
+            return (False, dirty)
+        # work out the cost of scrolling by each amount as the area we'd need
+        # to redraw: newly visible areas, and the old and new positions of
+        # graphics in layers that moved by a different amount
+        w, h = view.size
+        full_cost = w * h
+        # overhead of redrawing a rect, as an area
+        rect_cost = 4096
+        costs = dict((d, abs(d[0]) * h + abs(d[1]) * w - abs(d[0] * d[1]))
+                     for d in deltas)
+        # [(delta, old_rects, new_rects)] for layers, in the surface's
+        # co-ordinates before and after scrolling
+        moved = []
+        if len(deltas) > 1:
+            for l, new, old, d in layers:
+                old_view = view.move(old)
+                new_view = view.move(new)
+                rs_old = []
+                rs_new = []
+                cost = 0
+                for g in self._index.near(l, (old_view.union(new_view),)):
+                    if g.was_visible:
+                        for r, l_view, rs in (
+                            (g._last_postrot_rect, old_view, rs_old),
+                            (g._postrot_rect, new_view, rs_new)
+                        ):
+                            r = r.clip(l_view)
+                            if r.w > 0 and r.h > 0:
+                                rs.append(r.move(-l_view[0], -l_view[1]))
+                                cost += r.w * r.h + rect_cost
+                for other_d in costs:
+                    if other_d != d:
+                        costs[other_d] += cost
+                if min(costs.itervalues()) >= full_cost:
+                    # cheaper to redraw everything
+                    return (False, True)
+                moved.append((d, rs_old, rs_new))
+        dx, dy = delta = min(deltas, key=costs.get)
+        if abs(dx) >= w or abs(dy) >= h or costs[delta] >= full_cost:
+            return (False, True)
+        dirty = list(dirty) if dirty else []
+        if dx or dy:
+            self._orig_sfc.scroll(-dx, -dy)
+            # dirty areas' contents moved too
+            dirty += [r.move(-dx, -dy) for r in dirty]
+            # newly visible areas
+            if dx:
+                dirty.append(pg.Rect(w - dx if dx > 0 else 0, 0, abs(dx), h))
+            if dy:
+                dirty.append(pg.Rect(0, h - dy if dy > 0 else 0, w, abs(dy)))
+        # graphics in other layers are now in the wrong place
+        for d, rs_old, rs_new in moved:
+            if d != delta:
+                dirty += [r.move(-dx, -dy) for r in rs_old]
+                dirty += rs_new
+        # there may be lots of rects from graphics in other layers
+        dirty = merge_rects([r.clip(view) for r in dirty
+                             if r.colliderect(view)])
+        return (bool(dx or dy), dirty)
+
     def draw (self, handle_dirty = True):
         """Update the display (:attr:`orig_sfc`).
 
@@ -523,13 +1228,30 @@ changed parts of the surface, or ``False`` if nothing changed.
         graphics = self.graphics
         dirty = self._gm_dirty
         self._gm_dirty = []
+        view = sfc.get_rect()
+        ratios = [self._layer_ratio(l) for l in layers]
+        x, y = self._offset
+        offsets = [(ir(x * rx), ir(y * ry)) for rx, ry in ratios]
+        scrolled = False
+        if dirty is not True:
+            scrolled, dirty = self._scroll(view, offsets, dirty)
+        self._drawn_offsets = dict(zip(layers, offsets))
         if dirty is True:
-            dirty = [sfc.get_rect()]
+            dirty = [view]
         elif dirty is False:
             dirty = []
-        dirty = fastdraw(layers, sfc, graphics, dirty)
+        else:
+            dirty = [r.clip(view) for r in dirty if r.colliderect(view)]
+        self._baker.prepare(layers, graphics, ratios)
+        dirty = fastdraw(layers, sfc, graphics, dirty, self._baker, offsets)
+        if scrolled:
+            # every pixel moved
+            dirty = True
         if dirty and handle_dirty:
-            Graphic.dirty(self, *dirty)
+            if dirty is True:
+                Graphic.dirty(self)
+            else:
+                Graphic.dirty(self, *dirty)
         if self._orig_dirty:
             dirty = combine_drawn(dirty, self._orig_dirty)
             if not handle_dirty:
@@ -13,6 +13,12 @@ TODO:
 """
 
 from math import sin, cos, pi
+from weakref import WeakSet
+try:
+    from math import gcd
+except ImportError:
+    # Python 2
+    from fractions import gcd
 
 import pygame as pg
 from pygame import Rect
@@ -20,6 +26,16 @@ from pygame import Rect
 from ..conf import conf
 from ..util import (ir, pos_in_rect, align_rect, normalise_colour, has_alpha,
                     blank_sfc, combine_drawn)
+from .util import transform_cache, blit_all
+
+
+def _rotozoom (sfc, angle):
+    # default rotate_fn; shared so that transform_cache can match it
+    return pg.transform.rotozoom(sfc, angle * 180 / pi, 1)
+
+
+# Graphic.scale_margin for known scale functions
+_scale_margins = {pg.transform.scale: 0}
 
 
 class Graphic (object):
@@ -60,6 +76,8 @@ correspond to builtin transforms (see :meth:`transform`).
 
     is_view = False
     _builtin_transforms = ('crop', 'flip', 'tint', 'resize', 'rotate')
+    # whether builtin transforms may use transform_cache
+    _share_transforms = True
 
     def __init__ (self, img, pos=(0, 0), layer=0,
                   pool=conf.DEFAULT_RESOURCE_POOL, res_mgr=None):
@@ -95,6 +113,9 @@ correspond to builtin transforms (see :meth:`transform`).
         # {function: (args, previous_size, resulting_size, apply_fn, undo_fn)}
         # last 4 None for non-builtins
         self._queued_transforms = {}
+        # transform results that only this graphic uses, so may be altered
+        # in-place
+        self._owned_sfcs = WeakSet()
         #: Whether the graphic is completely opaque; do not change.
         self.opaque = not has_alpha(img)
         self._manager = None
@@ -114,9 +135,11 @@ correspond to builtin transforms (see :meth:`transform`).
         self._tint_colour = (255, 255, 255, 255)
         self._angle = 0
         self._scale_fn = pg.transform.smoothscale
-        self._rotate_fn = lambda sfc, angle: \
-            pg.transform.rotozoom(sfc, angle * 180 / pi, 1)
+        self._scale_margin = None
+        self._rotate_fn = _rotozoom
         self._rotate_threshold = 2 * pi / 500
+        self._rotate_steps = None
+        self._rot_atlas = None
         self._orig_dirty = False # where original surface is changed
         # where final surface is changed; gets used (and reset) by manager
         self._dirty = []
@@ -154,6 +177,9 @@ When setting this, the surface should be already converted for blitting.
         size = sfc.get_size()
         old_sfc = self._orig_sfc
         self._orig_sfc = sfc
+        if sfc is old_sfc:
+            # probably altered in-place
+            self._sfc_changed(sfc)
         if size != old_sfc.get_size():
             self.size_changed(size)
         self._orig_dirty = True
@@ -413,8 +439,33 @@ signature as this default).
     @scale_fn.setter
     def scale_fn (self, scale_fn):
         self._scale_fn = scale_fn
+        self._scale_margin = _scale_margins.get(scale_fn)
         self.retransform('resize')
 
+    @property
+    def scale_margin (self):
+        """How far around a changed area :attr:`scale_fn` looks, in pixels of
+the surface being resized, or ``None``.
+
+If this is not ``None``, when only parts of a resized surface change, only those
+parts (plus this margin) are resized again, and copied into the existing
+result.  The parts are first extended to line up with whole pixels in both
+surfaces.  This only works if :attr:`scale_fn` gives the same result for a part
+of a surface as for the same area in the whole surface, which isn't the case
+for ``pygame.transform.smoothscale`` when enlarging.
+
+Setting :attr:`scale_fn` resets this: to ``0`` for
+``pygame.transform.scale``, otherwise to ``None``.  So set this after
+:attr:`scale_fn`---for example, to ``1`` for a function that uses
+``pygame.transform.scale2x``.
+
+"""
+        return self._scale_margin
+
+    @scale_margin.setter
+    def scale_margin (self, margin):
+        self._scale_margin = margin
+
     @property
     def rotate_fn (self):
         """Function to use for rotating.
@@ -442,6 +493,29 @@ Defaults to ``2 * pi / 500``."""
         self._rotate_threshold = rotate_threshold
         self.retransform('rotate')
 
+    @property
+    def rotate_steps (self):
+        """Number of angles in a full turn to draw rotations at, or ``None``.
+
+If set, the angle passed to :meth:`rotate` is rounded to the nearest of this
+many evenly spaced angles, and rotated surfaces come from a
+:class:`gfx.util.RotationAtlas <engine.gfx.util.RotationAtlas>` loaded into
+this graphic's resource pool.  Each angle is then only rendered once for all
+graphics with the same surface, which suits continuously spinning graphics.
+Atlases are kept until the pool is no longer in use, so this is unsuitable
+where the surface before rotation changes often.
+
+Defaults to ``None``, where every angle is rendered exactly.
+
+"""
+        return self._rotate_steps
+
+    @rotate_steps.setter
+    def rotate_steps (self, rotate_steps):
+        self._rotate_steps = rotate_steps
+        self._rot_atlas = None
+        self.retransform('rotate')
+
     # other properties
 
     @property
@@ -862,7 +936,9 @@ retransform(transform_fn) -> self
         ts = self._transforms
         q = self._queued_transforms
         if transform_fn in ts:
-            if isinstance(transform_fn, basestring):
+            # if already queued, requeuing would replace the new arguments
+            # with the last ones applied
+            if isinstance(transform_fn, basestring) and transform_fn not in q:
                 # no need to handle mods if not builtin, since then _gen_mods
                 # args don't change for any builtins
                 self._undo_transforms(transform_fn)
@@ -985,6 +1061,70 @@ If successful, all transformations are reapplied afterwards, if any.
 
         return ((apply_fn, undo_fn), (w, h))
 
+    def _resize_part (self, src, dest, dirty, w, h):
+        # resize dirty areas of src into dest, which is the result of resizing
+        # src to (w, h) before it changed; returns (new_dest, dirty rects in
+        # new_dest), or None if this isn't possible or wouldn't be quicker
+        margin = self._scale_margin
+        if margin is None:
+            return None
+        start_w, start_h = src.get_size()
+        # a block of px x py pixels in src maps to exactly qx x qy in dest
+        gx = gcd(start_w, w)
+        gy = gcd(start_h, h)
+        px = start_w // gx
+        py = start_h // gy
+        qx = w // gx
+        qy = h // gy
+        bounds = Rect(0, 0, start_w, start_h)
+
+        def align (r, m):
+            # expand by m pixels and out to whole blocks
+            x0 = (r[0] - m) // px * px
+            y0 = (r[1] - m) // py * py
+            x1 = -(-(r[0] + r[2] + m) // px) * px
+            y1 = -(-(r[1] + r[3] + m) // py) * py
+            return Rect(x0, y0, x1 - x0, y1 - y0).clip(bounds)
+
+        # changes spread by the margin, and resizing that area needs the
+        # margin around it as well
+        parts = []
+        area = 0
+        for r in dirty:
+            to_rect = align(r, margin)
+            if to_rect:
+                from_rect = align(r, 2 * margin)
+                parts.append((from_rect, to_rect))
+                area += from_rect.w * from_rect.h
+        if 2 * area > start_w * start_h:
+            # about as slow as resizing everything (this is empirical)
+            return None
+
+        scale_fn = self.scale_fn
+        alpha = has_alpha(dest)
+        dest = self._own(dest)
+        new_dirty = []
+        for from_rect, to_rect in parts:
+            x = from_rect.x // px * qx
+            y = from_rect.y // py * qy
+            size = (from_rect.w // px * qx, from_rect.h // py * qy)
+            sfc = scale_fn(src.subsurface(from_rect), size)
+            if sfc.get_size() != size:
+                # scale_fn doesn't respect the requested size; the caller
+                # replaces dest entirely, so any parts done don't matter
+                return None
+            r = Rect(to_rect.x // px * qx, to_rect.y // py * qy,
+                     to_rect.w // px * qx, to_rect.h // py * qy)
+            if alpha:
+                # copy alpha exactly rather than blending
+                dest.fill((0, 0, 0, 0), r)
+                dest.blit(sfc, r, r.move(-x, -y),
+                          special_flags=pg.BLEND_RGBA_MAX)
+            else:
+                dest.blit(sfc, r, r.move(-x, -y))
+            new_dirty.append(r)
+        return (dest, new_dirty)
+
     def _resize (self, src, dest, dirty, last_args, w, h, scale=False):
         start_w, start_h = src.get_size()
 
@@ -1012,6 +1152,10 @@ If successful, all transformations are reapplied afterwards, if any.
             if (w, h) == parse_args(*last_args):
                 # same as last time
                 if dirty:
+                    part = self._resize_part(src, dest, dirty, w, h)
+                    if part is not None:
+                        # only resized dirty areas
+                        return part
                     # transform dirty rects
                     scale = (float(w) / start_w, float(h) / start_h)
                     new_dirty = []
@@ -1023,7 +1167,10 @@ If successful, all transformations are reapplied afterwards, if any.
                 else:
                     return (dest, False)
         # full transform
-        return (self.scale_fn(src, (w, h)), new_dirty)
+        scale_fn = self.scale_fn
+        return (self._cached_transform(src, 'resize', (scale_fn, w, h),
+                                       lambda: scale_fn(src, (w, h))),
+                new_dirty)
 
     def resize (self, w=None, h=None, scale=False):
         """Resize the graphic.
@@ -1107,6 +1254,8 @@ rescale_both(scale=1) -> self
                     for r in dirty:
                         r = r.clip(rect)
                         if r:
+                            if not new_dirty:
+                                dest = self._own(dest)
                             s = r.move(offset)
                             new_dirty.append(s)
                             dest.blit(src, s, r)
@@ -1114,13 +1263,17 @@ rescale_both(scale=1) -> self
                 else:
                     return (dest, False)
         # do a full transform
-        if start.contains(rect) and not has_alpha(src):
-            new_sfc = pg.Surface(rect.size)
-        else:
-            # not (no longer) opaque
-            new_sfc = blank_sfc(rect.size)
-        new_sfc.blit(src, ((0, 0), rect.size), rect)
-        return (new_sfc, True)
+
+        def crop ():
+            if start.contains(rect) and not has_alpha(src):
+                new_sfc = pg.Surface(rect.size)
+            else:
+                # not (no longer) opaque
+                new_sfc = blank_sfc(rect.size)
+            new_sfc.blit(src, ((0, 0), rect.size), rect)
+            return new_sfc
+
+        return (self._cached_transform(src, 'crop', tuple(rect), crop), True)
 
     def crop (self, rect):
         """Crop the surface to the given rect.
@@ -1157,6 +1310,7 @@ crop(rect) -> self
                 k = 5 if alpha else 3.5
                 if k * sum(r[2] * r[3] for r in dirty) ** .75 < w * h ** .75:
                     # it would (this is all empirical and quite rough)
+                    dest = self._own(dest)
                     new_dirty = []
                     flip = pg.transform.flip
                     for r in dirty:
@@ -1175,7 +1329,8 @@ crop(rect) -> self
             else:
                 return (dest, False)
         # do a full transform
-        new_sfc = pg.transform.flip(src, x, y)
+        new_sfc = self._cached_transform(src, 'flip', (x, y),
+                                         lambda: pg.transform.flip(src, x, y))
         return (new_sfc, True)
 
     def flip (self, x = False, y = False):
@@ -1211,13 +1366,17 @@ flip(x = False, y = False) -> self
         if (dirty is False and last_args is not None and
             normalise_colour(last_args[0]) == colour):
             return (dest, False)
-        if not has_alpha(src):
-            src = src.convert_alpha()
-        new_sfc = pg.Surface(src.get_size()).convert_alpha()
-        new_sfc.fill(colour)
-        if colour[3] > 0:
-            new_sfc.blit(src, (0, 0), special_flags=pg.BLEND_RGBA_MULT)
-        return (new_sfc, True)
+
+        def tint ():
+            alpha_src = src if has_alpha(src) else src.convert_alpha()
+            new_sfc = pg.Surface(src.get_size()).convert_alpha()
+            new_sfc.fill(colour)
+            if colour[3] > 0:
+                new_sfc.blit(alpha_src, (0, 0),
+                             special_flags=pg.BLEND_RGBA_MULT)
+            return new_sfc
+
+        return (self._cached_transform(src, 'tint', colour, tint), True)
 
     def tint (self, colour):
         """Set tint colour, as taken by :func:`engine.util.normalise_colour`.
@@ -1260,6 +1419,8 @@ opacify(opacity) -> self
         return ((apply_fn, undo_fn), src_sz)
 
     def _rotate (self, src, dest, dirty, last_args, angle):
+        if self._rotate_steps is not None:
+            return self._rotate_from_atlas(src, dest, dirty, last_args, angle)
         if abs(angle) < self.rotate_threshold:
             # transform does nothing
             return (src, dirty)
@@ -1274,9 +1435,16 @@ opacify(opacity) -> self
         # do a full transform
         # if not already alpha and we might end up with borders, convert to
         # alpha
-        if angle % (pi / 2) != 0 and not has_alpha(src):
-            src = src.convert_alpha()
-        new_sfc = self.rotate_fn(src, angle)
+        rotate_fn = self.rotate_fn
+
+        def rotate ():
+            if angle % (pi / 2) != 0 and not has_alpha(src):
+                return rotate_fn(src.convert_alpha(), angle)
+            else:
+                return rotate_fn(src, angle)
+
+        new_sfc = self._cached_transform(src, 'rotate', (rotate_fn, angle),
+                                         rotate)
         return (new_sfc, True)
 
     def rotate (self, angle):
@@ -1292,11 +1460,62 @@ Also see :attr:`rot_anchor`.
 """
         return self.transform('rotate', angle)
 
+    def _rotate_from_atlas (self, src, dest, dirty, last_args, angle):
+        # like _rotate, but with the angle rounded to one of rotate_steps
+        steps = self._rotate_steps
+        rotate_fn = self.rotate_fn
+        atlas = self._rot_atlas
+        if (atlas is None or atlas.src is not src or
+            atlas.rotate_fn is not rotate_fn):
+            resources = self._resource_manager
+            if resources is None:
+                resources = conf.GAME.resources
+            atlas = self._rot_atlas = resources.rot_atlas(
+                src, steps, rotate_fn, pool=self._resource_pool
+            )
+        elif dirty and last_args is not None:
+            # src was altered in-place
+            atlas.clear()
+        i = atlas.step(angle)
+        if i == 0:
+            # transform does nothing
+            return (src, dirty)
+        if (not dirty and last_args is not None and
+            atlas.step(last_args[0]) == i):
+            # no change to result
+            return (dest, False)
+        return (atlas[i], True)
+
+    def _cached_transform (self, src, name, args, transform):
+        # get a result from transform_cache, or call transform() and cache it
+        if not self._share_transforms:
+            return transform()
+        sfc = transform_cache.get(src, name, args)
+        if sfc is None:
+            sfc = transform()
+            transform_cache.add(src, name, args, sfc)
+        return sfc
+
+    def _own (self, sfc):
+        # get a surface to alter in-place instead of sfc, the result of a
+        # previous transform, which may be shared through transform_cache
+        if not self._share_transforms or sfc in self._owned_sfcs:
+            return sfc
+        sfc = sfc.copy()
+        self._owned_sfcs.add(sfc)
+        return sfc
+
+    def _sfc_changed (self, sfc):
+        # sfc was altered in-place, so results of transforming it are invalid
+        transform_cache.changed(sfc)
+
     # drawing
 
     def _opaque_in (self, rect):
         """Whether this draws opaque pixels in the whole of the given rect."""
-        return self.opaque and self._postrot_rect.contains(rect)
+        # blending with special flags depends on what's underneath
+        return (self.opaque and not self.blit_flags and
+                self._postrot_rect.contains(rect))
 
     def snapshot (self, copy = True):
         """Return a copy of this graphic.
@@ -1317,8 +1536,9 @@ state*.
         sfc = self._surface.copy() if copy else self._surface
         g = Graphic(sfc, self._postrot_rect.topleft, self._layer,
                     self.blit_flags)
-        for attr in ('visible', 'scale_fn', 'rotate_fn', 'rotate_threshold',
-                     'anchor', 'rot_anchor'):
+        for attr in ('visible', 'scale_fn', 'scale_margin', 'rotate_fn',
+                     'rotate_threshold', 'rotate_steps', 'anchor',
+                     'rot_anchor'):
             setattr(g, attr, getattr(self, attr))
         return g
 
@@ -1379,6 +1599,7 @@ as dirty.  If none are given, the whole of the graphic is flagged.
 """
         dirty = [Rect(r) for r in rects] if rects else True
         self._orig_dirty = combine_drawn(self._orig_dirty, dirty)
+        self._sfc_changed(self._orig_sfc)
 
     def render (self):
         """Update the final surface.
@@ -1437,6 +1658,14 @@ surface.
                 continue
             f = getattr(self, '_' + fn) if isinstance(fn, basestring) else fn
             new_sfc, dirty = f(sfc, dest, dirty, last_args, *args)
+            if not dirty and dest is not None and new_sfc is not dest:
+                # the result changed without the transform saying so, such as
+                # when it stops doing anything and returns src
+                dirty = True
+            if dirty and new_sfc is dest:
+                # partial transform: dest was altered in-place (if it might
+                # have been shared, it was copied first)
+                self._sfc_changed(dest)
             if dirty or dest is None:
                 # transformed for the first time or something changed in
                 # retransforming
@@ -1451,12 +1680,18 @@ surface.
         if len(last_t_ks) > len(t_ks):
             # might have just removed transforms from the end
             dirty = True
+        elif not dirty and sfc is not self._surface:
+            # a forced retransform (which has no previous result to compare
+            # with) may have stopped doing anything
+            dirty = True
 
         self._last_transforms = list(t_ks)
         if self._must_apply_rot:
             self._must_apply_rot = False
             # compute draw offset due to rotation
             angle = ts['rotate'][0][0]
+            if self._rotate_steps is not None:
+                angle = self._rot_atlas.snap(angle)
             w_orig, h_orig = before_rot.get_size()
             w, h = sfc.get_size()
             ax, ay = pos_in_rect(self.rot_anchor, (w_orig, h_orig))
@@ -1479,11 +1714,30 @@ surface.
             self._postrot_rect = pr = r.move(self._rot_offset)
             pr.size = sfc.get_size()
 
-    def _pre_draw (self):
+    def _pre_draw (self, view=None):
         """Called by
 :class:`GraphicsManager <engine.gfx.container.GraphicsManager>` before
-drawing."""
-        self.render()
+drawing.
+
+view: rect of the surface being drawn to, or None.
+
+Returns whether the graphic is entirely outside view, in which case it isn't
+rendered: transforms and changes to the original surface are applied once it is
+back in view.
+
+"""
+        culled = False
+        if view is not None:
+            # where the graphic would be if it didn't change size
+            pr = self._postrot_rect
+            if self._rect != self.last_rect:
+                pr = Rect(self._rect.move(self._rot_offset).topleft, pr.size)
+            # queued resizes already apply to _rect, so include that too
+            if self._rect.size != pr.size:
+                pr = pr.union(self._rect)
+            culled = pr.w > 0 and pr.h > 0 and not pr.colliderect(view)
+        if not culled:
+            self.render()
         dirty = self._dirty
         if self._rect != self.last_rect:
             dirty = True
@@ -1506,23 +1760,33 @@ drawing."""
         else:
             dirty = []
         self._dirty = dirty
+        return culled
 
-    def _draw (self, dest, rects):
+    def _draw (self, dest, rects, offset=(0, 0), blits=None):
         """Draw the graphic.
 
-_draw(dest, rects)
+_draw(dest, rects, offset=(0, 0)[, blits])
 
 dest: pygame.Surface to draw to.
 rects: list of rects to draw in.
+offset: the position of dest's top-left corner in this graphic's co-ordinates,
+        such as a camera position.
+blits: if given, a list to add blits to dest to instead of drawing, as
+       arguments taken by gfx.util.blit_all; the caller performs them in order.
+       Subclasses that draw some other way must first perform and remove any
+       blits already in the list.
 
 Should never alter any state that is not internal to the graphic.
 
 """
         sfc = self._surface
-        blit = dest.blit
+        flags = self.blit_flags
         pr = self._postrot_rect
-        offset = (-pr[0], -pr[1])
-        for r in rects:
-            blit(sfc, r, r.move(offset), self.blit_flags)
+        offset = (offset[0] - pr[0], offset[1] - pr[1])
+        args = [(sfc, r, r.move(offset), flags) for r in rects]
+        if blits is None:
+            blit_all(dest, args)
+        else:
+            blits += args
         self._last_postrot_rect = pr
         self.last_rect = self._rect
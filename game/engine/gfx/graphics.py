@@ -20,6 +20,7 @@ TODO:
 """
 
 from os.path import splitext
+from math import ceil
 
 import pygame as pg
 from pygame import Rect
@@ -236,7 +237,8 @@ class Animation (Graphic):
     """An animated graphic.
 
 Animation(imgs, pos=(0, 0), layer=0[, scheduler],
-          pool=conf.DEFAULT_RESOURCE_POOL, res_mgr=conf.GAME.resources)
+          pool=conf.DEFAULT_RESOURCE_POOL, res_mgr=conf.GAME.resources
+          [, group])
 
 :arg imgs:
     a sequence of images as part of the animation; each can be a Pygame
@@ -251,11 +253,15 @@ Animation(imgs, pos=(0, 0), layer=0[, scheduler],
                 when the graphic is contained by a
                 :class:`GraphicsManager <engine.gfx.container.GraphicsManager>`
                 (and trying to do so otherwise raises ``RuntimeError``).
+:arg group: :class:`sched.TimeoutGroup <engine.sched.TimeoutGroup>` to time
+            frames in; this must belong to the scheduler used.
 
 Other arguments are as taken by :class:`Graphic <engine.gfx.graphic.Graphic>`.
 
 Note that when an animation is playing and the image changes,
-:attr:`Graphic.anchor <engine.gfx.graphic.Graphic.anchor>` is respected.
+:attr:`Graphic.anchor <engine.gfx.graphic.Graphic.anchor>` is respected.  If
+frames would change more often than :data:`conf.MAX_ANIMATION_FPS`, some are
+skipped, so that the animation still takes the same amount of time.
 
 For example, to play the frames in a spritemap consisting of a single row::
 
@@ -263,7 +269,7 @@ For example, to play the frames in a spritemap consisting of a single row::
 
 """
     def __init__ (self, imgs, pos=(0, 0), layer=0, scheduler=None,
-                  pool=conf.DEFAULT_RESOURCE_POOL, res_mgr=None):
+                  pool=conf.DEFAULT_RESOURCE_POOL, res_mgr=None, group=None):
         self._resource_pool = pool
         self._resource_manager = res_mgr
         if len(imgs) == 0:
@@ -282,6 +288,9 @@ For example, to play the frames in a spritemap consisting of a single row::
         # graphics is non-empty due to the exception above
         self._graphic = 0
         Graphic.__init__(self, self._get_sfc(0), pos, layer, pool, res_mgr)
+        # results of builtin transforms for each frame, so playback doesn't
+        # redo them: {(graphic, transform_name): (src, args, result)}
+        self._frame_transforms = {}
         #: ``{name: (indices, frame_time)}`` frame sequences ('animations') as
         #: added through :meth:`add`.
         self.sequences = {}
@@ -289,6 +298,8 @@ For example, to play the frames in a spritemap consisting of a single row::
         self._speed = 1
         #: The ``scheduler`` argument passed to the constructor.
         self.scheduler = scheduler
+        #: The ``group`` argument passed to the constructor.
+        self.group = group
 
         #: The currently playing sequence (name), or ``None``.
         self.playing = None
@@ -311,6 +322,8 @@ For example, to play the frames in a spritemap consisting of a single row::
         self._frame_time_source = None # 'default', 'sequence' or 'runtime'
         self._playing_frame_time = None # set when we start playing
         self._new_frame_time = None # set to flag a frame time change
+        self._timer_frame_time = None # frame time the timer is using
+        self._frame_step = 1 # frames to advance by each time
         self._playing_cb = None
 
     @property
@@ -369,6 +382,23 @@ finished, if any.
             sfc = sfc.surface
         return sfc
 
+    def _cached_transform (self, src, name, args, transform):
+        k = (self._graphic, name)
+        cached = self._frame_transforms.get(k)
+        if cached is not None and cached[0] is src and cached[1] == args:
+            return cached[2]
+        sfc = Graphic._cached_transform(self, src, name, args, transform)
+        # only keep results for the latest arguments
+        self._frame_transforms[k] = (src, args, sfc)
+        return sfc
+
+    def _sfc_changed (self, sfc):
+        Graphic._sfc_changed(self, sfc)
+        frame_transforms = self._frame_transforms
+        for k, cached in frame_transforms.items():
+            if cached[0] is sfc:
+                del frame_transforms[k]
+
     def _get_sched (self):
         s = self.scheduler
         if s is None:
@@ -459,32 +489,48 @@ Missing items are ignored.
                 del seqs[name]
         return self
 
+    def _get_frame_step (self, frame_time):
+        # number of frames to advance by at a time to respect
+        # conf.MAX_ANIMATION_FPS
+        max_fps = conf.MAX_ANIMATION_FPS
+        if max_fps is None or frame_time * max_fps >= 1:
+            return 1
+        return int(ceil(1. / (frame_time * max_fps) - 1e-9))
+
     def _next_frame (self):
         # called through scheduler to move to the next frame
         assert self.playing is not None
         indices = self.sequences[self.playing][0]
-        self.frame += 1
-        if self.frame == len(indices):
-            # reached the end of the sequence
-            if self.repeats is not True and self.repeat == self.repeats:
-                # no repeats left
-                self.playing = self.repeat = self.repeats = self.frame = None
-                # no need to reset other attributes, since they're private
-                if self._playing_cb is not None:
-                    self._playing_cb()
-                if self.playing is None and self.queued:
-                    self.play(*self.queued.pop())
-                return False
-            else:
-                self.repeat += 1
-                self.frame = 0
+        for i in xrange(self._frame_step):
+            self.frame += 1
+            if self.frame == len(indices):
+                # reached the end of the sequence
+                if self.repeats is not True and self.repeat == self.repeats:
+                    # no repeats left
+                    self.playing = self.repeat = self.repeats = None
+                    self.frame = None
+                    # no need to reset other attributes, since they're private
+                    if self._playing_cb is not None:
+                        self._playing_cb()
+                    if self.playing is None and self.queued:
+                        self.play(*self.queued.pop())
+                    return False
+                else:
+                    self.repeat += 1
+                    self.frame = 0
         self.graphic = indices[self.frame]
-        if self._new_frame_time is not None:
+        frame_time = self._new_frame_time
+        if frame_time is None:
+            frame_time = self._timer_frame_time
+        step = self._get_frame_step(frame_time)
+        if self._new_frame_time is not None or step != self._frame_step:
             # adjust speed for next frame
+            self._new_frame_time = None
+            self._timer_frame_time = frame_time
+            self._frame_step = step
             self._timer_id = self._get_sched().add_timeout(
-                self._next_frame, self._new_frame_time
+                self._next_frame, frame_time * step, group=self.group
             )
-            self._new_frame_time = None
             return False
         else:
             return True
@@ -537,8 +583,10 @@ If a sequence is already being played, that sequence is canceled.
             self._frame_time_source = 'runtime'
         frame_time = float(frame_time) / self._speed
         # start the scheduler
-        self._timer_id = s.add_timeout(self._next_frame, frame_time)
-        self._playing_frame_time = frame_time
+        self._frame_step = step = self._get_frame_step(frame_time)
+        self._timer_id = s.add_timeout(self._next_frame, frame_time * step,
+                                       group=self.group)
+        self._playing_frame_time = self._timer_frame_time = frame_time
         self._playing_cb = cb
         return self
 
@@ -628,7 +676,7 @@ unqueue(*names) -> self
                 if sfc is orig_sfc:
                     # same, so need to flag dirty areas
                     if g._dirty is True:
-                        self._orig_dirty = True
+                        self.dirty()
                     else:
                         self.dirty(*g._dirty)
                 else:
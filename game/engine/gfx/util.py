@@ -1,11 +1,37 @@
 """Utilities for graphics."""
 
+from collections import OrderedDict
+from math import pi
+import weakref
+
 import pygame as pg
 
 from ..conf import conf
 from .. import util
 
 
+if hasattr(pg.Surface, 'blits'):
+    def blit_all (dest, blits):
+        """Perform a number of blits to the same surface.
+
+blit_all(dest, blits)
+
+:arg dest: surface to blit to.
+:arg blits: sequence of ``(source, pos, area, special_flags)`` tuples, as taken
+            by ``pygame.Surface.blit``, in the order to blit them.
+
+This uses ``pygame.Surface.blits`` where available (Pygame 1.9.4 and later),
+which saves a Python call per blit.
+
+"""
+        dest.blits(blits, 0)
+else:
+    def blit_all (dest, blits):
+        blit = dest.blit
+        for args in blits:
+            blit(*args)
+
+
 class Spritemap (object):
     """A wrapper for spritesheets.
 
@@ -44,6 +70,8 @@ bottom, left to right, in that order, and slices are as follows::
 where ``sfc`` is a surface containing the sprite.  (The latter form is an
 implicit ``tuple``, so ``spritemap[(col, row)]`` works as well.)
 
+Sprites are subsurfaces of the image, so they should not be altered in-place.
+
 """
 
     def __init__ (self, img, ncols=None, nrows=None, sw=None, sh=None, pad=0,
@@ -94,15 +122,10 @@ implicit ``tuple``, so ``spritemap[(col, row)]`` works as well.)
         self.sprite_h = ss[1]
         #: ``(``:attr:`sprite_w` ``,`` :attr:`sprite_h` ``)``.
         self.sprite_size = tuple(ss)
-        # copy to separate surfaces
-        self._sfcs = sfcs = []
+        # sprites share pixels with the image rather than being copied
         tile_rect = util.Grid(ncells, ss, pad).tile_rect
-        mk_sfc = util.blank_sfc if util.has_alpha(img) else pg.Surface
-        for i in xrange(nsprites):
-            rect = tile_rect(i % ncols, i // ncols)
-            sfc = mk_sfc(rect.size)
-            sfc.blit(img, (0, 0), rect)
-            sfcs.append(sfc)
+        self._sfcs = [img.subsurface(tile_rect(i % ncols, i // ncols))
+                      for i in xrange(nsprites)]
 
     def __len__ (self):
         return len(self._sfcs)
@@ -119,3 +142,278 @@ implicit ``tuple``, so ``spritemap[(col, row)]`` works as well.)
                 raise IndexError('spritemap index out of bounds')
             i = row * ncols + col
         return self._sfcs[i]
+
+
+def pack_sfcs (sfcs, page_size=None):
+    """Copy surfaces into a few large surfaces (texture atlases).
+
+pack_sfcs(sfcs[, page_size]) -> packed
+
+:arg sfcs: sequence of surfaces, converted for blitting.
+:arg page_size: ``(width, height)`` maximum size of the surfaces to pack into;
+                defaults to :data:`conf.IMG_ATLAS_SIZE`.
+
+:return: a list of surfaces with the same contents as ``sfcs``, in the same
+         order.  Each is a subsurface of a shared surface, except for surfaces
+         bigger than a sixteenth of a page, or with a colour key or surface
+         alpha, which are returned unchanged.
+
+Surfaces with per-pixel alpha and opaque surfaces are packed separately, so
+opaque surfaces stay opaque.
+
+"""
+    if page_size is None:
+        page_size = conf.IMG_ATLAS_SIZE
+    pw, ph = page_size
+    rtn = list(sfcs)
+    by_format = ([], [])
+    for i, sfc in enumerate(sfcs):
+        w, h = sfc.get_size()
+        # big surfaces gain little from packing, and waste space in shelves
+        if 16 * w * h <= pw * ph and w <= pw and h <= ph:
+            if sfc.get_flags() & pg.SRCALPHA:
+                # copying pixels loses surface alpha and colour keys
+                if (sfc.get_alpha() in (None, 255) and
+                    sfc.get_colorkey() is None):
+                    by_format[1].append(i)
+            elif not util.has_alpha(sfc):
+                by_format[0].append(i)
+    for alpha, indices in enumerate(by_format):
+        # shelf packing, tallest first so that shelves waste little height
+        indices.sort(key=lambda i: -sfcs[i].get_height())
+        # [(shelves, placed)], where shelves is [[y, h, x]] and placed is
+        # [(i, pos)]
+        pages = []
+        for i in indices:
+            w, h = sfcs[i].get_size()
+            for shelves, placed in pages:
+                shelf = None
+                for s in shelves:
+                    if s[1] >= h and s[2] + w <= pw:
+                        shelf = s
+                        break
+                else:
+                    y = shelves[-1][0] + shelves[-1][1]
+                    if y + h <= ph:
+                        shelf = [y, h, 0]
+                        shelves.append(shelf)
+                if shelf is not None:
+                    break
+            else:
+                shelf = [0, h, 0]
+                shelves = [shelf]
+                placed = []
+                pages.append((shelves, placed))
+            placed.append((i, (shelf[2], shelf[0])))
+            shelf[2] += w
+        for shelves, placed in pages:
+            size = (max(s[2] for s in shelves),
+                    shelves[-1][0] + shelves[-1][1])
+            if alpha:
+                page = util.blank_sfc(size)
+            else:
+                page = pg.Surface(size).convert()
+            for i, pos in placed:
+                sfc = sfcs[i]
+                # page is transparent, so this copies alpha exactly
+                page.blit(sfc, pos, special_flags=pg.BLEND_RGBA_MAX)
+                rtn[i] = page.subsurface((pos, sfc.get_size()))
+    return rtn
+
+
+class TransformCache (object):
+    """A memory-bounded cache of transformed surfaces, shared between graphics.
+
+TransformCache([max_size])
+
+:arg max_size: maximum total size of cached surfaces, in bytes.  Defaults to
+               :data:`conf.TRANSFORM_CACHE_SIZE` (read whenever something is
+               added).  Least recently used surfaces are dropped first.
+
+Results are looked up by the source surface, a transform name and the
+transform's arguments.  Source surfaces are compared by identity, so
+:meth:`changed` must be called when one is altered in-place.  Results should
+never be altered.
+
+Builtin transforms of
+:class:`Graphic <engine.gfx.graphic.Graphic>` instances use
+:data:`transform_cache`.
+
+"""
+
+    def __init__ (self, max_size=None):
+        self.max_size = max_size
+        #: ``{name: count}`` giving the number of successful lookups for each
+        #: transform name.
+        self.hits = {}
+        #: ``{name: count}`` giving the number of failed lookups for each
+        #: transform name.
+        self.misses = {}
+        #: The number of results dropped to stay within the size limit.
+        self.evictions = 0
+        #: The total size of cached surfaces, in bytes.
+        self.size = 0
+        # {(id(src), name, args): (result, size)}, least recently used first
+        self._cache = OrderedDict()
+        # {id(src): (weakref(src), keys)}
+        self._srcs = {}
+
+    def _forget (self, src_id):
+        # drop all results for a source surface
+        ref, keys = self._srcs.pop(src_id, (None, ()))
+        cache = self._cache
+        for k in keys:
+            self.size -= cache.pop(k)[1]
+
+    def get (self, src, name, args):
+        """Retrieve a cached result.
+
+get(src, name, args) -> sfc
+
+:arg src: the source surface.
+:arg name: the transform name.
+:arg args: hashable transform arguments.
+
+:return: the transformed surface, or ``None`` if it isn't cached.
+
+"""
+        k = (id(src), name, args)
+        cache = self._cache
+        if k in cache and self._srcs[k[0]][0]() is src:
+            result = cache.pop(k)
+            cache[k] = result
+            self.hits[name] = self.hits.get(name, 0) + 1
+            return result[0]
+        else:
+            self.misses[name] = self.misses.get(name, 0) + 1
+            return None
+
+    def add (self, src, name, args, sfc):
+        """Cache a result.
+
+add(src, name, args, sfc)
+
+Arguments are as for :meth:`get`, and ``sfc`` is the transformed surface.
+
+"""
+        max_size = self.max_size
+        if max_size is None:
+            max_size = conf.TRANSFORM_CACHE_SIZE
+        size = sfc.get_bytesize() * sfc.get_width() * sfc.get_height()
+        if size > max_size:
+            return
+        src_id = id(src)
+        srcs = self._srcs
+        if src_id in srcs and srcs[src_id][0]() is not src:
+            # the id was reused after a surface was freed
+            self._forget(src_id)
+        if src_id not in srcs:
+            # results for freed surfaces are left to expire
+            srcs[src_id] = (weakref.ref(src), set())
+        k = (src_id, name, args)
+        cache = self._cache
+        if k in cache:
+            self.size -= cache.pop(k)[1]
+        cache[k] = (sfc, size)
+        srcs[src_id][1].add(k)
+        self.size += size
+        # drop least recently used results
+        while self.size > max_size:
+            old_k, (old_sfc, old_size) = cache.popitem(False)
+            self.size -= old_size
+            self.evictions += 1
+            keys = srcs[old_k[0]][1]
+            keys.remove(old_k)
+            if not keys:
+                del srcs[old_k[0]]
+
+    def changed (self, src):
+        """Drop results for a source surface that was altered in-place."""
+        src_id = id(src)
+        srcs = self._srcs
+        if src_id in srcs and srcs[src_id][0]() is src:
+            self._forget(src_id)
+
+    def clear (self):
+        """Drop all cached results."""
+        self._cache = OrderedDict()
+        self._srcs = {}
+        self.size = 0
+
+    def measure (self):
+        """Measure the cached results.
+
+:return: ``{name: size}`` dict giving the total size in bytes of the cached
+         results for each transform name.  Missing names have no cached
+         results.
+
+"""
+        sizes = {}
+        for (src_id, name, args), (sfc, size) in self._cache.iteritems():
+            sizes[name] = sizes.get(name, 0) + size
+        return sizes
+
+
+#: The :class:`TransformCache` used by builtin transforms.
+transform_cache = TransformCache()
+
+
+class RotationAtlas (object):
+    """Rotated copies of a surface at evenly spaced angles, rendered on demand.
+
+RotationAtlas(sfc, steps, rotate_fn)
+
+:arg sfc: the surface to rotate; must not be altered in-place without calling
+          :meth:`clear`.
+:arg steps: the number of angles in a full turn.
+:arg rotate_fn: function to rotate with, as taken by
+                :attr:`Graphic.rotate_fn <engine.gfx.graphic.Graphic.rotate_fn>`.
+
+Index an atlas by step to get the rotated surface, which should never be
+altered; step ``i`` is at angle ``2 * pi * i / steps``.
+
+Atlases are loaded through the ``'rot_atlas'``
+:class:`ResourceManager <engine.res.ResourceManager>` loader, so they are
+shared between graphics and kept for as long as their resource pool is in use.
+
+"""
+
+    def __init__ (self, sfc, steps, rotate_fn):
+        #: The ``sfc`` argument taken by the constructor.
+        self.src = sfc
+        #: The ``steps`` argument taken by the constructor.
+        self.steps = steps
+        #: The ``rotate_fn`` argument taken by the constructor.
+        self.rotate_fn = rotate_fn
+        self._sfcs = [None] * steps
+
+    def __len__ (self):
+        return self.steps
+
+    def __getitem__ (self, i):
+        sfc = self._sfcs[i]
+        if sfc is None:
+            src = self.src
+            angle = 2 * pi * i / self.steps
+            # might end up with borders, so need alpha
+            if i * 4 % self.steps != 0 and not util.has_alpha(src):
+                src = src.convert_alpha()
+            self._sfcs[i] = sfc = self.rotate_fn(src, angle)
+        return sfc
+
+    def step (self, angle):
+        """Get the step closest to the given angle, in radians."""
+        return int(round(angle * self.steps / (2 * pi))) % self.steps
+
+    def snap (self, angle):
+        """Get the angle of the step closest to the given angle."""
+        return 2 * pi * self.step(angle) / self.steps
+
+    def clear (self):
+        """Drop rendered surfaces, for when the source surface was altered."""
+        self._sfcs = [None] * self.steps
+
+    def measure (self):
+        """Get the total size of rendered surfaces, in bytes."""
+        return sum(sfc.get_bytesize() * sfc.get_width() * sfc.get_height()
+                   for sfc in self._sfcs if sfc is not None)
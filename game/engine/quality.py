@@ -0,0 +1,249 @@
+"""Adaptive quality control: trading detail for frame rate."""
+
+import sys
+
+from .conf import conf
+
+
+class Knob (object):
+    """A setting that can be lowered to make frames cheaper.
+
+Knob(name, levels, apply_fn[, active])
+
+:arg name: identifier used when logging changes.
+:arg levels: sequence of values, from highest quality to lowest.
+:arg apply_fn: function to call with a value in ``levels`` to use it.
+:arg active: function that returns whether lowering this knob can currently
+             save any time; if not given, it always can.
+
+"""
+
+    def __init__ (self, name, levels, apply_fn, active=None):
+        #: The ``name`` argument passed to the constructor.
+        self.name = name
+        #: The ``levels`` argument passed to the constructor.
+        self.levels = tuple(levels)
+        #: The ``apply_fn`` argument passed to the constructor.
+        self.apply_fn = apply_fn
+        #: The ``active`` argument passed to the constructor.
+        self.active = active
+        self._level = 0
+
+    @property
+    def level (self):
+        """Index of the current value in :attr:`levels`, where ``0`` is the
+highest quality.  Setting this applies the new value."""
+        return self._level
+
+    @level.setter
+    def level (self, level):
+        level = max(0, min(level, len(self.levels) - 1))
+        if level != self._level:
+            self._level = level
+            self.apply()
+
+    @property
+    def value (self):
+        """The current value in :attr:`levels`."""
+        return self.levels[self._level]
+
+    @property
+    def lowered (self):
+        """Whether the knob is below its highest quality."""
+        return self._level > 0
+
+    def can_lower (self):
+        """Whether lowering the knob would currently do anything."""
+        return (self._level < len(self.levels) - 1 and
+                (self.active is None or self.active()))
+
+    def apply (self):
+        """Use the current value."""
+        self.apply_fn(self.levels[self._level])
+
+
+class QualityGovernor (object):
+    """Lowers and raises :class:`Knob` settings to keep frames within a time
+budget.
+
+QualityGovernor(scheduler[, budget])
+
+:arg scheduler: :class:`sched.Scheduler <engine.sched.Scheduler>` instance that
+                determines the length of a frame.
+:arg budget: the fraction of a frame that updating and drawing may take; if
+             ``None``, quality is never changed.
+
+:class:`Game <engine.game.Game>` reports the time taken to update and draw
+each world to its governor (:attr:`World.quality <engine.game.World.quality>`)
+through :meth:`record_update` and :meth:`record_draw` (except when running
+headless).
+
+Once the average cost of a frame has been over budget for
+:data:`conf.QUALITY_DOWN_FRAMES` drawn frames in a row, the first knob (in the
+order added) that :meth:`Knob.can_lower` is lowered a level.  Once it has been
+under :data:`conf.QUALITY_HEADROOM` of the budget for
+:data:`conf.QUALITY_UP_FRAMES` drawn frames, the most recently lowered knob is
+raised again.  If that takes the cost back over budget soon afterwards, the
+wait before raising quality again is doubled, to avoid flip-flopping.  If
+:data:`conf.DEBUG` is set, each change is logged to ``stderr``.
+
+"""
+
+    def __init__ (self, scheduler, budget=None):
+        #: The ``scheduler`` argument passed to the constructor.
+        self.scheduler = scheduler
+        #: The ``budget`` argument passed to the constructor; may be changed
+        #: directly.
+        self.budget = budget
+        #: ``list`` of added :class:`Knob` instances.
+        self.knobs = []
+        #: Rolling average of the fraction of a frame spent updating and
+        #: drawing, based on :data:`conf.FPS_AVERAGE_RATIO`.
+        self.load = 0
+        # lowered knobs, most recent last, once per level
+        self._lowered = []
+        # time spent and updates run since the last draw
+        self._cost = 0
+        self._updates = 0
+        # consecutive frames over budget/with headroom
+        self._over = 0
+        self._under = 0
+        self._up_frames = conf.QUALITY_UP_FRAMES
+        # drawn frames since quality was last raised
+        self._since_raise = None
+
+    def add (self, *knobs, **kwargs):
+        """Add :class:`Knob` instances, which are applied immediately.
+
+add(*knobs[, position]) -> knobs
+
+:arg position: the index in :attr:`knobs` to insert the given knobs at.  Knobs
+               earlier in the list are lowered first.  If not given, the knobs
+               are added to the end.
+
+:return: a list of the given knobs.
+
+"""
+        i = kwargs.get('position')
+        if i is None:
+            i = len(self.knobs)
+        self.knobs[i:i] = knobs
+        for knob in knobs:
+            knob.apply()
+        return list(knobs)
+
+    def rm (self, *knobs):
+        """Remove :class:`Knob` instances.  Missing knobs are ignored.
+
+Removed knobs are left at their current level.
+
+"""
+        for knob in knobs:
+            if knob in self.knobs:
+                self.knobs.remove(knob)
+            self._lowered = [k for k in self._lowered if k is not knob]
+
+    def apply (self):
+        """Apply all knobs' current values.
+
+This is for when something else may have changed the settings they control,
+such as another world's governor.
+
+"""
+        for knob in self.knobs:
+            knob.apply()
+
+    def reset (self):
+        """Return all knobs to their highest quality and start measuring
+afresh."""
+        for knob in self.knobs:
+            knob.level = 0
+        self._lowered = []
+        self.load = 0
+        self._cost = 0
+        self._updates = 0
+        self._over = 0
+        self._under = 0
+        self._up_frames = conf.QUALITY_UP_FRAMES
+        self._since_raise = None
+
+    def record_update (self, t):
+        """Note that an update took ``t`` seconds."""
+        self._cost += t
+        self._updates += 1
+
+    def record_draw (self, t):
+        """Note that a draw took ``t`` seconds, and adjust quality if
+necessary."""
+        # cost per frame since the last draw, as a fraction of a frame
+        n = max(self._updates, 1)
+        load = (self._cost + t) / (n * self.scheduler.frame)
+        self._cost = 0
+        self._updates = 0
+        r = conf.FPS_AVERAGE_RATIO
+        self.load = load = (1 - r) * self.load + r * load
+        budget = self.budget
+        if budget is None:
+            return
+        if self._since_raise is not None:
+            self._since_raise += 1
+        if load > budget:
+            self._over += 1
+            self._under = 0
+            if self._over >= conf.QUALITY_DOWN_FRAMES:
+                self.lower()
+        elif load < budget * conf.QUALITY_HEADROOM:
+            self._under += 1
+            self._over = 0
+            if self._under >= self._up_frames:
+                self.raise_()
+        else:
+            self._over = 0
+            self._under = 0
+
+    def _log (self, knob, old, action):
+        if conf.DEBUG:
+            print >> sys.stderr, ('info: {0} quality: {1} -> {2} ({3} at '
+                                  '{4:.0f}% of a frame)').format(
+                action, old, knob.value, knob.name, 100 * self.load
+            )
+
+    def lower (self):
+        """Lower the first knob that can be lowered, if any.
+
+:return: the knob that was lowered, or ``None``.
+
+"""
+        self._over = 0
+        for knob in self.knobs:
+            if knob.can_lower():
+                break
+        else:
+            return None
+        if (self._since_raise is not None and
+            self._since_raise < self._up_frames):
+            # raised too soon: wait longer next time
+            self._up_frames = min(2 * self._up_frames,
+                                  8 * conf.QUALITY_UP_FRAMES)
+        self._since_raise = None
+        old = knob.value
+        knob.level += 1
+        self._lowered.append(knob)
+        self._log(knob, old, 'lowered')
+        return knob
+
+    def raise_ (self):
+        """Raise the most recently lowered knob, if any.
+
+:return: the knob that was raised, or ``None``.
+
+"""
+        self._under = 0
+        if not self._lowered:
+            return None
+        knob = self._lowered.pop()
+        old = knob.value
+        knob.level -= 1
+        self._since_raise = 0
+        self._log(knob, old, 'raised')
+        return knob
@@ -11,10 +11,13 @@ TODO:
 
 """
 
+import os
+
 import pygame as pg
 
 from .conf import conf
 from .util import convert_sfc, normalise_colour
+from .gfx.util import RotationAtlas, pack_sfcs
 
 
 def _identity_keys (arg):
@@ -38,6 +41,14 @@ def _measure_img (sfc):
     return sfc.get_bytesize() * sfc.get_width() * sfc.get_height()
 
 
+def _find_imgs (d):
+    # find image files directly in the given directory
+    exts = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tga')
+    return sorted(fn for fn in os.listdir(d)
+                  if fn.lower().endswith(exts) and
+                  os.path.isfile(os.path.join(d, fn)))
+
+
 def load_font (fn, size):
     """:class:`ResourceManager` loader for Pygame fonts (``'font'``).
 
@@ -110,6 +121,28 @@ def _measure_snd (snd):
     return snd.get_length()
 
 
+def load_rot_atlas (sfc, steps, rotate_fn):
+    """:class:`ResourceManager` loader for rotation atlases (``'rot_atlas'``).
+
+load_rot_atlas(sfc, steps, rotate_fn) -> atlas
+
+Arguments are as taken by
+:class:`gfx.util.RotationAtlas <engine.gfx.util.RotationAtlas>`, which is
+returned.  Surfaces are cached by identity.
+
+"""
+    return RotationAtlas(sfc, steps, rotate_fn)
+
+
+def _mk_rot_atlas_keys (sfc, steps, rotate_fn):
+    # the atlas keeps the surface alive, so its id won't be reused while cached
+    yield (id(sfc), steps, rotate_fn)
+
+
+def _measure_rot_atlas (atlas):
+    return atlas.measure()
+
+
 class ResourceManager (object):
     """Manage the loading and caching of resources.
 
@@ -131,7 +164,9 @@ in this module.
             'img': (load_img, _identity_keys, _measure_img),
             'font': (load_font, _mk_font_keys, _unit_measure),
             'text': (load_text, _mk_text_keys, _measure_text),
-            'snd': (load_snd, _identity_keys, _measure_snd)
+            'snd': (load_snd, _identity_keys, _measure_snd),
+            'rot_atlas': (load_rot_atlas, _mk_rot_atlas_keys,
+                          _measure_rot_atlas)
         }
         # {name: (cache, users)}, where cache is {loader: {cache_key: data}}
         # and users is a set
@@ -191,6 +226,48 @@ This is equivalent to
             resource = cache[ks.pop()]
         return resource
 
+    def pack_imgs (self, fns=None, pool=None):
+        """Load images packed into a few large surfaces.
+
+pack_imgs([fns], pool=conf.DEFAULT_RESOURCE_POOL) -> sfcs
+
+:arg fns: filenames of images to load, under :data:`conf.IMG_DIR`; defaults to
+          all images in that directory.
+:arg pool: the pool to cache the images in.
+
+:return: a list of the loaded images.
+
+The images are packed using
+:func:`gfx.util.pack_sfcs <engine.gfx.util.pack_sfcs>`, and cached as if loaded
+by the ``'img'`` loader, so they are returned by later calls to ``img()``.
+Images that are already cached in the pool are not reloaded.  As with
+:meth:`load`, nothing is cached if the pool has no users.
+
+"""
+        if pool is None:
+            pool = conf.DEFAULT_RESOURCE_POOL
+        if fns is None:
+            fns = _find_imgs(conf.IMG_DIR)
+        cache, users = self._pools.setdefault(pool, ({}, set()))
+        cache = cache.setdefault('img', {})
+        load, mk_keys, measure = self._loaders['img']
+        fn_ks = [set(mk_keys(fn)) for fn in fns]
+        cached = set(cache.iterkeys())
+        rtn = [None] * len(fns)
+        new = []
+        for i, ks in enumerate(fn_ks):
+            if ks & cached:
+                rtn[i] = cache[(ks & cached).pop()]
+            else:
+                new.append(i)
+        sfcs = pack_sfcs([load(fns[i]) for i in new])
+        for i, sfc in zip(new, sfcs):
+            rtn[i] = sfc
+            if users:
+                for k in fn_ks[i]:
+                    cache[k] = sfc
+        return rtn
+
     def register (self, name, load, mk_keys, measure=_unit_measure):
         """Register a new resource loader.
 
@@ -1,10 +1,23 @@
 """Event scheduler and interpolation."""
 
-from time import time
+try:
+    from time import perf_counter
+except ImportError:
+    from timeit import default_timer as perf_counter
+import sys
 from bisect import bisect
 from math import cos, atan, exp
 from random import randrange, expovariate
 from functools import partial
+from collections import deque
+from heapq import heappush, heappop, heapify
+from types import GeneratorType
+from threading import Thread
+from Queue import Queue
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 from pygame.time import wait
 
@@ -404,6 +417,34 @@ value if you can easily do so.
     return g.send
 
 
+def _cb_name (cb):
+    """Get a readable qualified name for a callback, for profiling."""
+    if isinstance(cb, partial):
+        return _cb_name(cb.func)
+    obj = getattr(cb, '__self__', None)
+    name = getattr(cb, '__name__', None)
+    if obj is not None:
+        if hasattr(obj, 'gi_code'):
+            # generator's next method
+            return '{0}:{1}'.format(obj.gi_code.co_name, name)
+        cls = obj if isinstance(obj, type) else type(obj)
+        return '{0}.{1}'.format(cls.__name__, name)
+    elif name is not None:
+        return '{0}.{1}'.format(getattr(cb, '__module__', None), name)
+    else:
+        return repr(cb)
+
+
+def _caller_site ():
+    """Get ``'file:line'`` for the first caller outside this module."""
+    f = sys._getframe(1)
+    while f is not None and f.f_globals.get('__name__') == __name__:
+        f = f.f_back
+    if f is None:
+        return None
+    return '{0}:{1}'.format(f.f_code.co_filename, f.f_lineno)
+
+
 class Timer (object):
     """Frame-based timer.
 
@@ -427,6 +468,29 @@ Timer(fps=60)
         #: ``cb`` argument to :meth:`run` and any sleeping to make up a full
         #: frame).
         self.elapsed = None
+        #: Whether :meth:`run` uses a fixed timestep: ``cb`` is called at a
+        #: fixed rate of :attr:`fps`, as many times as necessary to catch up
+        #: with real time, and ``draw`` is called once per iteration.
+        self.fixed_step = False
+        #: In fixed-timestep mode, the maximum number of times ``cb`` is called
+        #: before drawing; any further time is dropped rather than caught up.
+        self.max_steps = 5
+        #: Whether :meth:`run` uses a virtual clock: frames run as fast as
+        #: possible, without waiting, and each is taken to last exactly
+        #: :attr:`frame` seconds.
+        self.virtual = False
+        #: Interpolation ratio for drawing, from ``0`` to ``1``: draw the
+        #: state as ``previous * (1 - alpha) + current * alpha``, where
+        #: ``current`` is the state after the last call to ``cb`` and
+        #: ``previous`` the state before.  This is always ``1`` unless using
+        #: :attr:`fixed_step`.
+        self.alpha = 1
+        #: The learned amount of time in seconds that sleeping overshoots by;
+        #: sleeps are cut short by this much (plus :data:`conf.PACING_SPIN`),
+        #: and the rest of the wait is spent busy-waiting.
+        self.oversleep = .001
+        # real lengths of recent frames, for frame_stats
+        self._frame_times = deque(maxlen=conf.PACING_STATS_FRAMES)
 
     @property
     def fps (self):
@@ -449,10 +513,50 @@ because of slow calls to the ``cb`` argument to :meth:`run`.
 """
         return 1 / self.current_frame_time
 
+    @property
+    def frame_stats (self):
+        """Statistics on the real lengths of recent frames.
+
+A ``(mean, stdev, min, max)`` tuple in seconds over the last
+:data:`conf.PACING_STATS_FRAMES` frames, or ``None`` if no frames have been
+run.  ``stdev`` is the frame-to-frame jitter.
+
+"""
+        times = self._frame_times
+        n = len(times)
+        if not n:
+            return None
+        mean = sum(times) / n
+        var = sum((t - mean) * (t - mean) for t in times) / n
+        return (mean, var ** .5, min(times), max(times))
+
+    def _wait_until (self, t_end):
+        """Wait until the given time, as returned by ``perf_counter``.
+
+Sleeps for as much of the time as possible, then busy-waits for the rest, and
+updates :attr:`oversleep`.
+
+"""
+        t = perf_counter()
+        t_sleep = t_end - t - self.oversleep - conf.PACING_SPIN
+        if t_sleep >= .001:
+            ms = int(1000 * t_sleep)
+            wait(ms)
+            t_woke = perf_counter()
+            over = t_woke - t - .001 * ms
+            # quicker to grow than to shrink, but not so quick that the odd
+            # long stall leaves us busy-waiting for most of every frame
+            if over > self.oversleep:
+                self.oversleep += .1 * (over - self.oversleep)
+            else:
+                self.oversleep += .01 * (over - self.oversleep)
+        while perf_counter() < t_end:
+            pass
+
     def run (self, cb, *args, **kwargs):
         """Run indefinitely or for a specified amount of time.
 
-run(cb, *args[, seconds][, frames]) -> remain
+run(cb, *args[, seconds][, frames][, draw]) -> remain
 
 :arg cb: a function to call every frame.
 :arg args: extra arguments to pass to cb.
@@ -460,6 +564,10 @@ run(cb, *args[, seconds][, frames]) -> remain
               changes to :attr:`fps`.
 :arg frames: the number of frames to run for; can be a float.  Ignored if
              ``seconds`` is passed.
+:arg draw: a function to call without arguments after ``cb`` to draw; in
+           fixed-timestep mode (see :attr:`fixed_step`), this is called once
+           per iteration however many times ``cb`` is called, and may use
+           :attr:`alpha`.
 
 If neither ``seconds`` nor ``frames`` is given, run forever (until :meth:`stop`
 is called).  Time passed is based on the number of frames that have passed, so
@@ -475,43 +583,55 @@ it does not necessarily reflect real time.
         self._stopped = False
         seconds = kwargs.get('seconds')
         frames = kwargs.get('frames')
+        draw = kwargs.get('draw')
         if seconds is not None:
             seconds = max(seconds, 0)
         elif frames is not None:
             frames = max(frames, 0)
-        # main loop
-        t0 = time()
+        if self.virtual:
+            return self._run_virtual(cb, args, seconds, frames, draw)
+        if self.fixed_step:
+            return self._run_fixed(cb, args, seconds, frames, draw)
+        self.alpha = 1
+        self._frame_times.clear()
+        # main loop: each frame ends at a deadline a frame after the previous
+        # one, catching up over following frames if one takes too long
+        t0 = deadline = perf_counter()
         while True:
             # call the callback
             frame = self.frame
             cb(*args)
-            t_gone = time() - t0
+            if draw is not None and not self._stopped:
+                draw()
             # return if necessary
             if self._stopped:
+                t_gone = perf_counter() - t0
                 if seconds is not None:
                     return seconds - t_gone
                 elif frames is not None:
                     return frames - t_gone / frame
                 else:
                     return None
-            # check how long to wait until the end of the frame by aiming for a
-            # rolling frame average equal to the target frame time
-            frame_t = (1 - r) * self.current_frame_time + r * t_gone
-            t_left = (frame - frame_t) / r
-            # reduce wait if we would go over the requested running time
+            deadline += frame
+            # don't wait past the requested running time
             if seconds is not None:
-                t_left = min(seconds, t_left)
+                deadline = min(deadline, t0 + seconds)
             elif frames is not None:
-                t_left = min(frames * frame, t_left)
-            # wait
-            if t_left > 0:
-                wait(int(1000 * t_left))
-                t_gone += t_left
-                frame_t += r * t_left
+                deadline = min(deadline, t0 + frames * frame)
+            t = perf_counter()
+            if t < deadline:
+                self._wait_until(deadline)
+                t = perf_counter()
+            elif t - deadline > frame:
+                # too far behind to catch up
+                deadline = t
             # update some attributes
-            t0 += t_gone
+            t_gone = t - t0
+            t0 = t
             self.elapsed = t_gone
-            self.current_frame_time = frame_t
+            self._frame_times.append(t_gone)
+            self.current_frame_time = ((1 - r) * self.current_frame_time +
+                                       r * t_gone)
             self.t += t_gone
             # return if necessary
             if seconds is not None:
@@ -523,42 +643,604 @@ it does not necessarily reflect real time.
                 if frames <= 0:
                     return frames
 
+    def _run_virtual (self, cb, args, seconds, frames, draw):
+        """:meth:`run` with a virtual clock."""
+        self.alpha = 1
+        while True:
+            frame = self.frame
+            cb(*args)
+            if not self._stopped and draw is not None:
+                draw()
+            # every frame takes exactly as long as it should
+            self.t += frame
+            self.elapsed = self.current_frame_time = frame
+            # return if necessary
+            if seconds is not None:
+                seconds -= frame
+                if seconds <= 0 or self._stopped:
+                    return seconds
+            elif frames is not None:
+                frames -= 1
+                if frames <= 0 or self._stopped:
+                    return frames
+            elif self._stopped:
+                return None
+
+    def _run_fixed (self, cb, args, seconds, frames, draw):
+        """:meth:`run` in fixed-timestep mode."""
+        r = conf.FPS_AVERAGE_RATIO
+        self._frame_times.clear()
+        # time not yet simulated; start with a step
+        acc = self.frame
+        t_last = t0 = perf_counter()
+        while True:
+            # accumulate real time, and wait until a step is due
+            frame = self.frame
+            t = perf_counter()
+            acc += t - t_last
+            t_last = t
+            if acc < frame:
+                self._wait_until(t + frame - acc)
+                continue
+            # catch up with steps
+            steps = 0
+            while acc >= frame and steps < self.max_steps:
+                cb(*args)
+                acc -= frame
+                steps += 1
+                self.t += frame
+                # return if necessary
+                if seconds is not None:
+                    seconds -= frame
+                    if seconds <= 0 or self._stopped:
+                        return seconds
+                elif frames is not None:
+                    frames -= 1
+                    if frames <= 0 or self._stopped:
+                        return frames
+                elif self._stopped:
+                    return None
+                frame = self.frame
+            if acc >= frame:
+                # too far behind: drop whole frames
+                acc %= frame
+            # draw
+            self.alpha = acc / frame
+            if draw is not None:
+                draw()
+            # update some attributes
+            t = perf_counter()
+            self.elapsed = t_gone = t - t0
+            t0 = t
+            self._frame_times.append(t_gone)
+            self.current_frame_time = ((1 - r) * self.current_frame_time +
+                                       r * t_gone)
+
     def stop (self):
         """Stop the current call to :meth:`run`, if any."""
         self._stopped = True
 
 
+class _HeapQueue (object):
+    """Priority queue of timeouts for :class:`Scheduler`, using a heap.
+
+_HeapQueue(cbs)
+
+:arg cbs: the scheduler's timeout data, keyed by identifier.
+
+Timeout data stores its heap entry at index ``6``; removed entries are left in
+the heap and skipped.
+
+"""
+
+    def __init__ (self, cbs):
+        self._cbs = cbs
+        # [due, seq, ident]; seq orders entries with the same due time
+        self._heap = []
+        self._n_stale = 0
+        self._max_seq = 0
+
+    def __len__ (self):
+        return len(self._heap) - self._n_stale
+
+    def push (self, ident, data):
+        """Add a timeout at its due time, replacing any existing entry."""
+        if data[6] is not None:
+            # previous entry is still in the heap
+            self._n_stale += 1
+        entry = [data[0], self._max_seq, ident]
+        self._max_seq += 1
+        data[6] = entry
+        heappush(self._heap, entry)
+
+    def remove (self, ident, data):
+        """Remove a timeout, if queued."""
+        if data[6] is not None:
+            data[6] = None
+            self._n_stale += 1
+            heap = self._heap
+            if self._n_stale > 64 and 2 * self._n_stale > len(heap):
+                # mostly stale entries: compact
+                cbs = self._cbs
+                heap[:] = [e for e in heap
+                           if e[2] in cbs and cbs[e[2]][6] is e]
+                heapify(heap)
+                self._n_stale = 0
+
+    def pop_due (self, now, due):
+        """Remove timeouts due at or before the given clock value.
+
+pop_due(now, due)
+
+:arg now: the current clock value.
+:arg due: list to append ``(ident, data)`` to for each removed timeout.
+
+"""
+        heap = self._heap
+        cbs = self._cbs
+        while heap and heap[0][0] <= now:
+            entry = heappop(heap)
+            ident = entry[2]
+            data = cbs.get(ident)
+            if data is None or data[6] is not entry:
+                # removed or requeued
+                self._n_stale -= 1
+            else:
+                data[6] = None
+                due.append((ident, data))
+
+
+class _WheelQueue (object):
+    """Priority queue of timeouts for :class:`Scheduler`, using a hierarchical
+timing wheel.
+
+_WheelQueue(width, start=0)
+
+:arg width: the length of a slot in the clock's units.
+:arg start: the clock's current value.
+
+Adding and removing timeouts takes constant time, and timeouts in a slot are
+only looked at when the slot is reached (or when it moves to a lower level of
+the wheel).  Timeout data stores the ``dict`` it's in at index ``6``.
+
+"""
+
+    # slots per level, as a power of 2
+    _BITS = 8
+    _LEVELS = 4
+
+    def __init__ (self, width, start=0):
+        self._width = float(width)
+        n = 1 << self._BITS
+        # [level][index] -> {ident: data}
+        self._wheel = [[{} for i in xrange(n)] for l in xrange(self._LEVELS)]
+        # timeouts beyond the last level
+        self._overflow = {}
+        # the slot the clock is in
+        self._pos = int(start // self._width)
+        self._n = 0
+
+    def __len__ (self):
+        return self._n
+
+    def _insert (self, ident, data):
+        # put a timeout in the bucket for its slot
+        bits = self._BITS
+        pos = self._pos
+        slot = max(int(data[0] // self._width), pos)
+        d = slot - pos
+        for level in xrange(self._LEVELS):
+            if d < 1 << (bits * (level + 1)):
+                bucket = self._wheel[level][(slot >> (bits * level)) &
+                                            ((1 << bits) - 1)]
+                break
+        else:
+            bucket = self._overflow
+        bucket[ident] = data
+        data[6] = bucket
+
+    def push (self, ident, data):
+        """Add a timeout at its due time, replacing any existing entry."""
+        if data[6] is None:
+            self._n += 1
+        else:
+            del data[6][ident]
+        self._insert(ident, data)
+
+    def remove (self, ident, data):
+        """Remove a timeout, if queued."""
+        bucket = data[6]
+        if bucket is not None:
+            del bucket[ident]
+            data[6] = None
+            self._n -= 1
+
+    def _cascade (self):
+        # move timeouts down the levels after moving into a new slot
+        bits = self._BITS
+        mask = (1 << bits) - 1
+        pos = self._pos
+        # find the highest level whose current bucket starts here
+        level = 0
+        while (level < self._LEVELS - 1 and
+               not pos & ((1 << (bits * (level + 1))) - 1)):
+            level += 1
+        while level > 0:
+            if level == self._LEVELS - 1:
+                overflow = self._overflow
+                self._overflow = {}
+                for ident, data in overflow.iteritems():
+                    self._insert(ident, data)
+            bucket = self._wheel[level][(pos >> (bits * level)) & mask]
+            if bucket:
+                items = bucket.items()
+                bucket.clear()
+                for ident, data in items:
+                    self._insert(ident, data)
+            level -= 1
+
+    def pop_due (self, now, due):
+        """Remove timeouts due at or before the given clock value.
+
+pop_due(now, due)
+
+:arg now: the current clock value.
+:arg due: list to append ``(ident, data)`` to for each removed timeout.
+
+"""
+        target = int(now // self._width)
+        level0 = self._wheel[0]
+        mask = (1 << self._BITS) - 1
+        while True:
+            bucket = level0[self._pos & mask]
+            if self._pos < target:
+                # the whole slot has passed
+                if bucket:
+                    for item in bucket.iteritems():
+                        item[1][6] = None
+                        due.append(item)
+                    self._n -= len(bucket)
+                    bucket.clear()
+                self._pos += 1
+                self._cascade()
+            else:
+                # the clock is in this slot
+                if bucket:
+                    for ident, data in bucket.items():
+                        if data[0] <= now:
+                            del bucket[ident]
+                            data[6] = None
+                            due.append((ident, data))
+                            self._n -= 1
+                break
+
+
+class _Clock (object):
+    """Clocks and queues for a group of timeouts in a :class:`Scheduler`."""
+
+    def __init__ (self, queues, frames=0, seconds=0, scale=1, paused=False):
+        # (frame-based, seconds-based)
+        self.queues = queues
+        self.frames = frames
+        self.seconds = seconds
+        self.scale = scale
+        self.paused = paused
+        # set to False when the group is cancelled; timeouts that use a dead
+        # clock are treated as removed
+        self.alive = True
+        # number of timeouts using this clock
+        self.n = 0
+
+
+class TimeoutGroup (object):
+    """A group of timeouts in a :class:`Scheduler` that can be paused, cancelled
+and slowed down together.
+
+Create instances using :meth:`Scheduler.group`, and pass them as the ``group``
+argument to :meth:`Scheduler.add_timeout` and similar methods.
+
+A group has its own clocks, which stop while the group is paused and, for
+seconds-based timeouts, run at :attr:`scale` times real speed, so each
+operation takes constant time no matter how many timeouts are in the group.
+Frame-based timeouts count frames while the group isn't paused, and are not
+affected by :attr:`scale`.
+
+"""
+
+    def __init__ (self, scheduler, scale=1):
+        #: The :class:`Scheduler` this group belongs to.
+        self.scheduler = scheduler
+        self._clock = _Clock(scheduler._new_queues(), scale=scale)
+
+    @property
+    def paused (self):
+        """Whether the group is paused (see :meth:`pause`)."""
+        return self._clock.paused
+
+    @property
+    def scale (self):
+        """Factor to scale time by for seconds-based timeouts and
+interpolations.
+
+For example, ``.5`` makes them run at half speed.  Set this directly.
+
+"""
+        return self._clock.scale
+
+    @scale.setter
+    def scale (self, scale):
+        self._clock.scale = scale
+
+    @property
+    def frames_elapsed (self):
+        """The number of frames this group has run for while not paused."""
+        return self._clock.frames
+
+    @property
+    def seconds_elapsed (self):
+        """The amount of (scaled) time in seconds this group has run for while
+not paused."""
+        return self._clock.seconds
+
+    @property
+    def frame(self):
+        """The current (scaled) length of a frame in seconds."""
+        return self.scheduler.frame * self._clock.scale
+
+    def pause (self):
+        """Pause all timeouts in the group."""
+        self._clock.paused = True
+
+    def unpause (self):
+        """Continue all timeouts in the group, if paused."""
+        self._clock.paused = False
+
+    def cancel (self):
+        """Remove all timeouts in the group.
+
+The group can continue to be used.
+
+"""
+        self.scheduler._cancel_clock(self)
+
+
 class Scheduler (Timer):
     """Frame-based event scheduler.
 
-Scheduler(fps = 60)
+Scheduler(fps = 60, backend = 'heap')
 
 :arg fps: frames per second to aim for.
+:arg backend: how to store timeouts: ``'heap'`` or ``'wheel'``.
+
+Timeouts are kept in priority queues ordered by the frame or time at which they
+are due, so the work done each frame depends only on the number of timeouts that
+are called, not the total number of timeouts.  With the ``'heap'`` backend,
+adding a timeout takes time logarithmic in the number of timeouts; with the
+``'wheel'`` backend (a hierarchical timing wheel), adding and removing timeouts
+takes constant time, which is faster for very large numbers of short timeouts.
 
 """
 
-    def __init__ (self, fps = 60):
+    # upper bounds of profiling histogram bins, in seconds
+    _HIST_BOUNDS = (1e-5, 1e-4, 1e-3, 1e-2, 1e-1)
+
+    def __init__ (self, fps = 60, backend = 'heap'):
         Timer.__init__(self, fps)
+        if backend not in ('heap', 'wheel'):
+            raise ValueError('unknown backend: {0}'.format(repr(backend)))
+        #: The ``backend`` argument passed to the constructor.
+        self.backend = backend
+        # {ident: [due, use_seconds, repeat_seconds, repeat_frames,
+        #          paused_remain, cb, entry, profile_key, clock]}
+        # paused_remain is None if not paused; entry identifies the queue entry
+        # and is None if not queued; profile_key is (name, site) if profiling
+        # when added; clock is the _Clock for the timeout's group
         self._cbs = {}
+        # clock for timeouts not in a group
+        self._root = _Clock(self._new_queues())
+        # all live clocks
+        self._clocks = [self._root]
+        # number of timeouts in _cbs with dead clocks
+        self._n_dead = 0
         self._max_id = 0
+        self._batch = None
+        # jobs submitted through submit that haven't been finished
+        self._jobs = set()
+        # (future, result, exc) for jobs finished by worker threads
+        self._jobs_done = deque()
+        # {(name, site): [calls, total, max, recent]} when profiling, else None
+        self._profile = None
+        self._profile_stats = {}
+
+    @property
+    def frames_elapsed (self):
+        """The number of frames this scheduler has handled."""
+        return self._root.frames
+
+    @property
+    def seconds_elapsed (self):
+        """The amount of time in seconds this scheduler has handled.
+
+This is the sum of the frame lengths of all handled frames.  Unlike
+:attr:`Timer.t`, this persists over calls to :meth:`run`.
+
+"""
+        return self._root.seconds
+
+    def _new_queues (self, frames=0, seconds=0):
+        # create queues for frame- and seconds-based timeouts, for a clock
+        # currently at the given values
+        if self.backend == 'heap':
+            return (_HeapQueue(self._cbs), _HeapQueue(self._cbs))
+        else:
+            return (_WheelQueue(1, frames),
+                    _WheelQueue(1. / self.fps, seconds))
+
+    def group (self, scale = 1):
+        """Create a :class:`TimeoutGroup` in this scheduler.
+
+group(scale = 1) -> new_group
+
+:arg scale: initial value of :attr:`TimeoutGroup.scale`.
+
+"""
+        group = TimeoutGroup(self, scale)
+        self._clocks.append(group._clock)
+        return group
+
+    def rm_group (self, *groups):
+        """Remove groups created by :meth:`group`, cancelling their timeouts.
+
+Removed groups cannot be used again.
+
+"""
+        for group in groups:
+            clock = group._clock
+            if clock in self._clocks:
+                self._clocks.remove(clock)
+                self._kill_clock(clock)
+
+    def _kill_clock (self, clock):
+        # remove all timeouts using a clock
+        clock.alive = False
+        self._n_dead += clock.n
+        cbs = self._cbs
+        if self._n_dead > 64 and 2 * self._n_dead > len(cbs):
+            # mostly dead timeouts: clean up
+            for ident, data in cbs.items():
+                if not data[8].alive:
+                    del cbs[ident]
+            self._n_dead = 0
+
+    def _cancel_clock (self, group):
+        # cancel a group's timeouts, giving it a new clock
+        old = group._clock
+        new = _Clock(self._new_queues(old.frames, old.seconds), old.frames,
+                     old.seconds, old.scale, old.paused)
+        group._clock = new
+        self._clocks[self._clocks.index(old)] = new
+        self._kill_clock(old)
+
+    def _get (self, ident):
+        # get a timeout's data, or None if missing
+        data = self._cbs.get(ident)
+        if data is not None and not data[8].alive:
+            del self._cbs[ident]
+            self._n_dead -= 1
+            return None
+        return data
+
+    @property
+    def batch (self):
+        """A :class:`BatchInterp` that uses this instance for timing, created on
+first access."""
+        if self._batch is None:
+            self._batch = BatchInterp(self)
+        return self._batch
+
+    @property
+    def profiling (self):
+        """Whether to record how long timeout callbacks take to run.
+
+Callbacks are identified by their qualified name and where the timeout was
+added (the first caller outside this module); timeouts added while this is
+``False`` have an unknown site.  Statistics are kept when this is set to
+``False``, and can be retrieved with :meth:`stats`.
+
+"""
+        return self._profile is not None
+
+    @profiling.setter
+    def profiling (self, profiling):
+        self._profile = self._profile_stats if profiling else None
+
+    def _record (self, data, t):
+        """Record a callback's running time."""
+        key = data[7]
+        if key is None:
+            key = data[7] = (_cb_name(data[5]), None)
+        record = self._profile.get(key)
+        if record is None:
+            record = self._profile[key] = [
+                0, 0, 0, deque(maxlen=conf.PROFILE_SAMPLES)
+            ]
+        record[0] += 1
+        record[1] += t
+        if t > record[2]:
+            record[2] = t
+        record[3].append(t)
+
+    def stats (self, n = 10):
+        """Get statistics recorded while :attr:`profiling`.
+
+stats(n = 10) -> stats
+
+:arg n: the maximum number of callbacks to include in each list.
+
+:return: a ``dict`` with keys:
+
+    - ``'slowest'``: callbacks with the largest mean running time over their
+      last :data:`conf.PROFILE_SAMPLES` calls;
+    - ``'frequent'``: callbacks called the most times.
+
+    Each list item is a ``dict`` with keys ``'name'``, ``'site'``,
+    ``'calls'``, ``'total'`` (total running time in seconds), ``'max'``,
+    ``'mean'`` (over recent calls) and ``'hist'``, a histogram of recent
+    running times: a list giving the number of calls taking under 10us,
+    100us, 1ms, 10ms, 100ms and longer.
 
-    def run (self, seconds = None, frames = None):
+"""
+        items = []
+        for (name, site), (calls, total, t_max, recent) in \
+                self._profile_stats.iteritems():
+            hist = [0] * 6
+            for t in recent:
+                hist[min(bisect(self._HIST_BOUNDS, t), 5)] += 1
+            items.append({
+                'name': name, 'site': site, 'calls': calls, 'total': total,
+                'max': t_max, 'mean': sum(recent) / len(recent), 'hist': hist
+            })
+        return {
+            'slowest': sorted(items, key=lambda i: i['mean'],
+                              reverse=True)[:n],
+            'frequent': sorted(items, key=lambda i: i['calls'],
+                               reverse=True)[:n]
+        }
+
+    def clear_stats (self):
+        """Discard statistics recorded while :attr:`profiling`."""
+        self._profile_stats.clear()
+
+    def run (self, seconds = None, frames = None, draw = None):
         """Start the scheduler.
 
-run([seconds][, frames]) -> remain
+run([seconds][, frames][, draw]) -> remain
 
 Arguments and return value are as for :meth:`Timer.run`.
 
 """
         return Timer.run(self, self._update, seconds = seconds,
-                         frames = frames)
+                         frames = frames, draw = draw)
+
+    def _now (self, data, use_seconds):
+        # current value of the clock a timeout uses for the given type
+        clock = data[8]
+        return clock.seconds if use_seconds else clock.frames
+
+    def _queue (self, ident, data):
+        # add a timeout to its queue at its due time
+        data[8].queues[data[1]].push(ident, data)
+
+    def _unqueue (self, ident, data):
+        # remove a timeout from its queue
+        data[8].queues[data[1]].remove(ident, data)
 
     def add_timeout (self, cb, seconds=None, frames=None, repeat_seconds=None,
-                     repeat_frames=None):
+                     repeat_frames=None, group=None):
         """Call a function after a delay.
 
-add_timeout(cb[, seconds][, frames][, repeat_seconds][, repeat_frames])
-            -> ident
+add_timeout(cb[, seconds][, frames][, repeat_seconds][, repeat_frames]
+            [, group]) -> ident
 
 :arg cb: the function to call.
 :arg seconds: how long to wait before calling, in seconds (respects changes to
@@ -571,6 +1253,7 @@ add_timeout(cb[, seconds][, frames][, repeat_seconds][, repeat_frames])
                      initial time delay is used between calls.
 :arg repeat_frames: how long to wait between calls, in frames (like
                     ``repeat_seconds``).
+:arg group: a :class:`TimeoutGroup` to add the timeout to.
 
 :return: a timeout identifier to pass to :meth:`rm_timeout`.  This is
          guaranteed to be unique over time.
@@ -591,11 +1274,21 @@ will not be called again.
         elif repeat_frames is None:
             repeat_seconds = seconds
             repeat_frames = frames
-        self._cbs[self._max_id] = [seconds, frames, repeat_seconds,
-                                   repeat_frames, True, cb]
+        use_seconds = seconds is not None
+        delay = seconds if use_seconds else frames
+        clock = self._root if group is None else group._clock
+        ident = self._max_id
         self._max_id += 1
+        data = [(clock.seconds if use_seconds else clock.frames) + delay,
+                use_seconds, repeat_seconds, repeat_frames, None, cb, None,
+                None, clock]
+        clock.n += 1
+        if self._profile is not None:
+            data[7] = (_cb_name(cb), _caller_site())
+        self._cbs[ident] = data
+        self._queue(ident, data)
         # ID is key in self._cbs
-        return self._max_id - 1
+        return ident
 
     def rm_timeout (self, *ids):
         """Remove the timeouts with the given identifiers.
@@ -603,59 +1296,102 @@ will not be called again.
 Missing IDs are ignored.
 
 """
-        cbs = self._cbs
         for i in ids:
-            if i in cbs:
-                del cbs[i]
+            data = self._get(i)
+            if data is not None:
+                del self._cbs[i]
+                data[8].n -= 1
+                self._unqueue(i, data)
+        if self._batch is not None:
+            self._batch.rm(*ids)
 
     def pause_timeout (self, *ids):
         """Pause the timeouts with the given identifiers."""
-        cbs = self._cbs
         for i in ids:
-            if i in cbs:
-                cbs[i][4] = False
+            data = self._get(i)
+            if data is not None:
+                if data[4] is None:
+                    data[4] = data[0] - self._now(data, data[1])
+                    self._unqueue(i, data)
+        if self._batch is not None:
+            self._batch.pause(*ids)
 
     def unpause_timeout (self, *ids):
         """Continue the paused timeouts with the given identifiers."""
-        cbs = self._cbs
         for i in ids:
-            if i in cbs:
-                cbs[i][4] = True
+            data = self._get(i)
+            if data is not None:
+                if data[4] is not None:
+                    data[0] = self._now(data, data[1]) + data[4]
+                    data[4] = None
+                    self._queue(i, data)
+        if self._batch is not None:
+            self._batch.unpause(*ids)
 
     def _update (self):
         """Handle callbacks this frame."""
-        cbs = self._cbs
+        if self._jobs_done:
+            self._finish_jobs()
         frame = self.frame
-        # cbs might add/remove cbs, so use items instead of iteritems
-        for i, data in cbs.items():
-            if i not in cbs:
-                # removed since we called .items()
+        cbs = self._cbs
+        # gather due timeouts first, so that any added or repeated by callbacks
+        # wait until the next frame
+        due = []
+        for clock in self._clocks:
+            if not clock.paused:
+                clock.frames += 1
+                clock.seconds += frame * clock.scale
+                clock.queues[0].pop_due(clock.frames, due)
+                clock.queues[1].pop_due(clock.seconds, due)
+        # call in order of creation (identifiers are unique)
+        due.sort()
+        for ident, data in due:
+            if (cbs.get(ident) is not data or data[6] is not None or
+                data[4] is not None or not data[8].alive):
+                # removed, requeued, paused or cancelled by a callback this
+                # frame
                 continue
-            if data[0] is not None:
-                remain = 0
-                dt = frame
+            if self._profile is None:
+                repeat = data[5]()
             else:
-                remain = 1
-                dt = 1
-            if data[4]:
-                data[remain] -= dt
-                if data[remain] <= 0:
-                    # call callback
-                    if data[5]():
-                        # add on delay
-                        total = data[2] is None
-                        data[total] += data[total + 2]
-                    elif i in cbs: # else removed in above call
-                        del cbs[i]
-            # else paused
+                t = perf_counter()
+                repeat = data[5]()
+                self._record(data, perf_counter() - t)
+            if repeat:
+                # add on delay
+                if (cbs.get(ident) is not data or data[6] is not None or
+                    not data[8].alive):
+                    # removed, requeued or cancelled in the above call
+                    continue
+                repeat_seconds = data[2]
+                use_seconds = repeat_seconds is not None
+                delay = repeat_seconds if use_seconds else data[3]
+                if use_seconds == data[1]:
+                    # carry over part-frames
+                    due_at = data[0] + delay
+                else:
+                    due_at = self._now(data, use_seconds) + delay
+                data[1] = use_seconds
+                if data[4] is None:
+                    data[0] = due_at
+                    self._queue(ident, data)
+                else:
+                    # paused in the above call
+                    data[4] = due_at - self._now(data, use_seconds)
+            elif cbs.get(ident) is data: # else removed in above call
+                del cbs[ident]
+                if data[8].alive:
+                    data[8].n -= 1
+                else:
+                    self._n_dead -= 1
 
     def interp (self, get_val, set_val, t_max = None, bounds = None,
                 end = None, round_val = False, multi_arg = False,
-                resolution = None):
+                resolution = None, group = None):
         """Vary a value over time.
 
 interp(get_val, set_val[, t_max][, bounds][, end], round_val = False,
-       multi_arg = False[, resolution]) -> timeout_id
+       multi_arg = False[, resolution][, group]) -> timeout_id
 
 :arg get_val: a function called with the elapsed time in seconds to obtain the
               current value.  If this function returns ``None``, the
@@ -685,6 +1421,9 @@ interp(get_val, set_val[, t_max][, bounds][, end], round_val = False,
                  limit on the number of times per second the value may updated.
                  The current value of :attr:`fps <Timer.fps>` (which may change
                  over the interpolation) also puts an upper limit on the rate.
+:arg group: a :class:`TimeoutGroup` to add the interpolation to; it is paused
+            and cancelled with the group, and time is scaled by
+            :attr:`TimeoutGroup.scale`.
 
 :return: an identifier that can be passed to :meth:`rm_timeout` to remove the
         callback that continues the interpolation.  In this case ``end`` is not
@@ -705,7 +1444,7 @@ interp(get_val, set_val[, t_max][, bounds][, end], round_val = False,
             last_v = None
             done = False
             while True:
-                frame = self.frame
+                frame = self.frame if group is None else group.frame
                 t += frame
                 dt += frame
                 if resolution is None or dt >= update_frame:
@@ -744,7 +1483,7 @@ interp(get_val, set_val[, t_max][, bounds][, end], round_val = False,
                 else:
                     yield True
 
-        return self.add_timeout(timeout_cb().next, frames=1)
+        return self.add_timeout(timeout_cb().next, frames=1, group=group)
 
     def interp_simple (self, obj, attr, target, t, end_cb = None,
                        round_val = False):
@@ -816,28 +1555,143 @@ passed to this function.  Typical usage is as follows::
         """Like :meth:`interp_locked`, but wraps :meth:`interp_simple`."""
         return self._interp_locked(self.interp_simple, *args, **kwargs)
 
-    def counter (self, t, autoreset=False):
+    def sleep (self, seconds):
+        """Get an object for a coroutine to yield to wait for some time.
+
+sleep(seconds) -> delay
+
+:arg seconds: how long to wait, in seconds.
+
+See :meth:`spawn`.
+
+"""
+        return _Delay(seconds=seconds)
+
+    def frames (self, frames):
+        """Get an object for a coroutine to yield to wait for some frames.
+
+frames(frames) -> delay
+
+:arg frames: how many frames to wait.
+
+See :meth:`spawn`.
+
+"""
+        return _Delay(frames=frames)
+
+    def spawn (self, coro, group=None):
+        """Run a coroutine, driven by this scheduler.
+
+spawn(coro[, group]) -> task
+
+:arg coro: a generator; see :class:`Task` for what it may yield.
+:arg group: a :class:`TimeoutGroup` to wait in.
+
+:return: a :class:`Task` for the coroutine.
+
+For example::
+
+    def cutscene ():
+        yield scheduler.sleep(2)
+        door.open()
+        yield scheduler.frames(10)
+        player.walk(1)
+
+    scheduler.spawn(cutscene())
+
+Waiting uses ordinary timeouts, so coroutines take no time in frames where they
+aren't resumed.
+
+"""
+        return Task(self, coro, group)
+
+    def submit (self, fn, *args, **kwargs):
+        """Call a function in a worker thread.
+
+submit(fn, *args[, cb], **kwargs) -> future
+
+:arg fn: the function to call.  This must not use the display or any other
+         Pygame state that isn't safe to use from other threads.
+:arg args: positional arguments to pass to ``fn``.
+:arg cb: a function to call with the returned :class:`Future` when the job
+         finishes, successfully or not (but not if it's cancelled).
+:arg kwargs: keyword arguments to pass to ``fn``.
+
+:return: a :class:`Future` for the result of ``fn``.  This is finished (and
+         ``cb`` called) in the main thread, at the start of the first frame
+         after the job finishes.  A coroutine run by :meth:`spawn` may yield it
+         to wait for the result.
+
+Jobs are run by a pool of :data:`conf.WORKER_THREADS` threads shared by all
+schedulers.
+
+"""
+        global _pool
+        cb = kwargs.pop('cb', None)
+        future = Future()
+        if cb is not None:
+            future.add_done_callback(
+                lambda f: isinstance(f._exc, CancelledError) or cb(f)
+            )
+        if _pool is None:
+            _pool = _WorkerPool(conf.WORKER_THREADS)
+        self._jobs.add(future)
+        _pool.submit(fn, args, kwargs, future, self._jobs_done)
+        return future
+
+    def _finish_jobs (self):
+        """Finish the futures of jobs finished by worker threads."""
+        done = self._jobs_done
+        while done:
+            future, result, exc = done.popleft()
+            self._jobs.discard(future)
+            if not future.done(): # else cancelled
+                if exc is None:
+                    future.set_result(result)
+                elif future._cbs:
+                    future.set_exception(exc)
+                else:
+                    # nothing to handle it
+                    raise exc
+
+    def cancel_jobs (self):
+        """Cancel all jobs submitted through :meth:`submit` that haven't
+finished.
+
+Jobs that haven't started are skipped, and the results of running jobs are
+discarded.  The game calls this when a world ends.
+
+"""
+        jobs = self._jobs
+        self._jobs = set()
+        for future in jobs:
+            future.cancel()
+
+    def counter (self, t, autoreset=False, lazy=False, group=None):
         """Create and return a :class:`Counter` that uses this instance for
 timing.
 
-counter(t, autoreset=False) -> new_counter
+counter(t, autoreset=False, lazy=False[, group]) -> new_counter
 
-Arguments are as taken by :class:`Counter`.
+:arg lazy: whether to create a :class:`LazyCounter` instead.
+
+Other arguments are as taken by :class:`Counter`.
 
 """
-        return Counter(self, t, autoreset)
+        return (LazyCounter if lazy else Counter)(self, t, autoreset, group)
 
 
 class Counter (object):
     """A simple way of counting down to an event.
 
-Counter(scheduler, t, autoreset=False)
+Counter(scheduler, t, autoreset=False[, group])
 
 :arg scheduler: :class:`Scheduler` instance to use for timing.
 :arg t: how long a countdown lasts, in seconds.
 :arg autoreset: whether to reset and count down from the beginning again when
                 the countdown ends.  This is only useful with :attr:`cbs` (the
                 finished state never becomes ``True``).
+:arg group: a :class:`TimeoutGroup` of ``scheduler`` to count down in.
 
 An instance is boolean ``True`` if the countdown has finished, else ``False``.
 The initial state is finished---use :meth:`reset` to start the countdown.
@@ -848,11 +1702,13 @@ See also :meth:`Scheduler.counter`.
 
 """
 
-    def __init__ (self, scheduler, t, autoreset=False):
+    def __init__ (self, scheduler, t, autoreset=False, group=None):
         self._scheduler = scheduler
         self._t = t
         #: As passed to the constructor.
         self.autoreset = autoreset
+        #: As passed to the constructor.
+        self.group = group
         #: ``set`` of functions to call when the countdown ends.
         self.cbs = set()
         self._timer_id = None
@@ -896,7 +1752,8 @@ Starts counting down even if the countdown wasn't already running.
         if self._timer_id is not None:
             self._scheduler.rm_timeout(self._timer_id)
         self._finished = False
-        self._timer_id = self._scheduler.add_timeout(self._end_cb, self.t)
+        self._timer_id = self._scheduler.add_timeout(self._end_cb, self.t,
+                                                     group=self.group)
         return self
 
     def cancel (self):
@@ -952,3 +1809,900 @@ Missing items are ignored.
         """Unpause the counter, if paused."""
         if self._timer_id is not None:
             self._scheduler.unpause_timeout(self._timer_id)
+
+
+class LazyCounter (Counter):
+    """A :class:`Counter` that doesn't use the scheduler unless it has to.
+
+LazyCounter(scheduler, t, autoreset=False[, group])
+
+Arguments are as taken by :class:`Counter`.
+
+Instead of adding a timeout, this stores the time the countdown is due to end
+and compares it to :attr:`Scheduler.seconds_elapsed` (or
+:attr:`TimeoutGroup.seconds_elapsed`) when the finished state is checked, so
+:meth:`reset` is cheap.  A timeout is only added while the countdown is running
+and :attr:`cbs <Counter.cbs>` is non-empty, so callbacks must be added and
+removed with :meth:`cb <Counter.cb>` and :meth:`rm_cbs <Counter.rm_cbs>` rather
+than by changing :attr:`cbs <Counter.cbs>` directly.
+
+The finished state may become ``True`` up to a frame earlier than for
+:class:`Counter`, since it doesn't wait for a timeout to be called.
+
+See also :meth:`Scheduler.counter`.
+
+"""
+
+    def __init__ (self, scheduler, t, autoreset=False, group=None):
+        Counter.__init__(self, scheduler, t, autoreset, group)
+        # object with the clock to use
+        self._clock = scheduler if group is None else group
+        # time the countdown ends, or None if not running
+        self._due = None
+        # remaining time if paused, else None
+        self._remain = None
+
+    @property
+    def t (self):
+        """How long a countdown lasts, in seconds.
+
+Changing this resets the countdown (if running).
+
+"""
+        return self._t
+
+    @t.setter
+    def t (self, t):
+        self._t = t
+        if self._due is not None:
+            self.reset()
+
+    def _check (self):
+        # update the state from the scheduler's clock
+        if (self._due is not None and self._remain is None and
+            self._clock.seconds_elapsed >= self._due):
+            self._expire()
+
+    def _expire (self):
+        # handle the end of the countdown
+        if self.autoreset:
+            # skip to the current countdown
+            due = self._due
+            t = self._t
+            n = int((self._clock.seconds_elapsed - due) / t) if t > 0 else 0
+            self._due = due + t * (max(n, 0) + 1)
+        else:
+            self._due = None
+            self._finished = True
+
+    def __nonzero__ (self):
+        self._check()
+        return self._finished
+
+    def _end_cb (self):
+        # called when the timeout ends; the timeout only exists while running
+        # and not paused
+        self._timer_id = None
+        self._expire()
+        for cb in self.cbs:
+            cb()
+        self._add_timeout()
+        return False
+
+    def _add_timeout (self):
+        # add a timeout to call callbacks, if needed
+        if (self._due is not None and self._remain is None and self.cbs and
+            self._timer_id is None):
+            self._timer_id = self._scheduler.add_timeout(
+                self._end_cb, max(self._due - self._clock.seconds_elapsed, 0),
+                group=self.group
+            )
+
+    def _rm_timeout (self):
+        # remove any timeout added by _add_timeout
+        if self._timer_id is not None:
+            self._scheduler.rm_timeout(self._timer_id)
+            self._timer_id = None
+
+    def reset (self):
+        """Start counting down from the beginning again.
+
+reset() -> self
+
+Starts counting down even if the countdown wasn't already running.
+
+"""
+        self._finished = False
+        self._due = self._clock.seconds_elapsed + self._t
+        self._remain = None
+        if self._timer_id is not None:
+            self._rm_timeout()
+        if self.cbs:
+            self._add_timeout()
+        return self
+
+    def cancel (self):
+        """Stop counting down and set the finished state to ``False``.
+
+cancel() -> self
+
+"""
+        self._check()
+        if self._due is not None:
+            self._rm_timeout()
+            self._due = None
+            self._remain = None
+            self._finished = False
+        return self
+
+    def finish (self):
+        """Stop counting down and set the finished state to ``True``.
+
+finish() -> self
+
+"""
+        self.cancel()
+        self._finished = True
+        return self
+
+    def cb (self, *cbs):
+        """Add any number of callbacks to :attr:`cbs <Counter.cbs>`.
+
+cb(*cbs) -> self
+
+Callbacks take no arguments.
+
+"""
+        self.cbs.update(cbs)
+        self._check()
+        self._add_timeout()
+        return self
+
+    def rm_cbs (self, *cbs):
+        """Remove any number of callbacks from :attr:`cbs <Counter.cbs>`.
+
+rm_cbs(*cbs) -> self
+
+Missing items are ignored.
+
+"""
+        self.cbs.difference_update(cbs)
+        if not self.cbs:
+            self._rm_timeout()
+        return self
+
+    def pause (self):
+        """Pause the counter, if running."""
+        self._check()
+        if self._due is not None and self._remain is None:
+            self._remain = self._due - self._clock.seconds_elapsed
+            self._rm_timeout()
+
+    def unpause (self):
+        """Unpause the counter, if paused."""
+        if self._remain is not None:
+            self._due = self._clock.seconds_elapsed + self._remain
+            self._remain = None
+            self._add_timeout()
+
+
+class CancelledError (Exception):
+    """Raised by :meth:`Future.result` if the future was cancelled."""
+    pass
+
+
+class Future (object):
+    """The result of an operation that finishes later.
+
+Coroutines run by :meth:`Scheduler.spawn` can yield an instance to wait for it
+to finish; the ``yield`` expression then gives the result, or raises the
+exception the operation failed with.
+
+Futures must be finished from the main thread.
+
+"""
+
+    def __init__ (self):
+        self._done = False
+        self._result = None
+        self._exc = None
+        self._cbs = []
+
+    def done (self):
+        """Whether the operation has finished."""
+        return self._done
+
+    def result (self):
+        """Get the result of the operation.
+
+Raises the exception the operation failed with, if any, or ``RuntimeError`` if
+it hasn't finished.
+
+"""
+        if not self._done:
+            raise RuntimeError('future isn\'t done')
+        if self._exc is not None:
+            raise self._exc
+        return self._result
+
+    def _finish (self, result, exc):
+        # mark as done and call callbacks
+        if self._done:
+            raise RuntimeError('future is already done')
+        self._done = True
+        self._result = result
+        self._exc = exc
+        cbs = self._cbs
+        self._cbs = None
+        for cb in cbs:
+            cb(self)
+
+    def set_result (self, result):
+        """Finish the operation successfully with the given result."""
+        self._finish(result, None)
+
+    def set_exception (self, exc):
+        """Finish the operation with the given exception instance."""
+        self._finish(None, exc)
+
+    def cancel (self):
+        """Finish the operation with a :class:`CancelledError`.
+
+cancel() -> cancelled
+
+:return: whether the future was cancelled (``False`` if already done).
+
+"""
+        if self._done:
+            return False
+        self._finish(None, CancelledError())
+        return True
+
+    def add_done_callback (self, cb):
+        """Call a function with this future as an argument when finished.
+
+If already finished, the function is called immediately.
+
+"""
+        if self._done:
+            cb(self)
+        else:
+            self._cbs.append(cb)
+
+
+class _Delay (object):
+    """Object yielded by coroutines to wait; see :meth:`Scheduler.sleep`."""
+
+    def __init__ (self, seconds=None, frames=None):
+        self.seconds = seconds
+        self.frames = frames
+
+
+class _WorkerPool (object):
+    """Threads to run jobs submitted through :meth:`Scheduler.submit`.
+
+_WorkerPool(n_threads)
+
+Threads are daemons, and are started on the first call to :meth:`submit`.
+
+"""
+
+    def __init__ (self, n_threads):
+        self.n_threads = n_threads
+        self._jobs = Queue()
+        self._threads = []
+
+    def submit (self, fn, args, kwargs, future, done):
+        """Run a function in a worker thread.
+
+submit(fn, args, kwargs, future, done)
+
+:arg fn: the function to call with ``args`` and ``kwargs``.
+:arg future: the :class:`Future` for the job; if it is done before the job
+             starts, the job is skipped.
+:arg done: a ``deque`` to append ``(future, result, exc)`` to from the worker
+           thread when finished.
+
+"""
+        if not self._threads:
+            for i in xrange(self.n_threads):
+                t = Thread(target=self._work, name='worker {0}'.format(i))
+                t.daemon = True
+                t.start()
+                self._threads.append(t)
+        self._jobs.put((fn, args, kwargs, future, done))
+
+    def _work (self):
+        # worker thread: run jobs forever
+        jobs = self._jobs
+        while True:
+            fn, args, kwargs, future, done = jobs.get()
+            if future.done():
+                # cancelled
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                done.append((future, None, e))
+            else:
+                done.append((future, result, None))
+
+
+# created when first needed
+_pool = None
+
+
+class Task (Future):
+    """A :class:`Future` for a coroutine run by a :class:`Scheduler`.
+
+Task(scheduler, coro[, group])
+
+:arg scheduler: the :class:`Scheduler` to run the coroutine with.
+:arg coro: the generator to run.
+:arg group: a :class:`TimeoutGroup` of ``scheduler`` to wait in.
+
+Use :meth:`Scheduler.spawn` rather than creating instances directly.
+
+The coroutine starts running immediately, until it first waits.  It may yield:
+
+    - the result of :meth:`Scheduler.sleep` or :meth:`Scheduler.frames` to wait
+      for some time;
+    - ``None`` to wait until the next frame;
+    - a :class:`Future` (including another :class:`Task`) to wait for it to
+      finish, getting its result;
+    - another generator, to run it as part of this task, getting the value of
+      its ``StopIteration``.
+
+The result of the task is the value of the coroutine's ``StopIteration``
+(``raise StopIteration(value)``), or ``None``.  If the coroutine raises an
+exception and nothing is waiting for the task, the exception propagates out of
+the scheduler.
+
+"""
+
+    def __init__ (self, scheduler, coro, group=None):
+        Future.__init__(self)
+        self._scheduler = scheduler
+        #: As passed to the constructor.
+        self.group = group
+        self._stack = [coro]
+        self._timer_id = None
+        self._step(None, None)
+
+    def _step (self, value, exc):
+        # run the coroutine until it waits or finishes
+        stack = self._stack
+        while True:
+            gen = stack[-1]
+            try:
+                if exc is None:
+                    y = gen.send(value)
+                else:
+                    y = gen.throw(exc)
+            except StopIteration as e:
+                stack.pop()
+                value = e.args[0] if e.args else None
+                exc = None
+                if not stack:
+                    self.set_result(value)
+                    return
+                continue
+            except Exception as e:
+                stack.pop()
+                if not stack:
+                    if not self._cbs:
+                        # nothing to handle it
+                        self._done = True
+                        self._exc = e
+                        raise
+                    self.set_exception(e)
+                    return
+                value = None
+                exc = e
+                continue
+            value = exc = None
+            # wait for whatever was yielded
+            if isinstance(y, GeneratorType):
+                stack.append(y)
+            elif y is None:
+                self._wait(None, 1)
+                return
+            elif isinstance(y, _Delay):
+                self._wait(y.seconds, y.frames)
+                return
+            elif isinstance(y, Future):
+                y.add_done_callback(self._future_done)
+                return
+            else:
+                exc = TypeError('coroutine yielded unknown object: '
+                                '{0}'.format(repr(y)))
+
+    def _wait (self, seconds, frames):
+        # continue the coroutine after a delay
+        self._timer_id = self._scheduler.add_timeout(
+            self._resume, seconds, frames, group=self.group
+        )
+
+    def _resume (self):
+        # called by the scheduler when a delay ends
+        self._timer_id = None
+        self._step(None, None)
+
+    def _future_done (self, future):
+        # called when a yielded future finishes; continue in the next frame
+        if not self._done:
+            self._timer_id = self._scheduler.add_timeout(
+                lambda: self._resume_future(future), frames=0,
+                group=self.group
+            )
+
+    def _resume_future (self, future):
+        # continue the coroutine with a finished future's result
+        self._timer_id = None
+        try:
+            value = future.result()
+        except Exception as e:
+            self._step(None, e)
+        else:
+            self._step(value, None)
+
+    def cancel (self):
+        """Stop running the coroutine.
+
+cancel() -> cancelled
+
+:return: whether the task was cancelled (``False`` if already done).
+
+The coroutine (and any it is running) is closed, so ``finally`` blocks run.
+
+"""
+        if self._done:
+            return False
+        if self._timer_id is not None:
+            self._scheduler.rm_timeout(self._timer_id)
+            self._timer_id = None
+        stack = self._stack
+        while stack:
+            stack.pop().close()
+        return Future.cancel(self)
+
+
+class _BatchPool (object):
+    """Interpolations of one kind and size for :class:`BatchInterp`, stored in
+the rows of NumPy arrays.
+
+_BatchPool(kind, n)
+
+Arrays grow by doubling, and removing a row moves the last row into its place,
+so adding and removing interpolations takes amortised constant time.
+
+"""
+
+    # arrays with a row per interpolation
+    _fields = ('params', 'last', 't', 'acc', 't_max', 'update_frame',
+               'paused', 'round', 'clock')
+
+    def __init__ (self, kind, n):
+        self.kind = kind
+        # number of rows in use
+        self.size = 0
+        # ident for each row in use
+        self.idents = []
+        # params[row] is a 6-row array of per-number parameters, the meaning of
+        # each depending on kind
+        self.params = np.empty((1, 6, n))
+        self.last = np.empty((1, n))
+        self.t = np.empty(1)
+        self.acc = np.empty(1)
+        self.t_max = np.empty(1)
+        self.update_frame = np.empty(1)
+        self.paused = np.empty(1, bool)
+        self.round = np.empty(1, bool)
+        # index into BatchInterp._clocks
+        self.clock = np.empty(1, int)
+
+    def add (self, ident, params, t_max, update_frame, round_val, clock):
+        """Add a row and return its index."""
+        row = self.size
+        if row == len(self.t):
+            for name in self._fields:
+                a = getattr(self, name)
+                new = np.empty((2 * len(a),) + a.shape[1:], a.dtype)
+                new[:row] = a[:row]
+                setattr(self, name, new)
+        self.params[row] = params
+        self.last[row] = np.nan
+        self.t[row] = 0
+        self.acc[row] = 0
+        self.t_max[row] = t_max
+        self.update_frame[row] = update_frame
+        self.paused[row] = False
+        self.round[row] = round_val
+        self.clock[row] = clock
+        self.idents.append(ident)
+        self.size += 1
+        return row
+
+    def rm (self, row):
+        """Remove a row, and return the ident of the interpolation moved into
+its place, or ``None``."""
+        self.size -= 1
+        last = self.size
+        ident = self.idents.pop()
+        if row == last:
+            return None
+        for name in self._fields:
+            a = getattr(self, name)
+            a[row] = a[last]
+        self.idents[row] = ident
+        return ident
+
+
+class BatchInterp (object):
+    """Batched interpolation of numbers, for large numbers of simultaneous
+interpolations.
+
+BatchInterp(scheduler)
+
+:arg scheduler: :class:`Scheduler` instance to use for timing.
+
+Rather than create one instance, use :attr:`Scheduler.batch`.
+
+Each method starts an interpolation like :meth:`Scheduler.interp`, but values
+must be numbers or flat sequences of numbers.  Interpolations of the same type
+and size are stored together in NumPy arrays and advanced in a single pass each
+frame, and ``set_val`` is only called for values that change.
+
+Each method takes optional keyword arguments ``t_max``, ``end``,
+``round_val``, ``multi_arg``, ``resolution`` and ``group``, as taken by
+:meth:`Scheduler.interp` (``round_val`` may only be a boolean), and returns an
+identifier that can be passed to :meth:`Scheduler.rm_timeout`,
+:meth:`Scheduler.pause_timeout` and :meth:`Scheduler.unpause_timeout`.
+
+If NumPy is not available, interpolations fall back to :meth:`Scheduler.interp`
+with the corresponding ``interp_*`` functions.
+
+"""
+
+    # interpolation types
+    _LINEAR, _TARGET, _SHAKE, _OSCILLATE = xrange(4)
+
+    def __init__ (self, scheduler):
+        #: The ``scheduler`` argument passed to the constructor.
+        self.scheduler = scheduler
+        # {ident: [pool, row, set_val, scalar, multi_arg, end, clock]}
+        self._interps = {}
+        # {(kind, n): pool}
+        self._pools = {}
+        # _Clock instances used by interpolations, indexed by
+        # _BatchPool.clock; None for free slots
+        self._clocks = []
+        # {clock: index in _clocks}
+        self._clock_ids = {}
+        # number of interpolations using each clock in _clocks
+        self._clock_n = []
+        self._timer_id = None
+
+    def __contains__ (self, ident):
+        return ident in self._interps
+
+    def __len__ (self):
+        return len(self._interps)
+
+    def _add (self, kind, set_val, v0, params, kwargs, fallback):
+        # start an interpolation
+        t_max = kwargs.get('t_max')
+        end = kwargs.get('end')
+        round_val = kwargs.get('round_val', False)
+        multi_arg = kwargs.get('multi_arg', False)
+        resolution = kwargs.get('resolution')
+        group = kwargs.get('group')
+        s = self.scheduler
+        if np is None:
+            return s.interp(fallback(), set_val, t_max, None, end, round_val,
+                            multi_arg, resolution, group)
+        if not callable(set_val):
+            obj, attr = set_val
+            set_val = lambda val: setattr(obj, attr, val)
+        clock = s._root if group is None else group._clock
+        c = self._clock_ids.get(clock)
+        if c is None:
+            try:
+                c = self._clocks.index(None)
+            except ValueError:
+                c = len(self._clocks)
+                self._clocks.append(clock)
+                self._clock_n.append(0)
+            else:
+                self._clocks[c] = clock
+            self._clock_ids[clock] = c
+        self._clock_n[c] += 1
+        n = params.shape[1]
+        pool = self._pools.get((kind, n))
+        if pool is None:
+            pool = self._pools[(kind, n)] = _BatchPool(kind, n)
+        ident = s._max_id
+        s._max_id += 1
+        row = pool.add(ident, params,
+                       np.inf if t_max is None else t_max,
+                       0 if resolution is None else 1. / resolution,
+                       bool(round_val), c)
+        self._interps[ident] = [pool, row, set_val, not hasattr(v0, '__len__'),
+                                multi_arg, end, c]
+        if self._timer_id is None:
+            self._timer_id = s.add_timeout(self._update, frames=1)
+        return ident
+    def _params (self, n, *values):
+        # build a parameter array from numbers/sequences of length n
+        params = np.zeros((6, n))
+        for i, v in enumerate(values):
+            params[i] = np.asarray(v, float).ravel()
+        return params
+
+    def linear (self, set_val, v0, v1, t, **kwargs):
+        """Vary linearly between two values.
+
+linear(set_val, v0, v1, t, **kwargs) -> ident
+
+:arg set_val: as taken by :meth:`Scheduler.interp`.
+:arg v0: the initial value: a number or sequence of numbers.
+:arg v1: the final value, in the same form as ``v0``.
+:arg t: the time to take, in seconds.
+
+Like :func:`interp_linear` with two waypoints; the final value is always set.
+
+"""
+        fallback = lambda: interp_linear(v0, (v1, t))
+        if np is None:
+            return self._add(self._LINEAR, set_val, v0, None, kwargs, fallback)
+        n = np.size(v0)
+        params = self._params(n, v0, v1, max(t, 1e-9))
+        return self._add(self._LINEAR, set_val, v0, params, kwargs, fallback)
+
+    def target (self, set_val, v0, target, damp, freq=0, speed=0,
+                threshold=0, **kwargs):
+        """Move towards a target.
+
+target(set_val, v0, target, damp, freq=0, speed=0, threshold=0, **kwargs)
+    -> ident
+
+Arguments are as taken by :func:`interp_target`, with ``set_val`` as taken by
+:meth:`Scheduler.interp`; all values must be numbers or sequences of numbers.
+
+"""
+        fallback = lambda: interp_target(v0, target, damp, freq, speed,
+                                         threshold)
+        if np is None:
+            return self._add(self._TARGET, set_val, v0, None, kwargs, fallback)
+        n = np.size(v0)
+        v0_a = np.asarray(v0, float).ravel()
+        target_a = np.resize(np.asarray(target, float).ravel(), n)
+        diff = v0_a - target_a
+        if freq == 0:
+            phase = np.zeros(n)
+        else:
+            nonzero = diff != 0
+            speed_a = np.resize(np.asarray(speed, float).ravel(), n)
+            phase = np.where(nonzero, np.arctan(
+                -(speed_a / np.where(nonzero, diff, 1) + damp) / freq
+            ), 0)
+        if threshold is None:
+            # never stop
+            threshold = -1
+        params = self._params(n, target_a, diff / np.cos(phase), phase, damp,
+                              freq, np.resize(threshold, n))
+        return self._add(self._TARGET, set_val, v0, params, kwargs, fallback)
+
+    def shake (self, set_val, centre, amplitude=1, damp=0, threshold=0,
+               signed=True, **kwargs):
+        """Shake randomly.
+
+shake(set_val, centre, amplitude=1, damp=0, threshold=0, signed=True,
+      **kwargs) -> ident
+
+:arg damp: the amplitude decays as ``amplitude * exp(-damp * t)``.
+
+Other arguments are as taken by :func:`interp_shake`, with ``set_val`` as taken
+by :meth:`Scheduler.interp`, except that ``amplitude`` may not be a function.
+
+"""
+        def fallback ():
+            if damp:
+                a = lambda t: call_in_nest(lambda a: a * exp(-damp * t),
+                                           amplitude)
+            else:
+                a = amplitude
+            return interp_shake(centre, a, threshold, signed)
+
+        if np is None:
+            return self._add(self._SHAKE, set_val, centre, None, kwargs,
+                             fallback)
+        n = np.size(centre)
+        if threshold is None:
+            threshold = -1
+        params = self._params(n, centre, np.resize(amplitude, n), 0, damp,
+                              bool(signed), np.resize(threshold, n))
+        return self._add(self._SHAKE, set_val, centre, params, kwargs,
+                         fallback)
+
+    def oscillate (self, set_val, v0, v1, period, **kwargs):
+        """Move linearly back and forth between two values.
+
+oscillate(set_val, v0, v1, period, **kwargs) -> ident
+
+:arg set_val: as taken by :meth:`Scheduler.interp`.
+:arg v0: the initial value: a number or sequence of numbers.
+:arg v1: the other value, in the same form as ``v0``.
+:arg period: the time to take to move from ``v0`` to ``v1``, in seconds.
+
+Like :func:`interp_oscillate` over a two-waypoint :func:`interp_linear`.  This
+never ends unless ``t_max`` is given.
+
+"""
+        fallback = lambda: interp_oscillate(interp_linear(v0, (v1, period)),
+                                            period)
+        if np is None:
+            return self._add(self._OSCILLATE, set_val, v0, None, kwargs,
+                             fallback)
+        n = np.size(v0)
+        params = self._params(n, v0, v1, max(period, 1e-9))
+        return self._add(self._OSCILLATE, set_val, v0, params, kwargs,
+                         fallback)
+
+    def _values (self, kind, p, t):
+        # compute values for rows of a pool with parameters p at times t;
+        # returns (values, finished) with a row for each interpolation and
+        # finished giving whether each number has reached its end
+        a, b, c, d, e, f = p.transpose(1, 0, 2)
+        t = t[:, None]
+        if kind == self._LINEAR:
+            return a + np.minimum(t / c, 1) * (b - a), t >= c
+        elif kind == self._TARGET:
+            dist = b * np.exp(-d * t)
+            return dist * np.cos(e * t + c) + a, np.abs(dist) <= f
+        elif kind == self._SHAKE:
+            amp = b * np.exp(-d * t)
+            val = amp * np.random.exponential(size=amp.shape)
+            val = np.where(e > 0,
+                           val * (2 * np.random.randint(2, size=amp.shape) - 1),
+                           val)
+            return a + val, np.abs(amp) <= f
+        else: # kind == self._OSCILLATE
+            phase = t % (2 * c)
+            val = a + (b - a) * np.where(phase >= c, 2 * c - phase, phase) / c
+            return val, np.zeros(val.shape, bool)
+
+    def _update (self):
+        # advance all interpolations by a frame
+        frame = self.scheduler.frame
+        clocks = self._clocks
+        dt = np.zeros(len(clocks))
+        running = np.zeros(len(clocks), bool)
+        for c, clock in enumerate(clocks):
+            if clock is None:
+                continue
+            if not clock.alive:
+                # the group was cancelled
+                dead = []
+                for pool in self._pools.values():
+                    rows = np.flatnonzero(pool.clock[:pool.size] == c)
+                    dead.extend(pool.idents[row] for row in rows)
+                self.rm(*dead)
+            elif not clock.paused:
+                dt[c] = frame * clock.scale
+                running[c] = True
+        # compute values for each pool, storing changes to make
+        sets = []
+        done = []
+        for pool in self._pools.values():
+            n = pool.size
+            c = pool.clock[:n]
+            active = ~pool.paused[:n] & running[c]
+            t = pool.t[:n]
+            acc = pool.acc[:n]
+            step = np.where(active, dt[c], 0)
+            t += step
+            acc += step
+            update_frame = pool.update_frame[:n]
+            due = active & (acc >= update_frame)
+            acc[due] -= update_frame[due]
+            vals, finished = self._values(pool.kind, pool.params[:n], t)
+            r = pool.round[:n]
+            vals[r] = np.where(vals[r] > 0, np.floor(vals[r] + .5),
+                               np.ceil(vals[r] - .5))
+            last = pool.last[:n]
+            over = t > pool.t_max[:n]
+            finished = (finished.all(1) | over) & due
+            changed = (vals != last).any(1) & due
+            # only set values for ended interpolations if they end at a final
+            # value
+            if pool.kind == self._LINEAR:
+                changed &= ~finished | ~over
+            else:
+                changed &= ~finished
+            last[changed] = vals[changed]
+            idents = pool.idents
+            sets.extend((idents[row], vals[row])
+                        for row in np.flatnonzero(changed))
+            done.extend(idents[row] for row in np.flatnonzero(finished))
+        # set values, then handle ended interpolations; callbacks may add and
+        # remove interpolations, moving rows around
+        interps = self._interps
+        for ident, v in sets:
+            data = interps.get(ident)
+            if data is not None:
+                self._set(data, v)
+        for ident in done:
+            data = interps.get(ident)
+            if data is not None:
+                last = data[0].last[data[1]].copy()
+                self.rm(ident)
+                end = data[5]
+                v = end() if callable(end) else end
+                if v is not None:
+                    if np.any(np.asarray(v, float).ravel() != last):
+                        self._set(data, v, False)
+        if not interps:
+            self._timer_id = None
+            return False
+        return True
+
+    def _set (self, data, v, from_array=True):
+        # call set_val for an interpolation
+        if from_array:
+            v = v.tolist()
+            if data[0].round[data[1]]:
+                v = [int(x) for x in v]
+            if data[3]:
+                v = v[0]
+        if data[4]:
+            data[2](*v)
+        else:
+            data[2](v)
+
+    def rm (self, *ids):
+        """Remove interpolations by identifier; missing IDs are ignored.
+
+:meth:`Scheduler.rm_timeout` calls this.
+
+"""
+        interps = self._interps
+        for ident in ids:
+            data = interps.pop(ident, None)
+            if data is None:
+                continue
+            pool, row = data[:2]
+            moved = pool.rm(row)
+            if moved is not None:
+                interps[moved][1] = row
+            if pool.size == 0:
+                del self._pools[(pool.kind, pool.last.shape[1])]
+            c = data[6]
+            self._clock_n[c] -= 1
+            if self._clock_n[c] == 0:
+                del self._clock_ids[self._clocks[c]]
+                self._clocks[c] = None
+
+    def _set_paused (self, ids, paused):
+        # pause or unpause interpolations
+        interps = self._interps
+        for ident in ids:
+            data = interps.get(ident)
+            if data is not None:
+                data[0].paused[data[1]] = paused
+
+    def pause (self, *ids):
+        """Pause interpolations by identifier; missing IDs are ignored.
+
+:meth:`Scheduler.pause_timeout` calls this.
+
+"""
+        self._set_paused(ids, True)
+
+    def unpause (self, *ids):
+        """Unpause interpolations by identifier; missing IDs are ignored.
+
+:meth:`Scheduler.unpause_timeout` calls this.
+
+"""
+        self._set_paused(ids, False)
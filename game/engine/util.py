@@ -11,8 +11,8 @@ from pygame import Rect
 # be sure to change util.rst
 __all__ = ('dd', 'takes_args', 'wrap_fn', 'ir', 'sum_pos', 'pos_in_rect',
            'normalise_colour', 'randsgn','rand0', 'weighted_rand',
-           'align_rect', 'position_sfc', 'convert_sfc', 'combine_drawn',
-           'blank_sfc', 'Grid', 'InfiniteGrid')
+           'align_rect', 'position_sfc', 'convert_sfc', 'merge_rects',
+           'combine_drawn', 'blank_sfc', 'Grid', 'InfiniteGrid')
 
 
 # abstract
@@ -292,15 +292,99 @@ def convert_sfc (sfc):
     return sfc.convert_alpha() if has_alpha(sfc) else sfc.convert()
 
 
+def _merge_near (rects, waste):
+    # rects is [(rect, area)], where area is how much of the rect is covered by
+    # the original rects
+    rtn = []
+    rtn_rects = []
+    for r, area in rects:
+        merged = True
+        while merged:
+            merged = False
+            # only rects within half this rect's size are worth trying
+            for i in r.inflate(r.w, r.h).collidelistall(rtn_rects):
+                other, other_area = rtn[i]
+                bbox = r.union(other)
+                overlap = r.clip(other)
+                bbox_area = bbox.w * bbox.h
+                new_area = min(area + other_area - overlap.w * overlap.h,
+                               bbox_area)
+                if bbox_area - new_area <= waste * bbox_area:
+                    del rtn[i]
+                    del rtn_rects[i]
+                    r = bbox
+                    area = new_area
+                    merged = True
+                    break
+        rtn.append((r, area))
+        rtn_rects.append(r)
+    return rtn
+
+
+def _merge_cells (rects, max_rects):
+    # merge [(rect, area)] by which cell of a coarse grid their centres are in
+    rs = [r for r, area in rects]
+    x0, y0, w, h = rs[0].unionall(rs[1:])
+    n = int(max_rects ** .5)
+    cells = {}
+    for r, area in rects:
+        cell = (n * (r.centerx - x0) // w, n * (r.centery - y0) // h)
+        if cell in cells:
+            cell_r, cell_area = cells[cell]
+            cells[cell] = (cell_r.union(r), cell_area + area)
+        else:
+            cells[cell] = (r, area)
+    return cells.values()
+
+
+def merge_rects (rects, waste = None, max_rects = None):
+    """Merge nearby rects, trading extra area for fewer rects.
+
+merge_rects(rects[, waste][, max_rects]) -> merged
+
+:arg rects: sequence of rects (anything ``pygame.Rect`` accepts).
+:arg waste: nearby rects are replaced by their bounding box if the area it
+            covers that the original rects don't is at most this fraction of
+            the bounding box's area.  Defaults to ``conf.DIRTY_WASTE``.
+:arg max_rects: if more rects than this remain, rects are merged by region
+                (using a grid of at most this many cells).  Defaults to
+                ``conf.DIRTY_MAX_RECTS``; pass ``0`` for no limit.
+
+:return: a list of new ``pygame.Rect`` instances covering at least the same
+         area as ``rects``, without any empty rects.  These may overlap.
+
+"""
+    if waste is None or max_rects is None:
+        # conf imports this module
+        from .conf import conf
+        if waste is None:
+            waste = conf.DIRTY_WASTE
+        if max_rects is None:
+            max_rects = conf.DIRTY_MAX_RECTS
+    rtn = []
+    for r in rects:
+        r = Rect(r)
+        if r.w > 0 and r.h > 0:
+            rtn.append((r, r.w * r.h))
+    if max_rects and len(rtn) > 4 * max_rects:
+        # too many to be worth merging individually
+        rtn = _merge_cells(rtn, max_rects)
+    rtn = _merge_near(rtn, waste)
+    if max_rects and len(rtn) > max_rects:
+        rtn = _merge_near(_merge_cells(rtn, max_rects), waste)
+    return [r for r, area in rtn]
+
+
 def combine_drawn (*drawn):
     """Combine the given drawn flags.
 
-These are as returned by :meth:`engine.game.World.draw`.
+These are as returned by :meth:`engine.game.World.draw`.  Lists of rects are
+simplified using :func:`merge_rects`.
 
 """
     if True in drawn:
         return True
-    rects = sum((list(d) for d in drawn if d), [])
+    rects = merge_rects(sum((list(d) for d in drawn if d), []))
     return rects if rects else False
 
 
@@ -74,7 +74,7 @@ class MovingEntity (NonRect):
         self._extra_collide_es = [] # non-solid entities to collide with
 
     def added (self):
-        C = self.world.scheduler.counter
+        C = lambda t: self.world.scheduler.counter(t, lazy=True)
         self._can_step_snd = C(conf.STEP_SOUND_TIME[self.ident])
         self._jump_finished = C(conf.JUMP_TIME[self.ident])
         self._can_autojump = C(conf.AUTOJUMP_COOLDOWN[self.ident])
@@ -280,7 +280,7 @@ class Enemy (MovingEntity):
         self._last_dirn = self.dirn
         self._extra_collide_es = self.world.barriers
         self._initial_pos = self.rect.center
-        self._lost = self.world.scheduler.counter(conf.SEEK_TIME)
+        self._lost = self.world.scheduler.counter(conf.SEEK_TIME, lazy=True)
 
     def update_graphics (self):
         # change to the correct animation based on .walking/.dirn
@@ -3,7 +3,7 @@ from itertools import cycle
 import pygame as pg
 from pygame import Rect
 
-from .engine import conf, evt, gfx, util
+from .engine import conf, evt, gfx, util, quality
 from .engine import game
 
 from .conf import Conf
@@ -24,25 +24,19 @@ while True:
 
 class World (game.World):
     def init (self):
-        self.afps = 1
-        self.slow = 0
         self.fade_call = lambda: None
-
-    def update (self):
+        # fade resolution is the first thing to give up when drawing is slow
+        self.quality.add(quality.Knob(
+            'fade resolution', conf.QUALITY_FADE_SLOW, self._set_fade_slow,
+            lambda: self.graphics.fading
+        ), position=0)
+
+    def _set_fade_slow (self, slow):
+        conf.FADE_SLOW = slow
+        conf.ALLOW_FADES = slow > 0
         if self.graphics.fading:
-            current = float(self.scheduler.current_fps) / self.scheduler.fps
-            self.afps = self.afps * .6 + current * .4
-            if self.afps < .8:
-                self.slow += 1
-            else:
-                self.slow = 0
-            if self.slow >= 5:
-                self.slow = 0
-                self.afps = 1
-                conf.FADE_SLOW *= .8
-                if conf.FADE_SLOW < .1:
-                    conf.ALLOW_FADES = False
-                self.fade_call()
+            # restart the current fade with the new resolution
+            self.fade_call()
 
     def _fade_thing (self, start_c, from_c, to_c, t):
         diff, i = max((abs(x - y), i)
@@ -113,20 +107,29 @@ class Level (World):
         # the surface we draw to
         self.sfc = self.graphics.orig_sfc
         self.display.orig_sfc = self._display.orig_sfc
+        self._scaling_knob = None
         self.set_scaling(conf.SCALE)
 
         # might get a negative number, which breaks progression
         self._ident = ident % len(conf.LEVELS)
         self._won = False
-        size = self.graphics.orig_size
-        self.rect = Rect((0, 0), size)
         data = conf.LEVELS[ident]
+        # levels may be bigger than the screen, given in wall tiles
+        size = data.get('size')
+        if size is None:
+            size = self.graphics.orig_size
+        else:
+            ts = conf.TILE_SIZE['wall']
+            size = (size[0] * ts, size[1] * ts)
+        self.rect = Rect((0, 0), size)
 
         # tilemaps: use existing ones if passed
-        if bg is None:
-            ts = conf.TILE_SIZE['bg']
-            bg = mk_tilemap('bg', ((0, 0), (size[0] / ts, size[1] / ts)),
-                            size=size)
+        ts = conf.TILE_SIZE['bg']
+        # cover the level with whole tiles
+        bg_size = ((size[0] + ts - 1) // ts, (size[1] + ts - 1) // ts)
+        if bg is None or bg.size != (bg_size[0] * ts, bg_size[1] * ts):
+            bg = mk_tilemap('bg', ((0, 0), bg_size),
+                            size=(bg_size[0] * ts, bg_size[1] * ts))
             bg.layer = conf.LAYERS['bg']
         self._bg = bg
         if wall_graphic is None:
@@ -169,22 +172,46 @@ class Level (World):
             self.fade_from(*conf.START_FADE_IN)
         elif evt == 'died':
             self.fade_from(*conf.DIE_FADE_IN)
+        self.update_camera()
+
+    def update (self):
+        World.update(self)
+        self.update_camera()
+
+    def update_camera (self):
+        # centre the view on the player, but keep it within the level
+        view = Rect((0, 0), self.graphics.orig_size)
+        view.center = self.player.rect.center
+        self.graphics.offset = view.clamp(self.rect).topleft
+
+    def _set_scale_fn (self, scale):
+        if scale == 'scale2x':
+            self.graphics.scale_fn = lambda sfc, sz: pg.transform.scale2x(sfc)
+            # only changed areas are rescaled, and scale2x looks at neighbours
+            self.graphics.scale_margin = 1
+        else:
+            self.graphics.scale_fn = getattr(pg.transform, scale)
 
     def set_scaling (self, scale):
         conf.SCALE = scale
-        conf.ALLOW_FADES = True
-        conf.FADE_SLOW = 1
+        # the expensive scaling modes can drop to plain scaling when slow
+        self.quality.rm(self._scaling_knob)
+        self._scaling_knob = None
+        if scale in ('scale2x', 'smoothscale'):
+            self._scaling_knob = quality.Knob('scaling', (scale, 'scale'),
+                                              self._set_scale_fn)
+        # start with full quality in the new mode
+        self.quality.reset()
 
         if scale != 'none':
             conf.RES_W = conf.RES_DOUBLE
             # add GM to display and use display for output
             self._display.add(self.graphics.resize(*conf.RES_DOUBLE))
             self.display = self._display
-            self.graphics.scale_fn = (
-                (lambda sfc, sz: pg.transform.scale2x(sfc))
-                if scale == 'scale2x'
-                else getattr(pg.transform, scale)
-            )
+            if self._scaling_knob is None:
+                self._set_scale_fn(scale)
+            else:
+                self.quality.add(self._scaling_knob)
             self.graphics.orig_sfc = self.sfc
         else:
             conf.RES_W = conf.RES_SINGLE
@@ -235,15 +262,17 @@ class Level (World):
             # only generate bg once per game, for speed
             conf.GAME.switch_world(Level, i, bg=self._bg)
 
-    def _real_win (self):
+    def _win (self):
+        # coroutine: wait for lift doors to open a little first
+        yield self.scheduler.sleep(conf.WIN_DELAY)
         self.fade_to(*conf.WIN_FADE_OUT)
-        self.scheduler.add_timeout(self.progress, conf.WIN_TIME)
+        yield self.scheduler.sleep(conf.WIN_TIME)
+        self.progress()
 
     def win (self):
         # progress with fade
         self._won = True
-        # wait for lift doors to open a little first
-        self.scheduler.add_timeout(self._real_win, conf.WIN_DELAY)
+        self.scheduler.spawn(self._win())
 
 
 class Paused (World):
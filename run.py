@@ -8,11 +8,8 @@ if os.name == 'nt':
 from game import engine
 
 if __name__ == '__main__':
-    engine.init()
-
-    from game.level import Level as entry_world
-
     args = []
+    options = None
     if len(argv) > 1:
         # got some command-line arguments
         from optparse import OptionParser
@@ -21,6 +18,13 @@ if __name__ == '__main__':
         op.add_option('-p', '--profile', action = 'store_true')
         op.add_option('-t', '--time', action = 'store', type = 'float',
                       help = 'float seconds to run for')
+        op.add_option('-r', '--frames', action = 'store', type = 'int',
+                      help = 'number of frames to run for; ignored if ' \
+                      '--time is given')
+        op.add_option('-H', '--headless', action = 'store_true',
+                      help = 'run as fast as possible without a display')
+        op.add_option('-m', '--mute', action = 'store_false', dest = 'audio',
+                      help = 'don\'t play any audio')
         op.add_option('-n', '--num-stats', action = 'store', type = 'int',
                       help = 'number of functions to show when profiling; ' \
                       'defaults to 30')
@@ -29,11 +33,26 @@ if __name__ == '__main__':
         op.add_option('-s', '--sort-stats', action = 'store', type = 'string',
                       help = 'profile stats sort mode; defaults to ' \
                       '\'cumulative\' (see pstats.Stats.sort_stats doc)')
-        op.set_defaults(debug = False, time = None, num_stats = 30,
+        op.set_defaults(debug = False, time = None, frames = None,
+                        headless = False, audio = True, num_stats = 30,
                         profile_file = '.profile_stats',
                         sort_stats = 'cumulative')
         options, argv = op.parse_args()
         args.append(int(argv[0]) - 1 if argv else 0)
+        # SDL picks its drivers when initialised, and the game module uses the
+        # display on import, so do this first
+        if options.headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        if not options.audio:
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    else:
+        args.append(0)
+
+    engine.init()
+
+    from game.level import Level as entry_world
+
+    if options is not None:
         # debug
         engine.conf.DEBUG = options.debug
         # construct world args
@@ -44,15 +63,18 @@ if __name__ == '__main__':
             args = ', '.join(repr(arg) for arg in args)
             if args:
                 args += ', '
-            code = 'engine.game.run(entry_world, {0}t = options.time)'
+            code = 'engine.game.run(entry_world, {0}t = options.time, ' \
+                   'frames = options.frames, headless = options.headless, ' \
+                   'audio = options.audio)'
             run(code.format(args), options.profile_file, locals())
             Stats(options.profile_file).strip_dirs() \
                 .sort_stats(options.sort_stats).print_stats(options.num_stats)
             os.unlink(options.profile_file)
         else:
-            engine.game.run(entry_world, *args, t = options.time)
+            engine.game.run(entry_world, *args, t = options.time,
+                            frames = options.frames,
+                            headless = options.headless, audio = options.audio)
     else:
-        args.append(0)
         engine.game.run(entry_world, *args)
 
     engine.quit()
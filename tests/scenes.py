@@ -0,0 +1,141 @@
+"""Randomly changing scenes for graphics tests, and a naive redraw to check
+:class:`GraphicsManager <engine.gfx.container.GraphicsManager>` output against.
+
+This isn't a test module itself; test modules import it.
+
+"""
+
+import pygame as pg
+from game.engine import sched
+from game.engine.util import ir
+from game.engine.gfx import container
+from game.engine.gfx.graphic import Graphic
+
+#: Layer of the static, opaque background added by :class:`Scene`.
+BG_LAYER = 100
+
+
+def pixels (sfc):
+    return pg.image.tostring(sfc, 'RGBA')
+
+
+def naive (gm):
+    """Draw everything in a manager from scratch.
+
+naive(gm) -> sfc
+
+Blits every visible graphic, back layer first, at its position offset by its
+layer's view.  Call after ``gm.draw``, so graphics are up to date.
+
+The order graphics within a layer are drawn in is undefined, so overlapping
+graphics in the same layer must look the same whichever is on top.
+
+"""
+    sfc = gm._orig_sfc.copy()
+    sfc.fill((0, 0, 0))
+    view = sfc.get_rect()
+    x, y = gm.offset
+    for l in reversed(gm.layers):
+        rx, ry = gm._layer_ratio(l)
+        l_view = view.move(ir(x * rx), ir(y * ry))
+        for g in gm.graphics[l]:
+            r = g._postrot_rect
+            # graphics outside the view may not be rendered
+            if g.visible and r.colliderect(l_view):
+                sfc.blit(g._surface, r.move(-l_view[0], -l_view[1]), None,
+                         g.blit_flags)
+    return sfc
+
+
+class Scene (object):
+    """A manager with random graphics.
+
+Scene(rnd, size=(160, 100), n=60, layers=4[, world][, bg])
+
+:arg rnd: ``random.Random`` instance used for everything.
+:arg size: manager's surface size.
+:arg n: number of graphics, spread over layers ``0`` to ``layers - 1``.
+:arg world: ``(w, h)`` area to place graphics in; defaults to ``size``.
+:arg bg: rect covered by an opaque background in :data:`BG_LAYER`.  If not
+         given, the background covers the surface, and the layer has a
+         parallax ratio of ``0``.
+
+Graphics are solid rectangles, with a colour that depends on their layer, so
+they can be drawn in any order within a layer.
+
+"""
+
+    def __init__ (self, rnd, size=(160, 100), n=60, layers=4, world=None,
+                  bg=None):
+        self.rnd = rnd
+        self.layers = layers
+        self.world = size if world is None else world
+        #: ``{layer: colour}``; translucent colours are drawn with alpha.
+        self.colours = dict((l, (rnd.randrange(256), rnd.randrange(256),
+                                 rnd.randrange(256), rnd.choice((255, 90))))
+                            for l in xrange(layers))
+        #: The :class:`GraphicsManager`.
+        self.gm = gm = container.GraphicsManager(sched.Scheduler(60), size)
+        if bg is None:
+            bg = pg.Rect((0, 0), size)
+            gm.parallax = {BG_LAYER: 0}
+        bg_sfc = pg.Surface(bg.size)
+        bg_sfc.fill((10, 20, 30))
+        gm.add(Graphic(bg_sfc, bg.topleft, layer=BG_LAYER))
+        #: Graphics, not including the background; these may not all be in
+        #: the manager.
+        self.graphics = gs = []
+        for i in xrange(n):
+            g = Graphic(self.mk_sfc(0), self.random_pos())
+            self.set_layer(g, rnd.randrange(layers))
+            gs.append(g)
+        gm.add(*gs)
+
+    def mk_sfc (self, layer, size=None):
+        rnd = self.rnd
+        if size is None:
+            size = (rnd.randrange(1, 40), rnd.randrange(1, 40))
+        colour = self.colours[layer]
+        sfc = pg.Surface(size, pg.SRCALPHA if colour[3] < 255 else 0)
+        sfc.fill(colour)
+        return sfc
+
+    def random_pos (self):
+        rnd = self.rnd
+        w, h = self.world
+        return (rnd.randrange(-20, w + 10), rnd.randrange(-20, h + 10))
+
+    def set_layer (self, g, layer):
+        """Move a graphic to a layer, changing its colour to match."""
+        if g.layer != layer:
+            g.orig_sfc = self.mk_sfc(layer, g.orig_sfc.get_size())
+            g.layer = layer
+
+    def mutate (self, n=8):
+        """Make up to ``n`` random changes to graphics.
+
+Changes are to position, visibility and layer, and adding and removing.
+
+"""
+        rnd = self.rnd
+        gm = self.gm
+        for i in xrange(rnd.randrange(n + 1)):
+            g = rnd.choice(self.graphics)
+            a = rnd.random()
+            if a < .5:
+                g.pos = self.random_pos()
+            elif a < .6:
+                g.move_by(rnd.randrange(-3, 4), rnd.randrange(-3, 4))
+            elif a < .75:
+                g.visible = not g.visible
+            elif a < .85:
+                self.set_layer(g, rnd.randrange(self.layers))
+            elif g._manager is gm:
+                gm.rm(g)
+            else:
+                gm.add(g)
+
+    def draw (self):
+        """Draw and return ``(drawn, expected)`` pixels."""
+        self.gm.draw(False)
+        return (pixels(self.gm.orig_sfc), pixels(naive(self.gm)))
@@ -0,0 +1,341 @@
+"""Tests for engine.gfx.container, comparing drawing with a naive redraw.
+
+Run from the top-level directory with ``make test``.  Tests use _gm if it's
+built, and _gm_fallback either way.
+
+"""
+
+import sys
+import os
+import random
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pygame as pg
+from game.engine.conf import conf
+from game.engine.gfx import container, _gm_fallback
+from game.engine.gfx.graphic import Graphic
+import scenes
+
+
+def setUpModule ():
+    pg.display.init()
+    pg.display.set_mode((160, 100))
+
+
+class NaiveTestCase (unittest.TestCase):
+    def setUp (self):
+        self._fastdraw = container.fastdraw
+
+    def tearDown (self):
+        container.fastdraw = self._fastdraw
+
+    def fastdraws (self):
+        # each available implementation
+        fds = [self._fastdraw]
+        if self._fastdraw is not _gm_fallback.fastdraw:
+            fds.append(_gm_fallback.fastdraw)
+        return fds
+
+    def assertDraws (self, scene, msg):
+        drawn, expected = scene.draw()
+        # don't print the pixels
+        self.assertTrue(drawn == expected, msg)
+
+
+class ScrollTest (NaiveTestCase):
+    # the view stays within these bounds, and the background moves with the
+    # view and covers it, so that scrolling can reuse the drawn surface
+    bounds = pg.Rect(-200, -150, 800, 500)
+
+    def run_scene (self, seed, parallax):
+        rnd = random.Random(seed)
+        b = self.bounds
+        scene = scenes.Scene(rnd, n=80, world=(500, 300),
+                             bg=pg.Rect(b.topleft, (b.w + 160, b.h + 100)))
+        gm = scene.gm
+        gm.parallax = parallax
+        overlay = Graphic(scene.mk_sfc(0, (20, 10)), (5, 5))
+        gm.overlay = overlay
+        x, y = (0, 0)
+        for f in xrange(150):
+            msg = 'seed {0}, frame {1}'.format(seed, f)
+            a = rnd.random()
+            if a < .6:
+                x += rnd.uniform(-7, 7)
+                y += rnd.uniform(-5, 5)
+            elif a < .7:
+                # further than the surface size
+                x += rnd.choice((-1, 1)) * rnd.uniform(150, 400)
+                y += rnd.uniform(-200, 200)
+            elif a < .75:
+                # remove a whole layer, and put it back later
+                l = rnd.randrange(scene.layers)
+                gs = list(gm.graphics.get(l, ()))
+                gm.rm(*gs)
+                scene.mutate()
+                self.assertDraws(scene, msg)
+                gm.add(*gs)
+            x = min(max(x, b.left), b.right)
+            y = min(max(y, b.top), b.bottom)
+            gm.offset = (x, y)
+            scene.mutate(4)
+            self.assertDraws(scene, msg)
+
+    def test_parallax (self):
+        ratios = {1: .5, 2: (1, .25), 3: (-.5, 2)}
+        for fastdraw in self.fastdraws():
+            container.fastdraw = fastdraw
+            for seed in xrange(3):
+                self.run_scene(seed, dict(ratios))
+
+    def test_parallax_func (self):
+        ratios = {0: (0, 1), 2: .3}
+        for fastdraw in self.fastdraws():
+            container.fastdraw = fastdraw
+            for seed in xrange(3, 6):
+                self.run_scene(seed, lambda l: ratios.get(l, 1))
+
+    def test_change_ratio (self):
+        # changing a layer's ratio without moving the view
+        for fastdraw in self.fastdraws():
+            container.fastdraw = fastdraw
+            rnd = random.Random(6)
+            scene = scenes.Scene(rnd, world=(300, 200))
+            gm = scene.gm
+            gm.offset = (40.5, 30)
+            for f in xrange(60):
+                gm.parallax[rnd.randrange(scene.layers)] = rnd.uniform(-1, 2)
+                scene.mutate(2)
+                self.assertDraws(scene, 'frame {0}'.format(f))
+
+
+class BakeTest (NaiveTestCase):
+    def setUp (self):
+        NaiveTestCase.setUp(self)
+        self._frames = conf.STATIC_LAYER_FRAMES
+        # bake soon, so changes happen to baked layers
+        conf.STATIC_LAYER_FRAMES = 3
+
+    def tearDown (self):
+        conf.STATIC_LAYER_FRAMES = self._frames
+        NaiveTestCase.tearDown(self)
+
+    def random_colour (self, rnd):
+        return (rnd.randrange(256), rnd.randrange(256), rnd.randrange(256),
+                rnd.choice((255, 255, 90)))
+
+    def run_scene (self, seed):
+        # returns the number of frames drawn with baked layers
+        rnd = random.Random(seed)
+        scene = scenes.Scene(rnd, n=20)
+        gm = scene.gm
+        # a grid of tiles spread over layers 10-12 in front of an opaque
+        # floor in layer 13, so the layers can be baked together; tiles are
+        # in different places, so never overlap others in the same layer
+        floor_sfc = pg.Surface((120, 80))
+        floor_sfc.fill((200, 150, 100))
+        floor = Graphic(floor_sfc, (20, 10), layer=13)
+        tiles = []
+        for i in xrange(6):
+            for j in xrange(4):
+                colour = self.random_colour(rnd)
+                sfc = pg.Surface((20, 20),
+                                 pg.SRCALPHA if colour[3] < 255 else 0)
+                sfc.fill(colour)
+                tiles.append(Graphic(sfc, (20 + 20 * i, 10 + 20 * j),
+                                     layer=10 + (i + j) % 3))
+        gm.add(floor, *tiles)
+        baked = 0
+        for f in xrange(150):
+            if rnd.random() < .2:
+                t = rnd.choice(tiles)
+                a = rnd.random()
+                if a < .2:
+                    t.orig_sfc.fill(self.random_colour(rnd))
+                    t.dirty()
+                elif a < .3:
+                    r = pg.Rect(rnd.randrange(120), rnd.randrange(80),
+                                rnd.randrange(40), rnd.randrange(40))
+                    floor_sfc.fill(self.random_colour(rnd), r)
+                    floor.dirty(r)
+                elif a < .45:
+                    t.visible = not t.visible
+                elif a < .6:
+                    t.layer = rnd.randrange(10, 13)
+                elif a < .7:
+                    if t._manager is gm:
+                        gm.rm(t)
+                    else:
+                        gm.add(t)
+                elif a < .85:
+                    # layers with blit flags can't be baked, so only have
+                    # one tile with flags at a time
+                    for other in tiles:
+                        other.blit_flags = 0
+                    t.blit_flags = rnd.choice((0, pg.BLEND_ADD,
+                                               pg.BLEND_MULT))
+                else:
+                    t.opacity = rnd.choice((255, 160, 0))
+            scene.mutate(2)
+            self.assertDraws(scene, 'seed {0}, frame {1}'.format(seed, f))
+            baked += bool(gm._baker._baked)
+        return baked
+
+    def test_changes (self):
+        for fastdraw in self.fastdraws():
+            container.fastdraw = fastdraw
+            baked = sum(self.run_scene(seed) for seed in xrange(4))
+            # make sure we actually tested something
+            self.assertTrue(baked > 100, baked)
+
+
+class GroupTest (NaiveTestCase):
+    # the same random changes are made to two groups in two managers, one
+    # composited and one not; members are opaque with transparent holes, and
+    # graphics in the same layer have the same colour, so compositing doesn't
+    # change how they look
+
+    def setUp (self):
+        NaiveTestCase.setUp(self)
+        self.colours = [(200, 40, 40), (40, 200, 40), (40, 40, 200)]
+
+    def mk_sfc (self, rnd, layer, size=None):
+        if size is None:
+            size = (rnd.randrange(1, 30), rnd.randrange(1, 30))
+        sfc = pg.Surface(size, pg.SRCALPHA)
+        sfc.fill(self.colours[layer])
+        sfc.fill((0, 0, 0, 0), (rnd.randrange(size[0]), rnd.randrange(size[1]),
+                                rnd.randrange(10), rnd.randrange(10)))
+        return sfc
+
+    def mk_scenes (self, rnd, n=10):
+        # returns ([scene, scene], [group, group], [[member, member]])
+        ss = [scenes.Scene(rnd, n=0), scenes.Scene(rnd, n=0)]
+        pos = (rnd.uniform(0, 100), rnd.uniform(0, 60))
+        groups = [container.GraphicsGroup(*pos) for s in ss]
+        for grp, s in zip(groups, ss):
+            grp.manager = s.gm
+        groups[1].composite = True
+        members = []
+        for i in xrange(n):
+            members.append(self.add_member(rnd, groups))
+        return (ss, groups, members)
+
+    def add_member (self, rnd, groups):
+        layer = rnd.randrange(len(self.colours))
+        sfc = self.mk_sfc(rnd, layer)
+        rel = (rnd.randrange(-10, 50), rnd.randrange(-10, 50))
+        return [grp.add(Graphic(sfc.copy(), layer=layer), *rel)[0]
+                for grp in groups]
+
+    def change (self, rnd, groups, members):
+        # make the same random change to both groups
+        a = rnd.random()
+        if a < .15:
+            pos = (rnd.uniform(-20, 150), rnd.uniform(-20, 90))
+            for grp in groups:
+                grp.pos = pos
+            return
+        elif a < .2:
+            visible = rnd.random() < .7
+            for grp in groups:
+                grp.visible = visible
+            return
+        elif a < .25:
+            members.append(self.add_member(rnd, groups))
+            return
+        ms = rnd.choice(members)
+        if a < .45:
+            # re-add an existing member
+            rel = (rnd.randrange(-10, 50), rnd.randrange(-10, 50))
+            for grp, m in zip(groups, ms):
+                grp.add(m, *rel)
+        elif a < .65:
+            w, h = ms[0].orig_sfc.get_size()
+            r = pg.Rect(rnd.randrange(w), rnd.randrange(h),
+                        rnd.randrange(1, 10), rnd.randrange(1, 10))
+            colour = rnd.choice(((0, 0, 0, 0), self.colours[ms[0].layer]))
+            for m in ms:
+                m.orig_sfc.fill(colour, r)
+                m.dirty(r)
+        elif a < .8:
+            visible = not ms[0].visible
+            for m in ms:
+                m.visible = visible
+        elif a < .9:
+            layer = rnd.randrange(len(self.colours))
+            sfc = self.mk_sfc(rnd, layer, ms[0].orig_sfc.get_size())
+            for m in ms:
+                m.orig_sfc = sfc.copy()
+                m.layer = layer
+        else:
+            for grp, m in zip(groups, ms):
+                if m in grp:
+                    grp.rm(m)
+                else:
+                    grp.add(m)
+
+    def assertSame (self, ss, msg):
+        drawn = [s.draw() for s in ss]
+        for i, (got, expected) in enumerate(drawn):
+            self.assertTrue(got == expected, '{0}, scene {1}'.format(msg, i))
+        self.assertTrue(drawn[0][0] == drawn[1][0], msg)
+
+    def test_changes (self):
+        for fastdraw in self.fastdraws():
+            container.fastdraw = fastdraw
+            for seed in xrange(5):
+                rnd = random.Random(seed)
+                ss, groups, members = self.mk_scenes(rnd)
+                self.assertTrue(not groups[0].composited and
+                                groups[1].composited)
+                for f in xrange(80):
+                    for i in xrange(rnd.randrange(4)):
+                        self.change(rnd, groups, members)
+                    self.assertSame(ss, 'seed {0}, frame {1}'.format(seed, f))
+
+    def test_readd (self):
+        # moving a member by adding it again doesn't leave it drawn in its
+        # old place
+        rnd = random.Random(5)
+        ss, groups, members = self.mk_scenes(rnd, 1)
+        self.assertSame(ss, 'before')
+        for grp, m in zip(groups, members[0]):
+            grp.add(m, 60, 30)
+        self.assertSame(ss, 'after')
+
+    def test_transforms (self):
+        # transform the composited group, check it draws correctly, and that
+        # it draws like the other group after undoing the transforms
+        for fastdraw in self.fastdraws():
+            container.fastdraw = fastdraw
+            for seed in xrange(6, 10):
+                rnd = random.Random(seed)
+                ss, groups, members = self.mk_scenes(rnd)
+                grp = groups[1]
+                for f in xrange(60):
+                    msg = 'seed {0}, frame {1}'.format(seed, f)
+                    a = rnd.random()
+                    if a < .15:
+                        grp.rescale(rnd.uniform(.3, 2), rnd.uniform(.3, 2))
+                    elif a < .3:
+                        grp.flip(rnd.random() < .5, rnd.random() < .5)
+                    elif a < .45:
+                        grp.opacify(rnd.randrange(256))
+                    elif a < .6:
+                        grp.rotate(rnd.uniform(-3, 3))
+                    elif a < .65:
+                        grp.composite = not grp.composite
+                    else:
+                        self.change(rnd, groups, members)
+                    drawn, expected = ss[1].draw()
+                    self.assertTrue(drawn == expected, msg)
+                    if rnd.random() < .2:
+                        grp.rescale().flip().opacify(255).rotate(0)
+                        self.assertSame(ss, msg + ' (reset)')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""Tests for _gm_fallback, and the _gm extension module, comparing it with
+_gm_fallback.
+
+Run from the top-level directory with ``make test``, after ``make``.  Tests of
+_gm are skipped if it hasn't been built.
+
+"""
+
+import sys
+import os
+import random
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pygame as pg
+from game.engine import sched
+from game.engine.gfx import container, _gm_fallback
+from game.engine.gfx.graphic import Graphic
+import scenes
+
+have_gm = container.fastdraw is not _gm_fallback.fastdraw
+
+
+def random_rects (rnd, n, size=40):
+    # may be empty or partly negative
+    return [pg.Rect(rnd.randrange(-5, size), rnd.randrange(-5, size),
+                    rnd.randrange(-2, size // 2), rnd.randrange(-2, size // 2))
+            for i in xrange(n)]
+
+
+def pixels (rects):
+    # set of points covered by rects
+    return set((x, y) for r in rects
+               for x in xrange(r.left, r.right)
+               for y in xrange(r.top, r.bottom))
+
+
+def setUpModule ():
+    pg.display.init()
+    pg.display.set_mode((160, 100))
+
+
+@unittest.skipUnless(have_gm, '_gm is not built')
+class MkDisjointTest (unittest.TestCase):
+    def test_parity (self):
+        # both implementations give disjoint rects covering the same area
+        rnd = random.Random(0)
+        for i in xrange(300):
+            add = random_rects(rnd, rnd.randrange(8))
+            rm = random_rects(rnd, rnd.randrange(4))
+            want = pixels(add) - pixels(rm)
+            for mk_disjoint in (container.mk_disjoint,
+                                _gm_fallback.mk_disjoint):
+                rs = mk_disjoint(add, rm)
+                self.assertEqual(pixels(rs), want)
+                self.assertEqual(sum(r.w * r.h for r in rs), len(want))
+                self.assertTrue(all(r.w > 0 and r.h > 0 for r in rs))
+
+    def test_same_rects (self):
+        # and in fact the same rects
+        rnd = random.Random(1)
+        for i in xrange(300):
+            add = random_rects(rnd, rnd.randrange(8))
+            rm = random_rects(rnd, rnd.randrange(4))
+            self.assertEqual(container.mk_disjoint(add, rm),
+                             _gm_fallback.mk_disjoint(add, rm))
+
+
+class FallbackTest (unittest.TestCase):
+    def setUp (self):
+        self._fastdraw = container.fastdraw
+        container.fastdraw = _gm_fallback.fastdraw
+
+    def tearDown (self):
+        container.fastdraw = self._fastdraw
+
+    def test_naive (self):
+        # drawing only dirty areas gives the same pixels as redrawing
+        # everything
+        for seed in xrange(5):
+            rnd = random.Random(seed)
+            scene = scenes.Scene(rnd)
+            for f in xrange(60):
+                scene.mutate()
+                if rnd.random() < .1:
+                    scene.gm.dirty(pg.Rect(rnd.randrange(150),
+                                           rnd.randrange(90), rnd.randrange(50),
+                                           rnd.randrange(50)))
+                drawn, expected = scene.draw()
+                self.assertTrue(drawn == expected,
+                                'seed {0}, frame {1}'.format(seed, f))
+
+
+@unittest.skipUnless(have_gm, '_gm is not built')
+class FastdrawTest (unittest.TestCase):
+    def setUp (self):
+        self._fastdraw = container.fastdraw
+
+    def tearDown (self):
+        container.fastdraw = self._fastdraw
+
+    def run_scene (self, seed, fastdraw):
+        # draw frames of a randomly changing scene; returns the dirty list and
+        # pixels for each frame
+        container.fastdraw = fastdraw
+        rnd = random.Random(seed)
+        gm = container.GraphicsManager(sched.Scheduler(60), (160, 100))
+        gs = []
+        for i in xrange(60):
+            sfc = pg.Surface((rnd.randrange(1, 40), rnd.randrange(1, 40)),
+                             pg.SRCALPHA if rnd.random() < .4 else 0)
+            sfc.fill((rnd.randrange(256), rnd.randrange(256),
+                      rnd.randrange(256), rnd.choice((255, 90))))
+            gs.append(Graphic(sfc, (rnd.randrange(-20, 170),
+                                    rnd.randrange(-20, 110)),
+                              layer=rnd.randrange(4)))
+        gm.add(*gs)
+        frames = []
+        for f in xrange(40):
+            for i in xrange(rnd.randrange(8)):
+                g = rnd.choice(gs)
+                a = rnd.random()
+                if a < .6:
+                    g.pos = (rnd.randrange(-20, 170), rnd.randrange(-20, 110))
+                elif a < .75:
+                    g.visible = not g.visible
+                elif a < .85:
+                    g.layer = rnd.randrange(4)
+                elif a < .92:
+                    if g._manager is gm:
+                        gm.rm(g)
+                    else:
+                        gm.add(g)
+                else:
+                    gm.dirty(pg.Rect(rnd.randrange(150), rnd.randrange(90),
+                                     rnd.randrange(50), rnd.randrange(50)))
+            dirty = gm.draw(False)
+            if dirty is not False:
+                dirty = [tuple(r) for r in dirty]
+            frames.append((dirty, pg.image.tostring(gm.orig_sfc, 'RGBA')))
+        return frames
+
+    def test_parity (self):
+        # both implementations give the same dirty rects and pixels
+        for seed in xrange(5):
+            c = self.run_scene(seed, self._fastdraw)
+            py = self.run_scene(seed, _gm_fallback.fastdraw)
+            for i, (a, b) in enumerate(zip(c, py)):
+                msg = 'seed {0}, frame {1}'.format(seed, i)
+                self.assertEqual(a[0], b[0], msg)
+                # don't print the pixels
+                self.assertTrue(a[1] == b[1], msg)
+
+
+if __name__ == '__main__':
+    unittest.main()
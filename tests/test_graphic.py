@@ -0,0 +1,107 @@
+"""Tests for engine.gfx.graphic.
+
+Run from the top-level directory with ``make test``.
+
+"""
+
+import sys
+import os
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pygame as pg
+from game.engine.gfx.graphic import Graphic
+
+
+def setUpModule ():
+    pg.display.init()
+    pg.display.set_mode((100, 100))
+
+
+def pixels (sfc):
+    return pg.image.tostring(sfc, 'RGBA')
+
+
+class SharedTransformTest (unittest.TestCase):
+    def assertPixels (self, sfc, expected):
+        # don't print the pixels on failure
+        self.assertTrue(pixels(sfc) == expected, 'pixels differ')
+
+    def check_partial (self, transform, dirty, size=(40, 40)):
+        # two graphics share a cached transform result; one gets a partial
+        # update, which shouldn't show in the other
+        src = pg.Surface(size)
+        src.fill((255, 0, 0))
+        a = Graphic(src)
+        b = Graphic(src)
+        transform(a)
+        transform(b)
+        self.assertTrue(a.surface is b.surface)
+        before = pixels(b.surface)
+        src.fill((0, 0, 255), dirty)
+        a.dirty(dirty)
+        after = pixels(a.surface)
+        self.assertTrue(after != before)
+        self.assertPixels(b.surface, before)
+        # a's result is what a full transform gives
+        c = Graphic(src)
+        transform(c)
+        self.assertPixels(c.surface, after)
+        # and a can carry on updating its own copy
+        src.fill((0, 255, 0), dirty)
+        a.dirty(dirty)
+        own = a.surface
+        src.fill((0, 0, 0), dirty)
+        a.dirty(dirty)
+        self.assertTrue(a.surface is own)
+        self.assertPixels(b.surface, before)
+
+    def test_crop (self):
+        self.check_partial(lambda g: g.crop((5, 5, 30, 30)), (10, 10, 4, 4))
+
+    def test_flip (self):
+        self.check_partial(lambda g: g.flip(True, False), (10, 10, 2, 2))
+
+    def test_resize (self):
+        def resize (g):
+            # supports partial resizing
+            g.scale_fn = pg.transform.scale
+            g.resize(60, 100)
+
+        self.check_partial(resize, (10, 10, 4, 4))
+
+
+class UndoTransformTest (unittest.TestCase):
+    def check_undo (self, transform, undo):
+        # a transform set back to doing nothing gives the original surface
+        src = pg.Surface((40, 30))
+        src.fill((255, 0, 0))
+        g = Graphic(src)
+        transform(g)
+        g.surface
+        undo(g)
+        self.assertEqual(g.surface.get_size(), (40, 30))
+        self.assertEqual(g.postrot_rect, pg.Rect(0, 0, 40, 30))
+        self.assertTrue(pixels(g.surface) == pixels(src), 'pixels differ')
+
+    def test_resize (self):
+        self.check_undo(lambda g: g.rescale(2, .5), lambda g: g.rescale())
+
+    def test_opacify (self):
+        self.check_undo(lambda g: g.opacify(100), lambda g: g.opacify(255))
+
+    def test_rotate (self):
+        self.check_undo(lambda g: g.rotate(1), lambda g: g.rotate(0))
+
+    def test_retransform (self):
+        # rotation is reapplied from scratch when its anchor changes
+        def undo (g):
+            g.rotate(0)
+            g.rot_anchor = (1, 1)
+
+        self.check_undo(lambda g: g.rotate(1), undo)
+
+
+if __name__ == '__main__':
+    unittest.main()
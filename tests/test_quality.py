@@ -0,0 +1,47 @@
+"""Tests for engine.quality.
+
+Run from the top-level directory with ``make test``.
+
+"""
+
+import sys
+import os
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game.engine import sched
+from game.engine.quality import Knob, QualityGovernor
+
+
+class GovernorTest (unittest.TestCase):
+    def setUp (self):
+        self.values = {}
+        self.governor = QualityGovernor(sched.Scheduler(60), .5)
+
+    def knob (self, name):
+        return Knob(name, (2, 1, 0),
+                    lambda value: self.values.__setitem__(name, value))
+
+    def test_add (self):
+        gov = self.governor
+        a, b, c, d = [self.knob(name) for name in 'abcd']
+        gov.add(a, b)
+        self.assertEqual(gov.add(c, d, position=1), [c, d])
+        self.assertEqual(gov.knobs, [a, c, d, b])
+        # applied on adding
+        self.assertEqual(self.values, dict.fromkeys('abcd', 2))
+
+    def test_lower_first (self):
+        # a knob added at the start is lowered first
+        gov = self.governor
+        a, b = self.knob('a'), self.knob('b')
+        gov.add(a)
+        gov.add(b, position=0)
+        self.assertTrue(gov.lower() is b)
+        self.assertEqual(self.values, {'a': 2, 'b': 1})
+        self.assertTrue(gov.raise_() is b)
+        self.assertEqual(self.values, {'a': 2, 'b': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Tests for engine.res and packing images with engine.gfx.util.pack_sfcs.
+
+Run from the top-level directory with ``make test``.
+
+"""
+
+import sys
+import os
+import random
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import pygame as pg
+from game.engine.conf import conf
+from game.engine.res import ResourceManager, load_img
+from game.engine.gfx.util import pack_sfcs
+
+
+def setUpModule ():
+    pg.display.init()
+    pg.display.set_mode((100, 100))
+
+
+class PackTest (unittest.TestCase):
+    def setUp (self):
+        self._img_dir = conf.IMG_DIR
+        conf.IMG_DIR = os.path.join(ROOT, 'img', '')
+
+    def tearDown (self):
+        conf.IMG_DIR = self._img_dir
+
+    def assertSame (self, packed, sfc, msg):
+        self.assertEqual(packed.get_size(), sfc.get_size(), msg)
+        self.assertEqual(packed.get_flags() & pg.SRCALPHA,
+                         sfc.get_flags() & pg.SRCALPHA, msg)
+        self.assertEqual(packed.get_colorkey(), sfc.get_colorkey(), msg)
+        self.assertEqual(packed.get_alpha(), sfc.get_alpha(), msg)
+        # don't print the pixels
+        self.assertTrue(pg.image.tostring(packed, 'RGBA') ==
+                        pg.image.tostring(sfc, 'RGBA'), msg)
+
+    def test_img_dir (self):
+        # the game's images are the same packed as loaded individually
+        rm = ResourceManager()
+        rm.use(conf.DEFAULT_RESOURCE_POOL, self)
+        packed = rm.pack_imgs()
+        fns = sorted(fn for fn in os.listdir(conf.IMG_DIR)
+                     if fn.endswith('.png'))
+        self.assertEqual(len(packed), len(fns))
+        self.assertTrue(any(p.get_parent() is not None for p in packed))
+        for fn, p in zip(fns, packed):
+            self.assertSame(p, load_img(fn), fn)
+            # and cached
+            self.assertTrue(rm.img(fn) is p, fn)
+
+    def test_pack_sfcs (self):
+        # a mix of formats, over several pages
+        rnd = random.Random(0)
+        sfcs = []
+        for i in xrange(60):
+            size = (rnd.randrange(1, 30), rnd.randrange(1, 30))
+            a = rnd.random()
+            if a < .5:
+                sfc = pg.Surface(size, pg.SRCALPHA).convert_alpha()
+            else:
+                sfc = pg.Surface(size).convert()
+                if a < .6:
+                    sfc.set_colorkey((0, 0, 0))
+                elif a < .7:
+                    sfc.set_alpha(100)
+            for j in xrange(5):
+                sfc.fill((rnd.randrange(256), rnd.randrange(256),
+                          rnd.randrange(256), rnd.randrange(256)),
+                         (rnd.randrange(size[0]), rnd.randrange(size[1]),
+                          rnd.randrange(1, 20), rnd.randrange(1, 20)))
+            sfcs.append(sfc)
+        packed = pack_sfcs(sfcs, (100, 100))
+        self.assertTrue(len(set(p.get_parent() for p in packed
+                                if p.get_parent() is not None)) > 1)
+        for i, (p, sfc) in enumerate(zip(packed, sfcs)):
+            self.assertSame(p, sfc, str(i))
+
+
+if __name__ == '__main__':
+    unittest.main()
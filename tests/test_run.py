@@ -0,0 +1,30 @@
+"""Smoke test for run.py.
+
+Run from the top-level directory with ``make test``.
+
+"""
+
+import sys
+import os
+import subprocess
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class HeadlessTest (unittest.TestCase):
+    def test_headless (self):
+        # runs some frames with no display and no SDL drivers chosen
+        env = dict(os.environ)
+        for k in ('DISPLAY', 'SDL_VIDEODRIVER', 'SDL_AUDIODRIVER'):
+            env.pop(k, None)
+        p = subprocess.Popen([sys.executable, os.path.join(ROOT, 'run.py'),
+                              '-H', '-m', '-r', '30'],
+                             cwd=ROOT, env=env, stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT)
+        out = p.communicate()[0]
+        self.assertEqual(p.returncode, 0, out)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,571 @@
+"""Tests for engine.sched.
+
+Run from the top-level directory with ``make test``.
+
+"""
+
+import sys
+import os
+import random
+import threading
+import unittest
+from time import time, sleep
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game.engine import sched
+
+
+class FakeClock (object):
+    """Stands in for ``perf_counter`` and :meth:`Timer._wait_until`."""
+
+    def __init__ (self):
+        self.t = 0.
+
+    def __call__ (self):
+        return self.t
+
+    def wait_until (self, t_end):
+        self.t = max(self.t, t_end)
+
+
+class FixedStepTest (unittest.TestCase):
+    def setUp (self):
+        self.clock = FakeClock()
+        self._perf_counter = sched.perf_counter
+        sched.perf_counter = self.clock
+        # use exact binary fractions, so there's no rounding error
+        self.timer = sched.Timer(64)
+        self.timer.fixed_step = True
+        self.timer._wait_until = self.clock.wait_until
+
+    def tearDown (self):
+        sched.perf_counter = self._perf_counter
+
+    def run_fixed (self, draw_costs, steps):
+        # run for the given number of steps, taking each time in draw_costs
+        # (in frames) to draw in turn; returns [(steps so far, alpha, time)]
+        # for each draw
+        timer = self.timer
+        clock = self.clock
+        frame = timer.frame
+        n = [0]
+        draws = []
+
+        def cb ():
+            n[0] += 1
+
+        def draw ():
+            draws.append((n[0], timer.alpha, clock.t))
+            clock.t += frame * draw_costs[len(draws) % len(draw_costs)]
+
+        t0 = clock.t
+        timer.run(cb, frames=steps, draw=draw)
+        return t0, draws
+
+    def test_alpha_is_unsimulated_time (self):
+        # steps plus alpha account for exactly the real time that has passed
+        frame = self.timer.frame
+        t0, draws = self.run_fixed((.375, 1.625, .875, 2.25), 200)
+        self.assertTrue(len(draws) > 20)
+        for steps, alpha, t in draws:
+            self.assertTrue(0 <= alpha < 1, alpha)
+            # the run starts with a step
+            self.assertAlmostEqual((steps + alpha) * frame, t - t0 + frame)
+
+    def test_several_steps_per_draw (self):
+        # slow draws get several steps each, with fractional alpha
+        t0, draws = self.run_fixed((2.5,), 100)
+        per_draw = [b[0] - a[0] for a, b in zip(draws, draws[1:])]
+        self.assertEqual(set(per_draw), set((2, 3)))
+        self.assertEqual(set(round(d[1], 6) for d in draws[1:]),
+                         set((0, .5)))
+
+    def test_dropped_time (self):
+        # beyond max_steps, time is dropped, but alpha stays in range
+        self.timer.max_steps = 5
+        t0, draws = self.run_fixed((10.25,), 50)
+        for a, b in zip(draws, draws[1:]):
+            self.assertEqual(b[0] - a[0], 5)
+        for steps, alpha, t in draws:
+            self.assertTrue(0 <= alpha < 1, alpha)
+
+    def test_alpha_reset (self):
+        # alpha is 1 outside fixed-timestep mode
+        self.run_fixed((.5,), 10)
+        self.timer.fixed_step = False
+        self.timer.virtual = True
+        self.timer.run(lambda: None, frames=2)
+        self.assertEqual(self.timer.alpha, 1)
+
+
+class WheelTest (unittest.TestCase):
+    def trace (self, backend, seed):
+        # run a random sequence of operations, returning the log of callback
+        # calls
+        rnd = random.Random(seed)
+        s = sched.Scheduler(60, backend)
+        log = []
+        ids = []
+
+        def mk_cb (k):
+            def cb ():
+                log.append((s.frames_elapsed, k))
+                r = rnd.random()
+                if r < .1:
+                    s.rm_timeout(rnd.choice(ids))
+                return r < .6
+            return cb
+
+        for frame in xrange(3000):
+            r = rnd.random()
+            if r < .3:
+                kwargs = rnd.choice((
+                    {'frames': rnd.randint(1, 700)},
+                    {'seconds': rnd.random() * 20},
+                    {'frames': rnd.random() * 5,
+                     'repeat_seconds': rnd.random()},
+                    {'seconds': .3, 'repeat_frames': 2},
+                ))
+                ids.append(s.add_timeout(mk_cb(len(ids)), **kwargs))
+            elif ids:
+                if r < .35:
+                    s.rm_timeout(rnd.choice(ids))
+                elif r < .38:
+                    s.pause_timeout(rnd.choice(ids))
+                elif r < .41:
+                    s.unpause_timeout(rnd.choice(ids))
+            if frame == 1000:
+                s.fps = 25
+            elif frame == 2000:
+                s.fps = 144
+            s._update()
+        return log
+
+    def test_same_as_heap (self):
+        # the wheel fires the same callbacks on the same frames as the heap
+        for seed in xrange(3):
+            heap = self.trace('heap', seed)
+            self.assertTrue(len(heap) > 1000)
+            self.assertEqual(self.trace('wheel', seed), heap)
+
+    def test_long (self):
+        # timeouts that start beyond the first levels of the wheel
+        s = sched.Scheduler(60, 'wheel')
+        fired = []
+        frames = (255, 256, 257, 65535, 65536, 70000, 300000)
+        for n in frames:
+            s.add_timeout(lambda n=n: fired.append((n, s.frames_elapsed)),
+                          frames=n)
+        for i in xrange(max(frames) + 1):
+            s._update()
+        self.assertEqual(fired, [(n, n) for n in frames])
+    def test_cancel_late (self):
+        # cancelling a group late in a long run gives it queues that start at
+        # the group's current time, rather than walking every slot since the
+        # start
+        s = sched.Scheduler(64, 'wheel')
+        g = s.group()
+        s.add_timeout(lambda: True, frames=1, group=g)
+        for i in xrange(20000):
+            s._update()
+        g.cancel()
+        clock = g._clock
+        frames, seconds = clock.queues
+        self.assertEqual(frames._pos, clock.frames)
+        self.assertEqual(seconds._pos, int(clock.seconds // seconds._width))
+        # and timeouts still fire on time
+        fired = []
+        s.add_timeout(lambda: fired.append(('frames', g.frames_elapsed)),
+                      frames=3, group=g)
+        s.add_timeout(lambda: fired.append(('seconds', g.frames_elapsed)),
+                      seconds=5. / 64, group=g)
+        for i in xrange(10):
+            s._update()
+        self.assertEqual(sorted(fired), [('frames', 20003), ('seconds', 20005)])
+
+
+class LazyCounterTest (unittest.TestCase):
+    # LazyCounter should behave like Counter; frame lengths are exact, so
+    # they finish on the same frames
+
+    def compare (self, scenario, autoreset=False):
+        # call scenario(counter, step, cb) for each type of counter, where
+        # step(frames) runs frames, logging the state after each, and cb(name)
+        # makes a callback that logs its calls; returns the log
+        logs = []
+        for lazy in (False, True):
+            s = sched.Scheduler(64)
+            c = s.counter(8. / 64, autoreset, lazy)
+            log = []
+
+            def step (frames):
+                for i in xrange(frames):
+                    s._update()
+                    log.append(bool(c))
+
+            def cb (name):
+                return lambda: log.append(name)
+
+            scenario(c, step, cb)
+            logs.append(log)
+        self.assertEqual(logs[1], logs[0])
+        return logs[0]
+
+    def test_states (self):
+        # reset, cancel, finish, pause and unpause
+        def scenario (c, step, cb):
+            step(2)
+            c.reset()
+            step(12)
+            c.reset()
+            step(4)
+            c.cancel()
+            step(10)
+            c.reset()
+            step(3)
+            c.pause()
+            step(10)
+            c.pause()
+            c.unpause()
+            step(10)
+            c.reset()
+            step(2)
+            c.finish()
+            step(2)
+            c.unpause()
+            c.cancel()
+            step(2)
+
+        log = self.compare(scenario)
+        self.assertEqual(log[:14], [True] * 2 + [False] * 7 + [True] * 5)
+        # paused for 10 frames
+        self.assertEqual(log[28:51], [False] * 17 + [True] * 6)
+
+    def test_cbs (self):
+        def scenario (c, step, cb):
+            c.cb(cb('a'))
+            c.reset()
+            step(10)
+            c.reset()
+            step(4)
+            c.pause()
+            step(10)
+            c.unpause()
+            step(6)
+
+        log = self.compare(scenario)
+        self.assertEqual(log.count('a'), 2)
+
+    def test_autoreset (self):
+        # without callbacks, rollover keeps the counter unfinished
+        def scenario (c, step, cb):
+            c.reset()
+            step(20)
+            # callbacks added later are called in time with the rollovers
+            c.cb(cb('a'))
+            step(13)
+            c.cb(cb('b'))
+            step(10)
+            c.rm_cbs(cb('a'))
+            step(10)
+
+        log = self.compare(scenario, True)
+        self.assertNotIn(True, log)
+        # frames run when each call happens
+        frames = [i - log[:i].count('a') - log[:i].count('b') + 1
+                  for i, x in enumerate(log) if x == 'a']
+        self.assertEqual(frames, [24, 32, 40, 48])
+
+    def test_reset_in_cb (self):
+        # a callback resetting the counter from inside the timeout callback
+        def scenario (c, step, cb):
+            log_a = cb('a')
+
+            def restart ():
+                log_a()
+                c.reset()
+
+            c.cb(restart)
+            c.reset()
+            step(30)
+
+        log = self.compare(scenario)
+        self.assertEqual(log.count('a'), 3)
+        self.assertNotIn(True, log)
+
+    def test_rm_cbs (self):
+        # removing the last callback removes the timeout
+        s = sched.Scheduler(64)
+        c = s.counter(8. / 64, lazy=True)
+        f = lambda: None
+        c.cb(f).reset()
+        self.assertEqual(len(s._cbs), 1)
+        c.rm_cbs(f)
+        self.assertEqual(len(s._cbs), 0)
+        # but the countdown continues
+        for i in xrange(8):
+            self.assertFalse(c)
+            s._update()
+        self.assertTrue(c)
+
+
+class TaskTest (unittest.TestCase):
+    def setUp (self):
+        self.s = sched.Scheduler(64)
+        self.log = []
+
+    def run_frames (self, frames):
+        for i in xrange(frames):
+            self.s._update()
+
+    def mark (self, *what):
+        # log something with the current frame
+        self.log.append((self.s.frames_elapsed,) + what)
+
+    def test_waits (self):
+        s = self.s
+
+        def coro ():
+            self.mark()
+            yield s.sleep(8. / 64)
+            self.mark()
+            yield s.frames(3)
+            self.mark()
+            yield
+            self.mark()
+            raise StopIteration('done')
+
+        task = s.spawn(coro())
+        self.assertEqual(self.log, [(0,)])
+        self.run_frames(20)
+        self.assertEqual(self.log, [(0,), (8,), (11,), (12,)])
+        self.assertTrue(task.done())
+        self.assertEqual(task.result(), 'done')
+
+    def test_wait_for_task (self):
+        s = self.s
+
+        def child (fail):
+            yield s.frames(5)
+            if fail:
+                raise ValueError('child')
+            raise StopIteration('child')
+
+        def parent ():
+            self.mark((yield s.spawn(child(False))))
+            try:
+                yield s.spawn(child(True))
+            except ValueError as e:
+                self.mark('caught', str(e))
+
+        task = s.spawn(parent())
+        self.run_frames(20)
+        self.assertEqual(self.log, [(6, 'child'), (12, 'caught', 'child')])
+        self.assertTrue(task.done())
+
+    def test_subroutine (self):
+        s = self.s
+
+        def sub (n):
+            yield s.frames(n)
+            self.mark('sub')
+            raise StopIteration(n * 2)
+
+        def coro ():
+            self.mark((yield sub(2)))
+            self.mark((yield sub(3)))
+
+        s.spawn(coro())
+        self.run_frames(10)
+        self.assertEqual(self.log, [(2, 'sub'), (2, 4), (5, 'sub'), (5, 6)])
+
+    def test_cancel (self):
+        s = self.s
+
+        def sub ():
+            try:
+                yield s.frames(10)
+                self.mark('resumed')
+            finally:
+                self.mark('sub finally')
+
+        def coro ():
+            try:
+                yield sub()
+            finally:
+                self.mark('finally')
+
+        task = s.spawn(coro())
+        self.run_frames(3)
+        self.assertTrue(task.cancel())
+        self.assertEqual(self.log, [(3, 'sub finally'), (3, 'finally')])
+        self.assertRaises(sched.CancelledError, task.result)
+        self.assertFalse(task.cancel())
+        self.run_frames(20)
+        self.assertEqual(len(self.log), 2)
+        self.assertEqual(len(s._cbs), 0)
+
+    def test_unhandled (self):
+        # an exception nothing waits for propagates out of the scheduler
+        s = self.s
+
+        def coro ():
+            yield s.frames(2)
+            raise ValueError('unhandled')
+
+        task = s.spawn(coro())
+        s._update()
+        self.assertRaises(ValueError, s._update)
+        self.assertTrue(task.done())
+        self.assertRaises(ValueError, task.result)
+
+
+class JobsTest (unittest.TestCase):
+    def setUp (self):
+        self.s = sched.Scheduler(64)
+
+    def wait_for (self, cond):
+        # wait for a worker thread to do something
+        t_end = time() + 5
+        while not cond():
+            self.assertTrue(time() < t_end, 'timed out')
+            sleep(.001)
+
+    def test_main_thread (self):
+        # the future and cb finish in the main thread at the next frame
+        s = self.s
+        main = threading.current_thread()
+        threads = []
+        job_thread = []
+
+        def job (x):
+            job_thread.append(threading.current_thread())
+            return x * 2
+
+        future = s.submit(job, 4, cb=lambda f: threads.append(
+            ('cb', threading.current_thread(), f.result())))
+        future.add_done_callback(lambda f: threads.append(
+            ('future', threading.current_thread(), f.result())))
+        self.wait_for(lambda: s._jobs_done)
+        self.assertNotEqual(job_thread, [main])
+        self.assertFalse(future.done())
+        self.assertEqual(threads, [])
+        s._update()
+        self.assertTrue(future.done())
+        self.assertEqual(sorted(threads), [('cb', main, 8),
+                                           ('future', main, 8)])
+
+    def test_unhandled (self):
+        # an exception nothing waits for is raised in the main thread
+        s = self.s
+
+        def job ():
+            raise ValueError('job')
+
+        s.submit(job)
+        self.wait_for(lambda: s._jobs_done)
+        self.assertRaises(ValueError, s._update)
+        # but not if something handles it
+        errors = []
+        s.submit(job, cb=lambda f: errors.append(f._exc))
+        self.wait_for(lambda: s._jobs_done)
+        s._update()
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(isinstance(errors[0], ValueError))
+
+    def test_cancel (self):
+        # cancelling skips pending jobs and discards running jobs' results
+        s = self.s
+        release = threading.Event()
+        started = []
+        ran = []
+        cbs = []
+
+        def block ():
+            started.append(True)
+            release.wait()
+            raise ValueError('discarded')
+
+        n = sched.conf.WORKER_THREADS
+        running = [s.submit(block, cb=cbs.append) for i in xrange(n)]
+        self.wait_for(lambda: len(started) == n)
+        pending = s.submit(ran.append, True, cb=cbs.append)
+        s.cancel_jobs()
+        release.set()
+        # jobs run in order, so once this is done, the others are too
+        after = s.submit(lambda: None)
+        self.wait_for(lambda: len(s._jobs_done) == n + 1)
+        s._update()
+        self.assertTrue(after.done())
+        self.assertEqual(ran, [])
+        self.assertEqual(cbs, [])
+        for future in running + [pending]:
+            self.assertRaises(sched.CancelledError, future.result)
+
+
+@unittest.skipIf(sched.np is None, 'NumPy is not available')
+class BatchInterpTest (unittest.TestCase):
+    def setUp (self):
+        # exact frame length, so times compare equal
+        self.s = sched.Scheduler(64)
+        self.s.virtual = True
+        self.batch = self.s.batch
+
+    def test_group (self):
+        # interpolations follow their group's pause, scale and cancel
+        s = self.s
+        g = s.group(scale=.5)
+        vals = {}
+        set_val = lambda key: lambda v: vals.__setitem__(key, v)
+        self.batch.linear(set_val('root'), 0, 64, 1)
+        self.batch.linear(set_val('g'), 0, 64, 1, group=g)
+        s.run(frames=32)
+        self.assertEqual(vals, {'root': 32, 'g': 16})
+        g.pause()
+        s.run(frames=16)
+        self.assertEqual(vals, {'root': 48, 'g': 16})
+        g.unpause()
+        s.run(frames=16)
+        self.assertEqual(vals, {'root': 64, 'g': 24})
+        ended = []
+        self.batch.linear(set_val('g2'), 0, 1, 1, group=g,
+                          end=lambda: ended.append(True))
+        g.cancel()
+        s.run(frames=64)
+        self.assertEqual(vals, {'root': 64, 'g': 24})
+        self.assertEqual(len(self.batch), 0)
+        self.assertEqual(ended, [])
+        # the group can still be used
+        self.batch.linear(set_val('g'), 0, 64, 1, group=g)
+        s.run(frames=2)
+        self.assertEqual(vals['g'], 1)
+
+    def test_churn (self):
+        # removing interpolations leaves the others intact
+        s = self.s
+        vals = {}
+        ids = {}
+        for i in xrange(100):
+            ids[i] = self.batch.linear(
+                lambda v, i=i: vals.__setitem__(i, v), i, i + 64, 1)
+        s.run(frames=1)
+        s.rm_timeout(*[ids[i] for i in xrange(0, 100, 3)])
+        s.pause_timeout(*[ids[i] for i in xrange(1, 100, 3)])
+        # more of the same kind and size, reusing rows
+        for i in xrange(100, 150):
+            ids[i] = self.batch.linear(
+                lambda v, i=i: vals.__setitem__(i, v), i, i + 64, 1)
+        s.run(frames=7)
+        for i in xrange(100):
+            if i % 3 in (0, 1):
+                # removed or paused after the first frame
+                self.assertEqual(vals[i], i + 1)
+            else:
+                self.assertEqual(vals[i], i + 8)
+        for i in xrange(100, 150):
+            self.assertEqual(vals[i], i + 7)
+        self.assertEqual(len(self.batch), 100 - 34 + 50)
+
+
+if __name__ == '__main__':
+    unittest.main()